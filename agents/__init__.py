@@ -1,12 +1,15 @@
 """Agent module for AIPA"""
 
 from .agent import Agent
+from .agent_pool import AgentPool, AgentHandle, AGENT_POOL
 from .assistant_agent import AssistantAgent
 from .wakeup_agent import WakeupAgent
 from .weather_agent import WeatherAgent
 from .email_agent import EmailAgent
 
 from .agent_context import AgentContext
+from .context_store import ContextStore
+from .context_compactor import ContextCompactor
 from .prompt import Prompt, PromptSet
 
-__all__ = ["Agent", "WeatherAgent", "AssistantAgent", "WakeupAgent", "EmailAgent", "AgentContext", "Prompt", "PromptSet"]
\ No newline at end of file
+__all__ = ["Agent", "AgentPool", "AgentHandle", "AGENT_POOL", "WeatherAgent", "AssistantAgent", "WakeupAgent", "EmailAgent", "AgentContext", "ContextStore", "ContextCompactor", "Prompt", "PromptSet"]
\ No newline at end of file
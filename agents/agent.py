@@ -4,10 +4,11 @@ from dotenv import load_dotenv
 
 from agents.prompt import PromptSet
 from agents.agent_context import AgentContext
+from clock import Clock, get_clock
 from models import Model
 from messages import Message, ToolCall
 from tasks import Task
-from utils import generate_tool_schema
+from tool_registry import TOOL_REGISTRY, ToolSet
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,7 +19,8 @@ DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 class Agent:
     AGENT_HUB = {}
 
-    def __init__(self, model: Model, prompt_dir: str | list[str] | None = None, agent_context: AgentContext | None = None):
+    def __init__(self, model: Model, prompt_dir: str | list[str] | None = None, agent_context: AgentContext | None = None,
+                 agent_id: str = "default", clock: Clock | None = None):
         """
         Initialize an Agent.
         
@@ -27,8 +29,15 @@ class Agent:
             prompt_dir: Optional directory or list of directories for agent-specific prompts.
                        All agents automatically load from 'agents/prompts/common' first,
                        then from any specified prompt_dir(s).
+            agent_context: Optional context shared with other agents.
+            agent_id: The tenant/instance id of the agent, used to tell apart several agents of
+                      the same class.
+            clock: Optional clock the agent reads the time from. Defaults to the process-wide
+                   clock.
         """
         self.model = model
+        self.agent_id = agent_id
+        self._clock = clock
         
         # Build list of prompt directories, starting with common
         prompt_dirs = ["agents/prompts/common"]
@@ -43,25 +52,30 @@ class Agent:
         self.prompt_set = PromptSet(prompt_dirs)
         self.system_prompt = self.prompt_set["system_prompt"]()
         self.agent_context = agent_context if agent_context is not None else AgentContext()
-        self.tools = {}
+        self.tool_set = ToolSet()
         self.tasks = []
         self.register_agent(self.__class__.__name__)
 
+    @property
+    def clock(self) -> Clock:
+        return self._clock if self._clock is not None else get_clock()
+
     @property
     def tool_dicts(self) -> list:
-        return [tool["tool_dict"] for tool in self.tools.values()]
+        return [tool.schema for tool in self.tool_set]
         
     def register_agent(self, agent_name: str):
         """
         Registers the agent in the global AGENT_HUB.
 
         Registering the agent allows for easy retrieval and management of different agents within
-        the system.
+        the system. Agents are keyed by name and `agent_id`, so several instances of the same agent
+        class can be registered side by side.
 
         Args:
             agent_name (str): The name to register the agent under.
         """
-        Agent.AGENT_HUB[agent_name] = self
+        Agent.AGENT_HUB[(agent_name, self.agent_id)] = self
 
     def make_system_message(self) -> Message:
         """
@@ -89,7 +103,9 @@ class Agent:
         """
         Adds a tool to the agent's toolset.
 
-        The tool schema is automatically generated from the function's name, docstring, and type
+        The tool is compiled through the shared `TOOL_REGISTRY` and the agent's tool set is replaced
+        by a new snapshot; the underlying model is not modified. The tool schema is automatically
+        generated from the function's name, docstring, and type
         hints. The function must have:
         - A descriptive docstring (first paragraph becomes the tool description)
         - Type hints for all parameters (except 'self')
@@ -113,32 +129,26 @@ class Agent:
         Raises:
             ValueError: If the function lacks a docstring or has missing type hints.
         """
-        tool_schema = generate_tool_schema(tool_func)
-        self.tools[tool_schema["name"]] = {
-            "tool_dict": tool_schema,
-            "function": tool_func
-        }
-        self.model.add_tool(tool_schema, tool_func)
+        compiled_tool = TOOL_REGISTRY.compile(tool_func)
+        self.tool_set = self.tool_set.with_tools(compiled_tool).flatten()
 
     def remove_tool(self, tool_name: str):
         """
         Removes a tool from the agent's toolset.
 
-        The tool is removed from both the agent and the underlying model.
-
         Args:
             tool_name (str): The name of the tool to remove.
         """
-        if tool_name in self.tools:
-            del self.tools[tool_name]
-        self.model.remove_tool(tool_name)
+        if tool_name in self.tool_set:
+            self.tool_set = self.tool_set.without(tool_name)
 
     def generate(self, 
                          messages: list[Message],
                          max_length: int = 2048,
                          temperature: float = 0.1,
                          reasoning: bool = False,
-                         format: str | None = None) -> list[Message]:
+                         format: str | None = None,
+                         tool_set: ToolSet | None = None) -> list[Message]:
         """
         Generates a response from the model and executes any tool calls in the response.
 
@@ -152,18 +162,24 @@ class Agent:
             temperature (float, optional): The sampling temperature for generation. Defaults to 0.8.
             reasoning (bool, optional): Whether to enable reasoning capabilities. Defaults to False.
             format (str | None, optional): The output format for the response. Defaults to None.
+            tool_set (ToolSet | None, optional): The tools available for this generation, e.g. an
+                overlay of the agent's tools with task-specific ones. Defaults to the agent's
+                tool set.
 
         Returns:
             list[Message]: A list of Message objects including the model's response and any tool
             call result messages.
         """
+        tool_set = tool_set if tool_set is not None else self.tool_set
+
         # Generate response from the model
         response_message = self.model.generate(
             messages=messages,
             max_length=max_length,
             temperature=temperature,
             reasoning=reasoning,
-            format=format
+            format=format,
+            tools=tool_set
         )
         
         # Start with the model's response
@@ -171,7 +187,7 @@ class Agent:
         
         # Execute tool calls if any exist
         if response_message.tool_calls is not None and len(response_message.tool_calls) > 0:
-            self.execute_tool_call(response_message.tool_calls)
+            self.execute_tool_call(response_message.tool_calls, tool_set=tool_set)
             
             # Create a message for each tool call result
             for call in response_message.tool_calls:
@@ -179,7 +195,7 @@ class Agent:
 
         return result_messages
 
-    def execute_tool_call(self, tool_call: ToolCall | list[ToolCall]) -> list:
+    def execute_tool_call(self, tool_call: ToolCall | list[ToolCall], tool_set: ToolSet | None = None) -> list:
         """
         Executes one or more tool calls based on the provided tool call(s).
 
@@ -190,17 +206,20 @@ class Agent:
         Args:
             tool_call (ToolCall | list[ToolCall]): A ToolCall instance or list of ToolCall instances
             containing the tool name and arguments. Should be provided by the model's response.
+            tool_set (ToolSet | None, optional): The tools to look the calls up in. Defaults to the
+            agent's tool set.
 
         Returns:
             list: A list of results from executing each tool function. Always returns a list, even
             if only one tool call was provided.
         """
+        tool_set = tool_set if tool_set is not None else self.tool_set
         tool_calls = tool_call if isinstance(tool_call, list) else [tool_call]
         for call in tool_calls:
             tool_name = call.name
             parameters = call.arguments
-            if tool_name in self.tools:
-                tool_function = self.tools[tool_name]["function"]
-                call.result = tool_function(**parameters)
+            tool = tool_set.get(tool_name)
+            if tool is not None:
+                call.result = tool.function(**parameters)
             else:
                 raise ValueError(f"Tool '{tool_name}' not found.")
\ No newline at end of file
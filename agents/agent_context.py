@@ -1,51 +1,415 @@
+from datetime import datetime, timedelta
+import re
+import threading
+
+from agents.context_store import ContextStore
+from clock import get_clock
+from utils import estimate_tokens
+
+
+# Context items whose content starts with one of these prefixes are never evicted
+PINNED_PREFIXES = ("RECURRING INSTRUCTION:",)
+
+# Unpinned items are evicted lowest priority first, oldest first within a priority. Kinds not
+# listed here have the highest priority, since they are usually facts the user gave.
+EVICTION_PRIORITY = {
+    "TASK COMPLETED": 0,
+    "ACTION TAKEN": 1,
+}
+DEFAULT_EVICTION_PRIORITY = 2
+
+KIND_PATTERN = re.compile(r"^([A-Z][A-Z ]*[A-Z]):")
+
+
 class ContextItem:
     NEXT_ID = 1
+    _id_lock = threading.Lock()
 
-    def __init__(self, content: str):
-        self.id = ContextItem.NEXT_ID
-        ContextItem.NEXT_ID += 1
+    def __init__(self, content: str, pinned: bool | None = None, created_at: datetime | None = None,
+                 expires_at: datetime | None = None, item_id: int | None = None):
+        with ContextItem._id_lock:
+            if item_id is None:
+                item_id = ContextItem.NEXT_ID
+            ContextItem.NEXT_ID = max(ContextItem.NEXT_ID, item_id + 1)
+        self.id = item_id
         self.content = content
+        self.created_at = created_at if created_at is not None else get_clock().now()
+        self.expires_at = expires_at
+        # The uppercase prefix of the content, e.g. "TASK COMPLETED", used by eviction policies
+        kind_match = KIND_PATTERN.match(content)
+        self.kind = kind_match.group(1) if kind_match else "CONTEXT"
+        self.pinned = pinned if pinned is not None else content.upper().startswith(PINNED_PREFIXES)
+
+    @classmethod
+    def reserve_ids(cls, max_used_id: int):
+        """Make sure new items get ids above `max_used_id`, e.g. ids loaded from a store."""
+        with cls._id_lock:
+            cls.NEXT_ID = max(cls.NEXT_ID, max_used_id + 1)
+
+    def is_expired(self, now: datetime) -> bool:
+        return self.expires_at is not None and self.expires_at <= now
 
     def __str__(self):
         return f"CONTEXT #{self.id}: {self.content}"
 
 class Notification(ContextItem):
-    def __init__(self, content: str):
-        super().__init__(content)
+    def __init__(self, content: str, priority: int = 0, created_at: datetime | None = None,
+                 expires_at: datetime | None = None, item_id: int | None = None):
+        super().__init__(content, created_at=created_at, expires_at=expires_at, item_id=item_id)
+        self.priority = priority
 
     def __str__(self):
         return f"NOTIFICATION #{self.id}: {self.content}"
 
 
 class AgentContext:
-    def __init__(self):
-        self.context_items: dict[int, ContextItem] = {}
-        self.notifications: dict[int, Notification] = {}
+    """
+    The context items and notifications shared by a group of agents.
+
+    The rendered context and notification strings are kept in buffers that are appended to as
+    items are added and only rebuilt after an item is removed, so rendering a prompt does not
+    re-join every item. The context is bounded: once it holds more than `max_items` items or its
+    rendering exceeds `max_tokens` estimated tokens, unpinned items are evicted in order of
+    `EVICTION_PRIORITY` and then age. Unpinned items older than `max_age` are evicted as well.
+    Pinned items (see `PINNED_PREFIXES`) are never evicted. Items and notifications may be given
+    a time to live, after which they are dropped.
+
+    Notifications are rendered in priority order, most urgent first. If a `ContextStore` is given,
+    items and notifications are persisted to it and the live ones are loaded on first use.
+    """
+
+    def __init__(self, max_items: int | None = 100, max_tokens: int | None = 2000,
+                 max_age: timedelta | None = None, store: ContextStore | None = None):
+        """
+        Initialize the AgentContext.
+
+        Args:
+            max_items: The maximum number of context items kept. If None, the count is unbounded.
+            max_tokens: The maximum estimated token count of the rendered context. If None, the
+                size is unbounded.
+            max_age: How long unpinned items are kept. If None, items never expire.
+            store: Optional store persisting the context across restarts.
+        """
+        self._context_items: dict[int, ContextItem] = {}
+        self._notifications: dict[int, Notification] = {}
+        self.listeners: list[callable] = []
+        self.eviction_listeners: list[callable] = []
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.max_age = max_age
+        self.store = store
+        self.evicted_count = 0
+        # Estimated tokens of the most recent `get_context` + `get_notifications` renders
+        self.last_render_tokens = 0
+        self._context_tokens = 0
+        self._rendered_context: str | None = ""
+        self._rendered_notifications: str | None = ""
+        self._context_render_tokens = 0
+        self._notification_render_tokens = 0
+        # Earliest expiry time of any context item, so renders only scan for expired items when due
+        self._next_expiry: datetime | None = None
+        # Tasks may run concurrently, so every access to the item dicts goes through this lock
+        self._lock = threading.RLock()
+
+        self._loaded = store is None
+        if store is not None:
+            # Only the id sequence is read up front; the items themselves load on first use
+            ContextItem.reserve_ids(store.max_id())
+
+    @property
+    def context_items(self) -> dict[int, ContextItem]:
+        self._ensure_loaded()
+        return self._context_items
+
+    @property
+    def notifications(self) -> dict[int, Notification]:
+        self._ensure_loaded()
+        return self._notifications
+
+    @property
+    def version(self) -> int:
+        """The id of the newest item or notification; increases with every addition."""
+        return ContextItem.NEXT_ID - 1
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            now = get_clock().now()
+            self.store.expire(now)
+            for row in self.store.load_live(notification=False, now=now):
+                item = self._item_from_row(row)
+                self._context_items[item.id] = item
+                self._context_tokens += estimate_tokens(str(item)) + 1
+                self._track_expiry(item)
+            for row in self.store.load_live(notification=True, now=now):
+                notification = self._item_from_row(row)
+                self._notifications[notification.id] = notification
+            self._rendered_context = None
+            self._rendered_notifications = None
+            self._loaded = True
+
+    @staticmethod
+    def _item_from_row(row) -> ContextItem:
+        created_at = datetime.fromtimestamp(row["created_at"])
+        expires_at = datetime.fromtimestamp(row["expires_at"]) if row["expires_at"] is not None else None
+        if row["notification"]:
+            return Notification(row["content"], priority=row["priority"], created_at=created_at,
+                                expires_at=expires_at, item_id=row["id"])
+        return ContextItem(row["content"], pinned=bool(row["pinned"]), created_at=created_at,
+                           expires_at=expires_at, item_id=row["id"])
+
+    def items_since(self, version: int) -> list[ContextItem]:
+        """
+        Get the live items and notifications added after a given `version`.
+
+        Args:
+            version (int): A previously read `version`.
+
+        Returns:
+            list[ContextItem]: The newer items and notifications, oldest first.
+        """
+        if self.store is not None:
+            return [self._item_from_row(row) for row in self.store.items_since(version)]
+        with self._lock:
+            items = [item for item in self._context_items.values() if item.id > version]
+            items.extend(note for note in self._notifications.values() if note.id > version)
+        return sorted(items, key=lambda item: item.id)
 
-    def add_context(self, content: str):
-        context_item = ContextItem(content)
-        self.context_items[context_item.id] = context_item
+    def add_listener(self, listener: callable):
+        """
+        Register a callable invoked with each newly added `ContextItem` or `Notification`.
+        """
+        self.listeners.append(listener)
+
+    def add_eviction_listener(self, listener: callable):
+        """
+        Register a callable invoked with each `ContextItem` evicted to keep the context bounded.
+        """
+        self.eviction_listeners.append(listener)
+
+    def _notify_listeners(self, item: ContextItem):
+        for listener in self.listeners:
+            listener(item)
+
+    def add_context(self, content: str, pinned: bool | None = None, ttl: timedelta | None = None) -> ContextItem:
+        """
+        Add an item to the context, evicting older items if the context is over capacity.
+
+        Args:
+            content (str): The content of the item.
+            pinned (bool | None, optional): Whether the item may never be evicted. Defaults to
+                whether the content starts with one of the `PINNED_PREFIXES`.
+            ttl (timedelta | None, optional): How long the item is kept. Defaults to no expiry.
+
+        Returns:
+            ContextItem: The new item.
+        """
+        self._ensure_loaded()
+        now = get_clock().now()
+        context_item = ContextItem(content, pinned=pinned, created_at=now,
+                                   expires_at=now + ttl if ttl is not None else None)
+        line = str(context_item)
+        with self._lock:
+            self._context_items[context_item.id] = context_item
+            self._track_expiry(context_item)
+            if self.store is not None:
+                self.store.insert(context_item, expires_at=context_item.expires_at)
+            self._context_tokens += estimate_tokens(line) + 1
+            if self._rendered_context is not None:
+                self._rendered_context = f"{self._rendered_context}\n{line}" if self._rendered_context else line
+            evicted = self._evict(now)
+        self._notify_listeners(context_item)
+        for item in evicted:
+            for listener in self.eviction_listeners:
+                listener(item)
+        return context_item
 
     def remove_context(self, context_id: int):
-        if context_id in self.context_items:
-            del self.context_items[context_id]
+        self._remove_context_items([context_id])
+
+    def _remove_context_items(self, context_ids: list[int]):
+        self._ensure_loaded()
+        with self._lock:
+            removed_ids = []
+            for context_id in context_ids:
+                item = self._context_items.pop(context_id, None)
+                if item is not None:
+                    self._context_tokens -= estimate_tokens(str(item)) + 1
+                    removed_ids.append(context_id)
+            if removed_ids:
+                self._rendered_context = None
+                if self.store is not None:
+                    self.store.mark_removed(removed_ids, get_clock().now())
+
+    def _track_expiry(self, item: ContextItem):
+        if item.expires_at is not None and (self._next_expiry is None or item.expires_at < self._next_expiry):
+            self._next_expiry = item.expires_at
+
+    def _pop_expired(self, now: datetime) -> list[ContextItem]:
+        """Remove and return the context items whose time to live has passed. Must hold the lock."""
+        if self._next_expiry is None or self._next_expiry > now:
+            return []
+        expired = [item for item in self._context_items.values() if item.is_expired(now)]
+        self._remove_context_items([item.id for item in expired])
+        self._next_expiry = min((item.expires_at for item in self._context_items.values()
+                                 if item.expires_at is not None), default=None)
+        return expired
+
+    def _evict(self, now: datetime) -> list[ContextItem]:
+        """Evict items until the context is within its limits. Must be called with the lock held."""
+        # Expired items go regardless of pinning; aged-out items only if unpinned
+        expired = self._pop_expired(now)
+        evicted = []
+        if self.max_age is not None:
+            cutoff = now - self.max_age
+            evicted.extend(item for item in self._context_items.values()
+                           if not item.pinned and item.created_at < cutoff)
+
+        over_items = self.max_items is not None and len(self._context_items) - len(evicted) > self.max_items
+        over_tokens = self.max_tokens is not None and self._context_tokens > self.max_tokens
+        if over_items or over_tokens:
+            aged_ids = {item.id for item in evicted}
+            candidates = sorted(
+                (item for item in self._context_items.values() if not item.pinned and item.id not in aged_ids),
+                key=lambda item: (EVICTION_PRIORITY.get(item.kind, DEFAULT_EVICTION_PRIORITY), item.created_at, item.id)
+            )
+            count = len(self._context_items) - len(evicted)
+            tokens = self._context_tokens - sum(estimate_tokens(str(item)) + 1 for item in evicted)
+            for item in candidates:
+                if ((self.max_items is None or count <= self.max_items)
+                        and (self.max_tokens is None or tokens <= self.max_tokens)):
+                    break
+                evicted.append(item)
+                count -= 1
+                tokens -= estimate_tokens(str(item)) + 1
+
+        self._remove_context_items([item.id for item in evicted])
+        evicted = expired + evicted
+        self.evicted_count += len(evicted)
+        return evicted
+
+    @property
+    def context_tokens(self) -> int:
+        """The estimated token count of the rendered context."""
+        self._ensure_loaded()
+        return self._context_tokens
+
+    def replace_items(self, context_ids: list[int], content: str) -> ContextItem | None:
+        """
+        Atomically replace several context items with a single item, e.g. a summary of them.
+
+        The new item takes the place of the first replaced item in the rendered context. If any of
+        the items has been removed in the meantime, nothing is replaced.
+
+        Args:
+            context_ids (list[int]): The ids of the items to replace.
+            content (str): The content of the replacement item.
+
+        Returns:
+            ContextItem | None: The replacement item, or None if nothing was replaced.
+        """
+        self._ensure_loaded()
+        replaced_ids = set(context_ids)
+        with self._lock:
+            if not replaced_ids or not replaced_ids.issubset(self._context_items):
+                return None
+            replaced = [self._context_items[context_id] for context_id in context_ids]
+            replacement = ContextItem(content, created_at=min(item.created_at for item in replaced))
+            order = list(self._context_items.items())
+            position = next(index for index, (item_id, _) in enumerate(order) if item_id in replaced_ids)
+            self._remove_context_items(context_ids)
+
+            # Every item before `position` is kept, so the replacement goes in at the same index
+            remaining = [(item_id, item) for item_id, item in order if item_id not in replaced_ids]
+            remaining.insert(position, (replacement.id, replacement))
+            self._context_items = dict(remaining)
+            self._context_tokens += estimate_tokens(str(replacement)) + 1
+            self._rendered_context = None
+            if self.store is not None:
+                # Keep the replacement at the same place in the context after a restart
+                self.store.insert(replacement, position_of=order[position][0])
+        self._notify_listeners(replacement)
+        return replacement
 
     def get_context(self) -> str:
-        return "\n".join(str(item) for item in self.context_items.values())
-    
+        self._ensure_loaded()
+        with self._lock:
+            self._pop_expired(get_clock().now())
+            if self._rendered_context is None:
+                self._rendered_context = "\n".join(str(item) for item in self._context_items.values())
+            self._context_render_tokens = estimate_tokens(self._rendered_context)
+            self.last_render_tokens = self._context_render_tokens + self._notification_render_tokens
+            return self._rendered_context
+
     def clear_context(self):
-        self.context_items = {}
+        with self._lock:
+            if self.store is not None:
+                self.store.remove_all(notification=False, when=get_clock().now())
+            self._context_items = {}
+            self._context_tokens = 0
+            self._rendered_context = ""
+            self._next_expiry = None
+
+    def add_notification(self, content: str, priority: int = 0, ttl: timedelta | None = None) -> Notification:
+        """
+        Add a notification.
 
-    def add_notification(self, content: str):
-        notification = Notification(content)
-        self.notifications[notification.id] = notification
+        Args:
+            content (str): The content of the notification.
+            priority (int, optional): The notification's priority; higher is more urgent.
+            ttl (timedelta | None, optional): How long the notification is kept if unhandled.
+                Defaults to no expiry.
+
+        Returns:
+            Notification: The new notification.
+        """
+        self._ensure_loaded()
+        now = get_clock().now()
+        notification = Notification(content, priority=priority, created_at=now,
+                                    expires_at=now + ttl if ttl is not None else None)
+        line = str(notification)
+        with self._lock:
+            # Appending keeps the buffer in priority order only if nothing queued is less urgent
+            in_order = all(note.priority >= priority for note in self._notifications.values())
+            self._notifications[notification.id] = notification
+            if self.store is not None:
+                self.store.insert(notification, notification=True, priority=priority,
+                                  expires_at=notification.expires_at)
+            if self._rendered_notifications is not None and in_order:
+                self._rendered_notifications = (f"{self._rendered_notifications}\n{line}"
+                                                if self._rendered_notifications else line)
+            else:
+                self._rendered_notifications = None
+        self._notify_listeners(notification)
+        return notification
 
     def remove_notification(self, notification_id: int):
-        if notification_id in self.notifications:
-            del self.notifications[notification_id]
+        self._ensure_loaded()
+        with self._lock:
+            if self._notifications.pop(notification_id, None) is not None:
+                self._rendered_notifications = None
+                if self.store is not None:
+                    self.store.mark_removed([notification_id], get_clock().now())
 
     def get_notifications(self) -> str:
-        return "\n".join(str(note) for note in self.notifications.values())
-    
+        self._ensure_loaded()
+        with self._lock:
+            now = get_clock().now()
+            for note in [note for note in self._notifications.values() if note.is_expired(now)]:
+                self.remove_notification(note.id)
+            if self._rendered_notifications is None:
+                queue = sorted(self._notifications.values(), key=lambda note: (-note.priority, note.id))
+                self._rendered_notifications = "\n".join(str(note) for note in queue)
+            self._notification_render_tokens = estimate_tokens(self._rendered_notifications)
+            self.last_render_tokens = self._context_render_tokens + self._notification_render_tokens
+            return self._rendered_notifications
+
     def clear_notifications(self):
-        self.notifications = {}
\ No newline at end of file
+        with self._lock:
+            if self.store is not None:
+                self.store.remove_all(notification=True, when=get_clock().now())
+            self._notifications = {}
+            self._rendered_notifications = ""
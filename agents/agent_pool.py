@@ -0,0 +1,168 @@
+import threading
+import time
+
+from agents.agent import Agent
+from models import Model, OllamaModel
+
+
+DEFAULT_MODEL_NAME = "gpt-oss:20b"
+
+
+class AgentHandle:
+    """
+    A lazy reference to an agent in an `AgentPool`.
+
+    The agent is only constructed the first time one of its attributes is used, e.g. when a tool
+    created from the handle is called. If the pool evicts the agent, the next use constructs it
+    again with the same arguments.
+    """
+
+    def __init__(self, pool: "AgentPool", agent_cls: type, agent_id: str):
+        self.pool = pool
+        self.agent_cls = agent_cls
+        self.agent_id = agent_id
+
+    def resolve(self) -> Agent:
+        """Get the pooled agent, constructing it if needed."""
+        return self.pool.get(self.agent_cls, self.agent_id)
+
+    def as_tool(self) -> callable:
+        """
+        Return the agent's tool callable without constructing the agent.
+
+        The agent class's `agent_as_tool` is called with this handle in place of the agent, so the
+        tool's schema can be generated up front while the agent itself is only built when the tool
+        is actually called.
+
+        Returns:
+            callable: A function that can be added as a tool to another agent.
+        """
+        return self.agent_cls.agent_as_tool(self)
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        return f"AgentHandle({self.agent_cls.__name__}, agent_id={self.agent_id!r})"
+
+
+class AgentPool:
+    """
+    Owns sub-agents and the model backends they share.
+
+    Agents are keyed by (agent class, agent id) and constructed lazily on first use. Model backends
+    are shared between agents using the same model name. Agents that have been idle for longer than
+    `max_idle_seconds` are evicted and rebuilt on their next use.
+    """
+
+    def __init__(self, model_factory: callable = OllamaModel, max_idle_seconds: float | None = 30 * 60):
+        """
+        Initialize the AgentPool.
+
+        Args:
+            model_factory: Callable creating a model backend from a model name.
+            max_idle_seconds: How long an agent may go unused before it is evicted. If None, agents
+                are never evicted.
+        """
+        self.model_factory = model_factory
+        self.max_idle_seconds = max_idle_seconds
+        self.models: dict[str, Model] = {}
+        self.agents: dict[tuple[type, str], Agent] = {}
+        self.agent_specs: dict[tuple[type, str], dict] = {}
+        self.last_used: dict[tuple[type, str], float] = {}
+        self._lock = threading.RLock()
+
+    def get_model(self, model_name: str) -> Model:
+        """
+        Get the shared model backend for a model name, creating it if needed.
+
+        Args:
+            model_name (str): The name of the model.
+
+        Returns:
+            Model: The shared model backend.
+        """
+        with self._lock:
+            if model_name not in self.models:
+                self.models[model_name] = self.model_factory(model_name)
+            return self.models[model_name]
+
+    def register(self, agent_cls: type, agent_id: str = "default",
+                 model_name: str = DEFAULT_MODEL_NAME, **agent_kwargs) -> AgentHandle:
+        """
+        Register how to build an agent and return a lazy handle to it.
+
+        Args:
+            agent_cls (type): The Agent subclass to build.
+            agent_id (str, optional): The tenant/instance id of the agent. Defaults to "default".
+            model_name (str, optional): The model backend the agent uses.
+            **agent_kwargs: Extra keyword arguments passed to the agent's constructor.
+
+        Returns:
+            AgentHandle: A handle that constructs the agent on first use.
+        """
+        with self._lock:
+            self.agent_specs[(agent_cls, agent_id)] = {"model_name": model_name, **agent_kwargs}
+        return AgentHandle(self, agent_cls, agent_id)
+
+    def get(self, agent_cls: type, agent_id: str = "default") -> Agent:
+        """
+        Get a pooled agent, constructing it if it does not exist yet.
+
+        Args:
+            agent_cls (type): The Agent subclass to get.
+            agent_id (str, optional): The tenant/instance id of the agent. Defaults to "default".
+
+        Returns:
+            Agent: The pooled agent.
+        """
+        key = (agent_cls, agent_id)
+        with self._lock:
+            self.evict_idle()
+            agent = self.agents.get(key)
+            if agent is None:
+                spec = dict(self.agent_specs.get(key, {}))
+                model = self.get_model(spec.pop("model_name", DEFAULT_MODEL_NAME))
+                agent = agent_cls(model, agent_id=agent_id, **spec)
+                self.agents[key] = agent
+            self.last_used[key] = time.monotonic()
+            return agent
+
+    def evict(self, agent_cls: type, agent_id: str = "default"):
+        """
+        Drop a pooled agent. It is rebuilt from its registration on next use.
+
+        Args:
+            agent_cls (type): The Agent subclass to evict.
+            agent_id (str, optional): The tenant/instance id of the agent. Defaults to "default".
+        """
+        key = (agent_cls, agent_id)
+        with self._lock:
+            agent = self.agents.pop(key, None)
+            self.last_used.pop(key, None)
+            if agent is not None and Agent.AGENT_HUB.get((agent_cls.__name__, agent_id)) is agent:
+                del Agent.AGENT_HUB[(agent_cls.__name__, agent_id)]
+
+    def evict_idle(self) -> list[tuple[type, str]]:
+        """
+        Evict every agent that has been idle longer than `max_idle_seconds`.
+
+        Agents with unfinished tasks are never evicted.
+
+        Returns:
+            list[tuple[type, str]]: The keys of the evicted agents.
+        """
+        if self.max_idle_seconds is None:
+            return []
+        cutoff = time.monotonic() - self.max_idle_seconds
+        with self._lock:
+            idle = [
+                key for key, last_used in self.last_used.items()
+                if last_used < cutoff and not self.agents[key].tasks
+            ]
+            for agent_cls, agent_id in idle:
+                self.evict(agent_cls, agent_id)
+        return idle
+
+
+AGENT_POOL = AgentPool()
@@ -1,28 +1,137 @@
-from datetime import datetime
+from datetime import timedelta
+import re
+import threading
 
 from agents.agent import Agent
+from agents.agent_context import AgentContext, ContextItem
+from agents.agent_pool import AGENT_POOL, AgentPool
+from agents.context_compactor import ContextCompactor
 from agents.email_agent import EmailAgent
 from agents.weather_agent import WeatherAgent
+from clock import Clock
 from email_handling.gmail_handler import GMAIL_HANDLER
+from memory import MemoryStore
 from messages.message import Message
-from models import Model, OllamaModel
-from tasks import Task
-from tools import get_current_time, get_user_location, get_weather_data
+from models import Model
+from tasks import PlanCache, Task, TaskExecutor, TaskIndex, TaskStore, normalize_goal
+from tool_registry import TOOL_REGISTRY, ToolSet
+from tools import get_current_time, get_email, get_user_location, get_weather_data, search_emails
 from utils import get_geolocation
 
 
-class AssistantAgent(Agent):
-    def __init__(self, model: Model, prompt_dir = "agents/prompts/assistant_agent"):
-        super().__init__(model, prompt_dir)
-        self.email_handler_agent = EmailAgent(OllamaModel("gpt-oss:20b"), agent_context=self.agent_context)
-        self.weather_agent = WeatherAgent(OllamaModel("gpt-oss:20b"), agent_context=self.agent_context)
+# Goals the model produces when there is nothing to do; these never need a task run
+NOOP_GOAL_PATTERN = re.compile(
+    r"^(standby|stand by|no task( needed| required)?|none|nothing( to do)?|no action( needed| required)?"
+    r"|wait|idle|n a)$"
+)
+
+
+def is_noop_goal(goal: str) -> bool:
+    """
+    Cheaply classify whether a generated task goal is a standby/no-op outcome.
+
+    Args:
+        goal (str): The generated task goal.
+
+    Returns:
+        bool: True if the goal means there is nothing to do.
+    """
+    normalized = normalize_goal(goal)
+    return normalized == "" or NOOP_GOAL_PATTERN.match(normalized) is not None
+
 
-        self.add_tool(self.weather_agent.agent_as_tool())
+class AssistantAgent(Agent):
+    def __init__(self, model: Model, prompt_dir = "agents/prompts/assistant_agent", agent_id: str = "default",
+                 agent_pool: AgentPool | None = None, max_concurrent_tasks: int = 1,
+                 task_store: TaskStore | None = None, plan_cache: PlanCache | None = None,
+                 task_dedup_window: timedelta = timedelta(minutes=30), clock: Clock | None = None,
+                 agent_context: AgentContext | None = None, memory: MemoryStore | None = None,
+                 compactor: ContextCompactor | None = None):
+        super().__init__(model, prompt_dir, agent_context, agent_id=agent_id, clock=clock)
+        # Sub-agents are only built the first time they are used
+        self.agent_pool = agent_pool if agent_pool is not None else AGENT_POOL
+        # Long-term memory of completed tasks, email summaries and context evicted from the prompt
+        self.memory = memory if memory is not None else MemoryStore()
+        self.agent_context.add_eviction_listener(self._remember_evicted)
+        self.email_handler_agent = self.agent_pool.register(EmailAgent, agent_id, agent_context=self.agent_context,
+                                                            clock=clock, memory=self.memory,
+                                                            email_store=GMAIL_HANDLER.store)
+        self.weather_agent = self.agent_pool.register(WeatherAgent, agent_id, agent_context=self.agent_context,
+                                                      clock=clock)
+
+        self.add_tool(self.weather_agent.as_tool())
         self.add_tool(get_current_time)
         self.add_tool(get_user_location)
         self.add_tool(get_weather_data)
+        self.add_tool(search_emails)
+        self.add_tool(get_email)
+
+        # Number of LLM calls avoided by the deterministic fast paths
+        self.cycle_skipped_llm_calls = 0
+        self.total_skipped_llm_calls = 0
+
+        # Queued tasks are independent chores; with more than one worker they run concurrently
+        self.task_executor = TaskExecutor(max_concurrent_tasks) if max_concurrent_tasks > 1 else None
+        self._state_lock = threading.RLock()
+
+        # Tasks are checkpointed after every step; pick up any left in flight by a previous run
+        self.task_store = task_store if task_store is not None else TaskStore()
+        self.plan_cache = plan_cache if plan_cache is not None else PlanCache()
+
+        # Duplicate and just-completed goals are dropped before they are queued
+        self.task_index = TaskIndex(completion_window=task_dedup_window)
+        # Completions persisted by a previous run are loaded without notifying listeners
+        for item in sorted(self.agent_context.context_items.values(), key=lambda item: item.created_at):
+            self._on_context_item(item)
+        self.agent_context.add_listener(self._on_context_item)
+
+        # Optional background summarization of the context and of long task transcripts
+        self.compactor = compactor
+        if self.compactor is not None:
+            self.compactor.watch(self.agent_context)
+
+        self.resume_tasks()
+
+    def _on_context_item(self, item: ContextItem):
+        if item.content.startswith("TASK COMPLETED:"):
+            completed_goal = item.content[len("TASK COMPLETED:"):].strip()
+            self.task_index.record_completed(completed_goal, item.created_at)
+
+    def _remember_evicted(self, item: ContextItem):
+        self.memory.add(item.content, source="context", metadata={"context_id": item.id})
+
+    def recall(self, query: str, k: int = 3) -> str:
+        """
+        Retrieves the long-term memories most relevant to a query, formatted for a prompt.
+
+        Args:
+            query (str): The text to find memories for, usually a task goal.
+            k (int, optional): The maximum number of memories to retrieve.
+
+        Returns:
+            str: One memory per line, or an empty string if nothing relevant is remembered.
+        """
+        return "\n".join(f"- {record}" for record, _ in self.memory.search(query, k=k))
+
+    def resume_tasks(self) -> list[Task]:
+        """
+        Re-queues tasks left in flight by a previous run from their last checkpoint.
 
-        self.debug_time = datetime(2025, 11, 5, 7, 0)  # Default debug time: Nov 5, 2025, 7:00 AM
+        Resumed tasks keep their plan, message log and iteration count, so none of the LLM calls
+        made before the checkpoint are repeated.
+
+        Returns:
+            list[Task]: The resumed tasks.
+        """
+        with self._state_lock:
+            queued_ids = {task.task_id for task in self.tasks}
+            resumed = [task for task in self.task_store.load_all() if task.task_id not in queued_ids]
+            self.tasks.extend(resumed)
+            for task in resumed:
+                self.task_index.add(task)
+        if resumed:
+            print(f"Resumed {len(resumed)} in-flight task(s) from checkpoints")
+        return resumed
 
     def explain_tools(self) -> str:
         """
@@ -44,21 +153,36 @@ class AssistantAgent(Agent):
         Executes a single cycle step for the assistant agent.
 
         If the agent has no tasks, it generates new tasks based on the user's context. Otherwise, it
-        evaluates its current tasks and selects the one with the highest priority to execute next.
+        evaluates its current tasks and selects the one with the highest priority to execute next,
+        or, when concurrent task execution is enabled, runs all of its queued tasks at once. The
+        number of LLM calls skipped by fast paths during the step is left in
+        `cycle_skipped_llm_calls`.
         """
+        self.cycle_skipped_llm_calls = 0
         if len(self.tasks) == 0:
             self.gen_assistant_task()
+        elif self.task_executor is not None and len(self.tasks) > 1:
+            # Every queued task runs, so there is nothing to select
+            self._skip_llm_call()
+            self.execute_tasks()
         else:
             selected_task = self.select_next_task()
             self.execute_task(selected_task)
 
+    def _skip_llm_call(self):
+        with self._state_lock:
+            self.cycle_skipped_llm_calls += 1
+            self.total_skipped_llm_calls += 1
+
     def gen_assistant_task(self) -> None:
         """
         Generates a task for the assistant based on the user's context.
+
+        Standby/no-op goals are recognized here and never queued, so they do not cost a task
+        selection call later. Goals duplicating a queued task, or a task completed within the
+        deduplication window, are dropped as well.
         """
-        # now = datetime.now()
-        # timestamp = now.strftime("%I:%M %p on %A, %B %d, %Y")
-        timestamp = self.debug_time.strftime("%I:%M %p on %A, %B %d, %Y")
+        timestamp = self.clock.now().strftime("%I:%M %p on %A, %B %d, %Y")
 
         geolocation = get_geolocation()
         location = f"{geolocation['city']}, {geolocation['state']}, {geolocation['country']}"
@@ -75,8 +199,19 @@ class AssistantAgent(Agent):
                                           max_length=4096,
                                           reasoning=True)
         task_goal = response_messages[-1].content.strip()
+        if is_noop_goal(task_goal):
+            self._skip_llm_call()
+            return
+        duplicate_of = self.task_index.find_duplicate(task_goal, self.clock.now())
+        if duplicate_of is not None:
+            print(f"Dropping task '{task_goal}': duplicates a {duplicate_of} task")
+            self._skip_llm_call()
+            return
         new_task = Task(goal=task_goal)
-        self.tasks.append(new_task)
+        with self._state_lock:
+            self.tasks.append(new_task)
+            self.task_index.add(new_task)
+        self.task_store.save(new_task)
 
     def select_next_task(self) -> Task:
         """
@@ -84,14 +219,18 @@ class AssistantAgent(Agent):
 
         Tasks do not have inherent priorities, since the importance of a task can vary based on
         context. Instead, the agent is given an enumerated list of its current tasks and selects one
-        to execute next.
+        to execute next. Tasks with duplicate goals are dropped first, and if only one task remains
+        it is selected without consulting the model.
 
         Returns:
             Task: The selected task to execute next.
         """
-        now = datetime.now()
-        # timestamp = now.strftime("%I:%M %p on %A, %B %d, %Y")
-        timestamp = self.debug_time.strftime("%I:%M %p on %A, %B %d, %Y")
+        self._drop_duplicate_tasks()
+        if len(self.tasks) == 1:
+            self._skip_llm_call()
+            return self.tasks[0]
+
+        timestamp = self.clock.now().strftime("%I:%M %p on %A, %B %d, %Y")
 
         geolocation = get_geolocation()
         location = f"{geolocation['city']}, {geolocation['state']}, {geolocation['country']}"
@@ -121,35 +260,104 @@ class AssistantAgent(Agent):
         except ValueError as e:
             raise Exception(f"Error parsing selected task index: {e}")
     
+    def _drop_duplicate_tasks(self):
+        """Remove queued tasks whose normalized goal duplicates an earlier task's goal."""
+        with self._state_lock:
+            seen_goals = set()
+            unique_tasks = []
+            for task in self.tasks:
+                if task.normalized_goal in seen_goals:
+                    self.task_store.delete(task.task_id)
+                    self.task_index.remove(task)
+                    continue
+                seen_goals.add(task.normalized_goal)
+                unique_tasks.append(task)
+            self.tasks = unique_tasks
+
+    def execute_tasks(self, tasks: list[Task] | None = None) -> dict[Task, object]:
+        """
+        Executes several independent tasks concurrently.
+
+        Each task runs with its own tool scope (see `execute_task`), so tasks do not interfere with
+        each other's tools. At most `max_concurrent_tasks` tasks run at the same time.
+
+        Args:
+            tasks (list[Task] | None, optional): The tasks to execute. Defaults to every queued task.
+
+        Returns:
+            dict[Task, object]: The result (or raised exception) of each task.
+        """
+        self._drop_duplicate_tasks()
+        with self._state_lock:
+            tasks = list(self.tasks) if tasks is None else tasks
+        if self.task_executor is None:
+            return {task: self.execute_task(task) for task in tasks}
+        return self.task_executor.run(tasks, self.execute_task)
+
+    def _remove_task(self, task: Task):
+        with self._state_lock:
+            if task in self.tasks:
+                self.tasks.remove(task)
+            self.task_index.remove(task)
+        self.task_store.delete(task.task_id)
+
     def execute_task(self, task: Task) -> str:
         """
         Executes the given task.
 
+        The task's `mark_task_completed` tool is layered over the agent's tools in a tool scope
+        private to this task, so several tasks can execute at the same time. The task is
+        checkpointed after every step, so an interrupted task resumes where it left off.
+
+        Plans that complete their task are stored in the plan cache. A plan taken from the cache
+        gets half of the iteration budget; if it has not completed the task by then, it is evicted
+        from the cache and a new plan is generated.
+
+        A task whose step raises is recorded as failed and removed, so it is not retried every
+        cycle and after every restart. Only an interrupted run (e.g. Ctrl+C) keeps the checkpoint.
+
         Args:
             task (Task): The task to execute.
 
         Returns:
             str: The result of the task execution.
         """
-        if task.goal.lower().strip(".") == "standby":
-            self.tasks.remove(task)
+        if is_noop_goal(task.goal):
+            self._remove_task(task)
             return 
         
         mark_task_completed = self._mark_task_completed_func_factory(task)
-        self.add_tool(mark_task_completed)
+        task_tools = self.tool_set.with_tools(TOOL_REGISTRY.compile(mark_task_completed))
 
         max_iterations = 20
-        iterations = 0
-        while not task.completed and iterations < max_iterations:
-            if task.plan is None or len(task.plan) == 0:
-                self.gen_task_plan(task)
-            else:
-                self.execute_task_step(task)
-            iterations += 1
-        self.remove_tool("mark_task_completed")
+        try:
+            while not task.completed and task.iterations < max_iterations:
+                if task.plan_from_cache and task.iterations >= max_iterations // 2:
+                    self.plan_cache.invalidate(task.goal, task_tools)
+                    task.reset_plan()
+                if task.plan is None or len(task.plan) == 0:
+                    self.gen_task_plan(task, tool_set=task_tools)
+                else:
+                    self.execute_task_step(task, tool_set=task_tools)
+                task.iterations += 1
+                self.task_store.save(task)
+                if self.compactor is not None:
+                    self.compactor.maybe_compact_task(task)
+        except Exception as error:
+            self.agent_context.add_context(f"TASK FAILED: {task.goal} ({error})")
+            if task.plan_from_cache:
+                self.plan_cache.invalidate(task.goal, task_tools)
+            self._remove_task(task)
+            raise
         if task.completed:
             self.agent_context.add_context(f"TASK COMPLETED: {task.goal}")
-        self.tasks.remove(task)
+            self.memory.add(f"Completed task: {task.goal}\nPlan:\n{task.plan}", source="task",
+                            metadata={"task_id": task.task_id})
+            if not task.plan_from_cache:
+                self.plan_cache.store(task.goal, task.plan, task_tools)
+        elif task.plan_from_cache:
+            self.plan_cache.invalidate(task.goal, task_tools)
+        self._remove_task(task)
 
     def _mark_task_completed_func_factory(self, task: Task) -> callable:
         """
@@ -166,19 +374,22 @@ class AssistantAgent(Agent):
             task.completed = True
         return mark_task_completed
 
-    def gen_task_plan(self, task: Task):
+    def gen_task_plan(self, task: Task, tool_set: ToolSet | None = None):
         """
         Generates a plan for the given task.
 
+        If a plan for an equivalent goal is in the plan cache, it is re-rendered with this task's
+        parameters and used instead of generating a new one.
+
         Args:
             task (Task): The task to generate a plan for.
+            tool_set (ToolSet | None, optional): The tools available while working on the task.
+                Defaults to the agent's tool set.
 
         Returns:
             str: A list of steps in the task plan.
         """
-        # now = datetime.now()
-        # timestamp = now.strftime("%I:%M %p on %A, %B %d, %Y")
-        timestamp = self.debug_time.strftime("%I:%M %p on %A, %B %d, %Y")
+        timestamp = self.clock.now().strftime("%I:%M %p on %A, %B %d, %Y")
 
         geolocation = get_geolocation()
         location = f"{geolocation['city']}, {geolocation['state']}, {geolocation['country']}"
@@ -187,31 +398,43 @@ class AssistantAgent(Agent):
             timestamp=timestamp,
             location=location,
             agent_context=self.agent_context.get_context(),
+            memories=self.recall(task.goal),
             task_goal=task.goal
         )
 
         prompt_messages = self.make_initial_prompt(user_prompt)
+
+        cached_plan = self.plan_cache.lookup(task.goal, tool_set)
+        if cached_plan is not None:
+            self._skip_llm_call()
+            task.add_plan(cached_plan)
+            task.plan_from_cache = True
+            task.message_log.extend(prompt_messages)
+            task.message_log.append(Message(role="assistant", content=cached_plan))
+            return
+
         response_messages = self.generate(prompt_messages, 
                                         max_length=4096,
-                                        reasoning=True)
+                                        reasoning=True,
+                                        tool_set=tool_set)
         plan = response_messages[-1].content.strip()
         task.add_plan(plan)
         task.message_log.extend(prompt_messages)
         task.message_log.extend(response_messages)
 
-    def execute_task_step(self, task: Task) -> str:
+    def execute_task_step(self, task: Task, tool_set: ToolSet | None = None) -> str:
         """
         Executes a single step of the given task.
 
         Args:
             task (Task): The task to execute a step for.
+            tool_set (ToolSet | None, optional): The tools available while working on the task.
+                Defaults to the agent's tool set.
 
         Returns:
             str: The result of the task step execution.
         """
-        # now = datetime.now()
-        # timestamp = now.strftime("%I:%M %p on %A, %B %d, %Y")
-        timestamp = self.debug_time.strftime("%I:%M %p on %A, %B %d, %Y")
+        timestamp = self.clock.now().strftime("%I:%M %p on %A, %B %d, %Y")
 
         geolocation = get_geolocation()
         location = f"{geolocation['city']}, {geolocation['state']}, {geolocation['country']}"
@@ -220,6 +443,7 @@ class AssistantAgent(Agent):
             timestamp=timestamp,
             location=location,
             agent_context=self.agent_context.get_context(),
+            memories=self.recall(task.goal),
             task=task
         )
         prompt_message = Message(role="user", content=user_prompt)
@@ -228,6 +452,7 @@ class AssistantAgent(Agent):
         messages.append(prompt_message)
         response_messages = self.generate(messages, 
                                       max_length=4096,
-                                      reasoning=True)
+                                      reasoning=True,
+                                      tool_set=tool_set)
         task.message_log.append(prompt_message)
         task.message_log.extend(response_messages)
\ No newline at end of file
@@ -0,0 +1,235 @@
+import json
+from pathlib import Path
+import threading
+
+from agents.agent_context import AgentContext
+from agents.prompt import PromptSet
+from clock import get_clock
+from messages import Message
+from models import Model
+from tasks import Task
+from utils import estimate_tokens
+
+
+# A small model for summaries, so compaction does not compete with the assistant's model
+COMPACTOR_MODEL_NAME = "qwen3:1.7b"
+
+SUMMARY_PREFIX = "CONTEXT SUMMARY:"
+TRANSCRIPT_SUMMARY_PREFIX = "SUMMARY OF EARLIER STEPS:"
+
+
+def message_log_tokens(message_log: list) -> int:
+    """Estimate the token count of a task's message log."""
+    return sum(estimate_tokens(msg.content if isinstance(msg, Message) else msg.get("content", ""))
+               for msg in message_log)
+
+
+class ContextCompactor:
+    """
+    Keeps prompts flat by summarizing old context and task transcripts in the background.
+
+    Once an `AgentContext` or a task's message log passes `token_threshold` estimated tokens, its
+    oldest part is summarized with a model call on the compactor's own worker thread, then swapped
+    for a single summary item in one atomic replacement. Requests are coalesced, so the
+    interactive path only ever pays for a token count and never waits on a summary. The replaced
+    originals are appended to a JSONL archive (cold storage).
+    """
+
+    def __init__(self, model: Model, context_token_threshold: int = 1500, task_token_threshold: int = 6000,
+                 keep_recent_messages: int = 4, archive_path: str | None = "config/context_archive.jsonl",
+                 prompt_dir: str = "agents/prompts/compactor"):
+        """
+        Initialize the ContextCompactor.
+
+        Args:
+            model: The (ideally cheap) model used to write summaries.
+            context_token_threshold: The context size, in estimated tokens, that triggers compaction.
+                Compaction summarizes the oldest unpinned items making up half of the context.
+            task_token_threshold: The message log size, in estimated tokens, that triggers compaction
+                of a task transcript.
+            keep_recent_messages: The number of most recent transcript messages never summarized.
+            archive_path: Path of the JSONL file receiving the originals of compacted items. If None,
+                originals are discarded.
+            prompt_dir: The directory of the summarization prompts.
+        """
+        self.model = model
+        self.context_token_threshold = context_token_threshold
+        self.task_token_threshold = task_token_threshold
+        self.keep_recent_messages = keep_recent_messages
+        self.archive_path = Path(archive_path) if archive_path is not None else None
+        self.prompt_set = PromptSet(prompt_dir)
+        self.compactions = 0
+
+        self._pending_contexts: dict[int, AgentContext] = {}
+        self._pending_tasks: dict[str, Task] = {}
+        self._pending_lock = threading.Lock()
+        self._archive_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, agent_context: AgentContext):
+        """Request compaction of a context whenever an item added to it pushes it over the threshold."""
+        agent_context.add_listener(lambda item: self.maybe_compact_context(agent_context))
+
+    def maybe_compact_context(self, agent_context: AgentContext) -> bool:
+        """
+        Queue a context for compaction if it is over the threshold. Never blocks on the model.
+
+        Returns:
+            bool: True if compaction was requested.
+        """
+        if agent_context.context_tokens <= self.context_token_threshold:
+            return False
+        with self._pending_lock:
+            self._pending_contexts[id(agent_context)] = agent_context
+        self._wakeup.set()
+        return True
+
+    def maybe_compact_task(self, task: Task) -> bool:
+        """
+        Queue a task's transcript for compaction if it is over the threshold. Never blocks on the
+        model.
+
+        Returns:
+            bool: True if compaction was requested.
+        """
+        if message_log_tokens(task.message_log) <= self.task_token_threshold:
+            return False
+        with self._pending_lock:
+            self._pending_tasks[task.task_id] = task
+        self._wakeup.set()
+        return True
+
+    def start(self):
+        """Start the background worker."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="context-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background worker after the compaction in progress, if any."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.run_pending()
+
+    def run_pending(self) -> int:
+        """
+        Run every queued compaction on the calling thread.
+
+        Returns:
+            int: The number of compactions performed.
+        """
+        with self._pending_lock:
+            contexts = list(self._pending_contexts.values())
+            tasks = list(self._pending_tasks.values())
+            self._pending_contexts.clear()
+            self._pending_tasks.clear()
+
+        performed = 0
+        for agent_context in contexts:
+            if self._stop.is_set():
+                break
+            performed += self.compact_context(agent_context)
+        for task in tasks:
+            if self._stop.is_set():
+                break
+            performed += self.compact_task(task)
+        return performed
+
+    def _summarize(self, prompt_name: str, **kwargs) -> str:
+        user_prompt = self.prompt_set[prompt_name](**kwargs)
+        message = self.model.generate([Message(role="user", content=user_prompt)], max_length=1024, temperature=0.2)
+        return message.content.strip()
+
+    def _archive(self, kind: str, originals: list[dict], summary: str):
+        if self.archive_path is None:
+            return
+        record = {
+            "kind": kind,
+            "archived_at": get_clock().now().isoformat(),
+            "summary": summary,
+            "originals": originals
+        }
+        with self._archive_lock:
+            self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.archive_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def compact_context(self, agent_context: AgentContext) -> bool:
+        """
+        Summarize the oldest unpinned items of a context that is over the threshold.
+
+        Returns:
+            bool: True if items were replaced by a summary.
+        """
+        if agent_context.context_tokens <= self.context_token_threshold:
+            return False
+        candidates = sorted((item for item in list(agent_context.context_items.values()) if not item.pinned),
+                            key=lambda item: (item.created_at, item.id))
+        selected, selected_tokens = [], 0
+        for item in candidates:
+            if selected_tokens >= agent_context.context_tokens // 2:
+                break
+            selected.append(item)
+            selected_tokens += estimate_tokens(str(item)) + 1
+        if len(selected) < 2:
+            return False
+
+        summary = self._summarize("summarize_context_prompt", items="\n".join(str(item) for item in selected))
+        replacement = agent_context.replace_items([item.id for item in selected], f"{SUMMARY_PREFIX} {summary}")
+        if replacement is None:
+            # Some of the items were removed while the summary was written; retry on the next trigger
+            return False
+        self._archive("context", [{"id": item.id, "content": item.content, "created_at": item.created_at.isoformat()}
+                                  for item in selected], summary)
+        self.compactions += 1
+        return True
+
+    def compact_task(self, task: Task) -> bool:
+        """
+        Summarize the middle of a task transcript that is over the threshold.
+
+        The messages up to and including the task plan and the `keep_recent_messages` most recent
+        messages are kept; everything in between is replaced with a single summary message.
+
+        Returns:
+            bool: True if messages were replaced by a summary.
+        """
+        with task.lock:
+            message_log = list(task.message_log)
+            log_version = task.log_version
+        if message_log_tokens(message_log) <= self.task_token_threshold:
+            return False
+        head = next((index + 1 for index, msg in enumerate(message_log)
+                     if isinstance(msg, Message) and msg.role == "assistant"), 0)
+        end = len(message_log) - self.keep_recent_messages
+        if end - head < 2:
+            return False
+        middle = message_log[head:end]
+
+        transcript = "\n\n".join(f"{msg.role.upper()}: {msg.content}"
+                                 + "".join(f"\nTOOL CALL: {tool_call}" for tool_call in msg.tool_calls or [])
+                                 for msg in middle if isinstance(msg, Message))
+        summary = self._summarize("summarize_transcript_prompt", task_goal=task.goal, transcript=transcript)
+        summary_message = Message(role="user", content=f"{TRANSCRIPT_SUMMARY_PREFIX}\n{summary}")
+
+        # New steps are only ever appended, so the slice is unchanged if the log was not replaced
+        # (e.g. to plan again) and its messages are the same objects
+        with task.lock:
+            if task.log_version != log_version or any(
+                    current is not original for current, original in zip(task.message_log[head:end], middle)):
+                return False
+            task.message_log[head:end] = [summary_message]
+        self._archive("task", [msg.to_dict() for msg in middle if isinstance(msg, Message)], summary)
+        self.compactions += 1
+        return True
@@ -0,0 +1,180 @@
+from datetime import datetime
+from pathlib import Path
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS context_items (
+    id INTEGER PRIMARY KEY,
+    notification INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    content TEXT NOT NULL,
+    pinned INTEGER NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    removed_at REAL,
+    position REAL
+);
+CREATE INDEX IF NOT EXISTS idx_context_items_live ON context_items (notification, removed_at, expires_at);
+CREATE INDEX IF NOT EXISTS idx_context_items_queue ON context_items (notification, removed_at, priority DESC, id);
+CREATE INDEX IF NOT EXISTS idx_context_items_kind ON context_items (kind, created_at);
+"""
+
+
+class ContextStore:
+    """
+    SQLite persistence for an `AgentContext`'s items and notifications.
+
+    Items and notifications share one table and one id sequence, so ids survive restarts and a
+    context's version is simply the highest id it has seen. Removed items are kept with a
+    `removed_at` timestamp rather than deleted; queries for live items and for the notification
+    queue go through indexes on (removed_at, expires_at) and (priority, id).
+
+    Context items are ordered by `position`, which is their id unless the item replaced others
+    (e.g. a summary), in which case it is the position of the first item replaced.
+    """
+
+    def __init__(self, db_path: str = "config/agent_context.db"):
+        """
+        Initialize the ContextStore.
+
+        Args:
+            db_path: Path to the SQLite database file, or ":memory:".
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        """Bring databases created by older versions up to the current schema."""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(context_items)")}
+        if "position" not in columns:
+            self._conn.execute("ALTER TABLE context_items ADD COLUMN position REAL")
+
+    def max_id(self) -> int:
+        """Get the highest item id ever stored, or 0 if the store is empty."""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM context_items").fetchone()
+        return row[0] or 0
+
+    def insert(self, item, notification: bool = False, priority: int = 0, expires_at: datetime | None = None,
+               position_of: int | None = None):
+        """
+        Store a new context item or notification.
+
+        Args:
+            item (ContextItem): The item to store. Its id is used as the row id.
+            notification (bool, optional): Whether the item is a notification.
+            priority (int, optional): The notification's priority; higher is more urgent.
+            expires_at (datetime | None, optional): When the item expires, if ever.
+            position_of (int | None, optional): The id of an item whose position the new item takes,
+                e.g. the first of the items it replaces. Defaults to the new item's own id.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO context_items"
+                " (id, notification, kind, content, pinned, priority, created_at, expires_at, position)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?,"
+                " COALESCE((SELECT COALESCE(position, id) FROM context_items WHERE id = ?), ?))",
+                (item.id, int(notification), item.kind, item.content, int(item.pinned), priority,
+                 item.created_at.timestamp(), expires_at.timestamp() if expires_at is not None else None,
+                 position_of, item.id)
+            )
+
+    def mark_removed(self, item_ids: list[int], when: datetime):
+        """
+        Mark items as removed. Their rows are kept for `items_since` and cold-storage lookups.
+
+        Args:
+            item_ids (list[int]): The ids of the removed items.
+            when (datetime): The removal time.
+        """
+        if not item_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE context_items SET removed_at = ? WHERE id = ? AND removed_at IS NULL",
+                [(when.timestamp(), item_id) for item_id in item_ids]
+            )
+
+    def remove_all(self, notification: bool, when: datetime):
+        """Mark every live context item, or every live notification, as removed."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE context_items SET removed_at = ? WHERE notification = ? AND removed_at IS NULL",
+                (when.timestamp(), int(notification))
+            )
+
+    def expire(self, now: datetime) -> list[int]:
+        """
+        Mark every live item whose expiry time has passed as removed.
+
+        Args:
+            now (datetime): The current time.
+
+        Returns:
+            list[int]: The ids of the expired items.
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id FROM context_items WHERE removed_at IS NULL AND expires_at IS NOT NULL AND expires_at <= ?",
+                (now.timestamp(),)
+            ).fetchall()
+            expired_ids = [row["id"] for row in rows]
+            self._conn.executemany(
+                "UPDATE context_items SET removed_at = ? WHERE id = ?",
+                [(now.timestamp(), item_id) for item_id in expired_ids]
+            )
+        return expired_ids
+
+    def load_live(self, notification: bool, now: datetime) -> list[sqlite3.Row]:
+        """
+        Get the live (not removed, not expired) context items or notifications.
+
+        Context items are ordered by position; notifications by priority, then id.
+
+        Args:
+            notification (bool): Whether to load notifications rather than context items.
+            now (datetime): The current time, used to skip expired items.
+
+        Returns:
+            list[sqlite3.Row]: The item rows.
+        """
+        order = "priority DESC, id" if notification else "COALESCE(position, id), id"
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM context_items WHERE notification = ? AND removed_at IS NULL"
+                f" AND (expires_at IS NULL OR expires_at > ?) ORDER BY {order}",
+                (int(notification), now.timestamp())
+            ).fetchall()
+
+    def items_since(self, version: int, include_removed: bool = False) -> list[sqlite3.Row]:
+        """
+        Get the items and notifications added after a given version.
+
+        Args:
+            version (int): A previously seen context version (item id).
+            include_removed (bool, optional): Whether to include items removed since.
+
+        Returns:
+            list[sqlite3.Row]: The item rows, ordered by id.
+        """
+        query = "SELECT * FROM context_items WHERE id > ?"
+        if not include_removed:
+            query += " AND removed_at IS NULL"
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY id", (version,)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
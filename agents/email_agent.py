@@ -1,12 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+
 from agents.agent import Agent
+from clock import Clock
 from email_handling.email_objects import EmailThread, EmailMessage
+from email_handling.email_store import EmailStore
+from memory import MemoryStore
 from models.model import Model
 
 
 class EmailAgent(Agent):
-    def __init__(self, model: Model, agent_context=None):
-        super().__init__(model, prompt_dir="agents/prompts/email_agent", agent_context=agent_context)
+    def __init__(self, model: Model, agent_context=None, agent_id: str = "default", clock: Clock | None = None,
+                 memory: MemoryStore | None = None, email_store: EmailStore | None = None,
+                 sort_batch_size: int = 8, sort_workers: int = 2, max_sort_email_chars: int = 2000):
+        """
+        Initialize the EmailAgent.
+
+        Args:
+            model: The model to use for generating responses.
+            agent_context: Optional context shared with other agents.
+            agent_id: The tenant/instance id of the agent.
+            clock: Optional clock the agent reads the time from.
+            memory: Optional long-term memory the email summaries are saved to.
+            email_store: Optional store the categories assigned by `sort_threads` and the thread
+                summaries are persisted in, so finished work is never sent to the model again.
+            sort_batch_size: The number of emails classified per model call. 1 uses the single-email
+                prompt.
+            sort_workers: The number of classification batches run concurrently.
+            max_sort_email_chars: Emails are truncated to this many characters for classification.
+        """
+        super().__init__(model, prompt_dir="agents/prompts/email_agent", agent_context=agent_context,
+                         agent_id=agent_id, clock=clock)
+        self.memory = memory
+        self.email_store = email_store
+        self.sort_batch_size = sort_batch_size
+        self.sort_workers = sort_workers
+        self.max_sort_email_chars = max_sort_email_chars
         self.email_sort_prompt = self.prompt_set["email_sort_prompt"]
+        self.email_batch_sort_prompt = self.prompt_set["email_batch_sort_prompt"]
+        # Statistics of the last `sort_threads` call
+        self.last_sort_stats = {}
 
     def process_email(self, email: EmailMessage) -> str:
         """
@@ -30,6 +64,10 @@ class EmailAgent(Agent):
     def summarize_email(self, email: EmailMessage) -> str:
         """
         Summarizes a single email using the LLM.
+
+        If the agent has a long-term memory, the summary is also stored there. If an exact copy of
+        the email (e.g. another recipient's copy of a blast) has already been summarized, its summary
+        is reused without a model call.
         
         Args:
             email: An EmailMessage object to summarize
@@ -37,6 +75,11 @@ class EmailAgent(Agent):
         Returns:
             A string summary of the email.
         """
+        if self.email_store is not None:
+            inherited = self.email_store.get_cluster_summary(email.message_id)
+            if inherited is not None:
+                return inherited
+
         # Format the email summary prompt with the email details
         user_prompt = self.prompt_set["email_summary_prompt"](email=email.as_formatted_string())
         
@@ -44,11 +87,75 @@ class EmailAgent(Agent):
         prompt_messages = self.make_initial_prompt(user_prompt)
         response_messages = self.generate(prompt_messages, reasoning=False)
 
-        return response_messages[0].content.strip()
+        summary = response_messages[0].content.strip()
+        if self.memory is not None:
+            self.memory.add(f"Email from {email.sender}, subject \"{email.subject}\": {summary}", source="email",
+                            metadata={"message_id": email.message_id})
+        return summary
+
+    def summarize_thread(self, thread: EmailThread) -> str:
+        """
+        Summarize an email thread, reusing its stored summary when possible.
+
+        A stored summary records the last message it covers (its watermark). If the thread has not
+        changed since, the summary is returned without a model call; if replies arrived, only the
+        messages after the watermark are summarized and folded into the stored summary. The whole
+        thread is only read when it has no usable summary, e.g. because the watermark message was
+        deleted. A single-message thread whose message is an exact copy of another summarized
+        single-message thread inherits that summary.
+
+        Args:
+            thread: The thread to summarize, with its messages in order.
+
+        Returns:
+            The summary of the thread, also set as `thread.summary`.
+        """
+        if not thread.messages:
+            return ""
+        stored = self.email_store.get_thread_summary(thread.thread_id) if self.email_store is not None else None
+        message_ids = [msg.message_id for msg in thread.messages]
+        if stored is not None and stored[1] in message_ids:
+            summary, watermark = stored
+            new_messages = thread.messages[message_ids.index(watermark) + 1:]
+            if not new_messages:
+                thread.summary = summary
+                return summary
+            user_prompt = self.prompt_set["thread_summary_update_prompt"](
+                summary=summary,
+                new_messages="\n\n---\n\n".join(msg.as_formatted_string() for msg in new_messages)
+            )
+        else:
+            inherited = (self.email_store.get_cluster_summary(message_ids[0])
+                         if self.email_store is not None and len(message_ids) == 1 else None)
+            if inherited is not None:
+                # An exact copy of a single-message thread, e.g. another copy of a marketing blast
+                thread.summary = inherited
+                self.email_store.set_thread_summary(thread.thread_id, inherited, message_ids[0], 1)
+                return inherited
+            new_messages = thread.messages
+            user_prompt = self.prompt_set["thread_summary_prompt"](thread=thread.as_formatted_string())
+
+        response_messages = self.generate(self.make_initial_prompt(user_prompt), reasoning=False)
+        summary = response_messages[0].content.strip()
+        thread.summary = summary
+        if self.email_store is not None:
+            self.email_store.set_thread_summary(thread.thread_id, summary, message_ids[-1], len(message_ids))
+        if self.memory is not None:
+            first = thread.messages[0]
+            self.memory.add(f"Email thread \"{first.subject}\" ({len(message_ids)} messages): {summary}",
+                            source="email", metadata={"thread_id": thread.thread_id,
+                                                      "new_messages": len(new_messages)})
+        return summary
 
     def sort_threads(self, threads: list[EmailThread]) -> list[str]:
         """
         Sorts email threads into categories based on the first email in each thread.
+
+        Threads whose first email already has stored categories are not classified again, and
+        near-duplicates of a classified email inherit its categories. Of the rest, one
+        representative per near-duplicate cluster is classified; representatives are packed
+        `sort_batch_size` at a time into structured-output requests, with up to `sort_workers`
+        requests in flight. All categories are stored.
         
         Args:
             threads: List of EmailThread objects to categorize
@@ -56,27 +163,110 @@ class EmailAgent(Agent):
         Returns:
             List of category labels, one per thread. Returns None for empty threads.
         """
-        categories = []
-        
-        for thread in threads:
-            if not thread.messages:
-                categories.append(None)
-                continue
-            
-            # Get the first email in the thread
-            first_email = thread.messages[0]
-            
-            # Format the email sort prompt with the email details
-            user_prompt = self.email_sort_prompt(email=first_email.as_formatted_string())
-            
-            # Generate messages and get LLM response
-            messages = self.make_initial_prompt(user_prompt)
-            message = self.model.generate(messages, reasoning=False)
-            
-            # Parse and validate the category
-            category = self._parse_category(message.content)
-            categories.append(category)
-        
+        start = time.perf_counter()
+        first_emails = {thread.messages[0].message_id: thread.messages[0] for thread in threads if thread.messages}
+        known = self.email_store.get_categories(list(first_emails)) if self.email_store is not None else {}
+        unseen = [email for message_id, email in first_emails.items() if message_id not in known]
+
+        # Near-duplicates inherit the categories of a classified cluster member, and only one
+        # representative per remaining cluster goes to the model
+        clusters = ({} if self.email_store is None
+                    else self.email_store.get_clusters([email.message_id for email in unseen]))
+        cluster_categories = self.email_store.get_cluster_categories(list(set(clusters.values()))) if clusters else {}
+        inherited = {}
+        representatives = {}
+        for email in unseen:
+            cluster_id = clusters.get(email.message_id, email.message_id)
+            if cluster_id in cluster_categories:
+                inherited[email.message_id] = cluster_categories[cluster_id]
+            else:
+                representatives.setdefault(cluster_id, []).append(email)
+        to_classify = [members[0] for members in representatives.values()]
+
+        batches = [to_classify[i:i + self.sort_batch_size] for i in range(0, len(to_classify), self.sort_batch_size)]
+        classified = {}
+        if len(batches) > 1 and self.sort_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.sort_workers, len(batches)),
+                                    thread_name_prefix="email-sort") as executor:
+                for batch_categories in executor.map(self._classify_batch, batches):
+                    classified.update(batch_categories)
+        else:
+            for batch in batches:
+                classified.update(self._classify_batch(batch))
+        for members in representatives.values():
+            for email in members[1:]:
+                inherited[email.message_id] = classified[members[0].message_id]
+        # Emails the model gave no category are not stored, so they are classified again next time
+        stored = {message_id: labels for message_id, labels in {**classified, **inherited}.items() if labels}
+        if self.email_store is not None and stored:
+            self.email_store.set_categories(stored)
+
+        known.update(inherited)
+        known.update(classified)
+        categories = [known.get(thread.messages[0].message_id) if thread.messages else None for thread in threads]
+
+        elapsed = time.perf_counter() - start
+        self.last_sort_stats = {
+            "threads": len(threads),
+            "classified": len(classified),
+            "inherited": len(inherited),
+            "cached": len(first_emails) - len(unseen),
+            "batches": len(batches),
+            "seconds": elapsed,
+            "threads_per_second": len(threads) / elapsed if elapsed > 0 else float("inf")
+        }
+        print(f"Sorted {len(threads)} threads ({len(classified)} classified in {len(batches)} batches, "
+              f"{len(inherited)} inherited from near-duplicates, {self.last_sort_stats['cached']} cached) "
+              f"in {elapsed:.2f}s: "
+              f"{self.last_sort_stats['threads_per_second']:.1f} threads/sec")
+        return categories
+
+    def _format_for_sort(self, email: EmailMessage) -> str:
+        formatted = email.as_formatted_string()
+        if len(formatted) > self.max_sort_email_chars:
+            formatted = formatted[:self.max_sort_email_chars] + "\n[...]"
+        return formatted
+
+    def _classify_one(self, email: EmailMessage) -> list[str]:
+        user_prompt = self.email_sort_prompt(email=self._format_for_sort(email))
+        message = self.model.generate(self.make_initial_prompt(user_prompt), reasoning=False)
+        return self._parse_category(message.content)
+
+    def _classify_batch(self, emails: list[EmailMessage]) -> dict[str, list[str]]:
+        """
+        Classify several emails with one model call.
+
+        Emails missing from the model's answer or given no category, or all of them if the answer
+        is not valid JSON, are classified one by one instead.
+
+        Returns:
+            dict[str, list[str]]: The categories of each email by message ID.
+        """
+        if len(emails) == 1:
+            return {emails[0].message_id: self._classify_one(emails[0])}
+
+        user_prompt = self.email_batch_sort_prompt(
+            emails=[(email.message_id, self._format_for_sort(email)) for email in emails]
+        )
+        message = self.model.generate(self.make_initial_prompt(user_prompt), reasoning=False, format="json")
+        try:
+            answer = json.loads(message.content)
+        except json.JSONDecodeError:
+            answer = {}
+        if not isinstance(answer, dict):
+            answer = {}
+
+        categories = {}
+        for email in emails:
+            labels = answer.get(email.message_id)
+            if isinstance(labels, str):
+                labels = self._parse_category(labels)
+            elif isinstance(labels, list):
+                labels = [str(label).strip().upper() for label in labels if str(label).strip()]
+            else:
+                labels = []
+            # An empty answer would be cached forever, so it counts as missing
+            categories[email.message_id] = labels if labels else self._classify_one(email)
         return categories
 
     def _parse_category(self, response: str) -> list[str]:
@@ -93,6 +283,6 @@ class EmailAgent(Agent):
         cleaned_response = response.strip().upper()
 
         # Separate comma-separated categories and validate each
-        category_list = [cat.strip() for cat in cleaned_response.split(",")]
+        category_list = [cat.strip() for cat in cleaned_response.split(",") if cat.strip()]
 
         return category_list
\ No newline at end of file
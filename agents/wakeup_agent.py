@@ -1,14 +1,14 @@
-from datetime import datetime
-
 from agents.agent import Agent
 from agents.agent_context import AgentContext
+from clock import Clock
 from models.model import Model
 from utils import get_geolocation
 
 
 class WakeupAgent(Agent):
-    def __init__(self, model: Model, prompt_dir="agents/prompts/wakeup_agent", agent_context: AgentContext | None = None):
-        super().__init__(model, prompt_dir, agent_context)
+    def __init__(self, model: Model, prompt_dir="agents/prompts/wakeup_agent", agent_context: AgentContext | None = None,
+                 agent_id: str = "default", clock: Clock | None = None):
+        super().__init__(model, prompt_dir, agent_context, agent_id=agent_id, clock=clock)
 
     def agent_as_tool(self) -> callable:
         """
@@ -51,11 +51,9 @@ class WakeupAgent(Agent):
         Returns:
             str: The generated morning wakeup message.
         """
-        now = datetime.now()
+        now = self.clock.now()
         current_time = now.strftime("%I:%M %p")
         current_date = now.strftime("%A, %B %d, %Y")
-        current_time = "07:00 AM"  # For consistent testing
-        current_date = "Monday, November 5, 2025"  # For consistent testing
 
         geolocation = get_geolocation()
         lat = geolocation["lat"]
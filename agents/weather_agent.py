@@ -1,15 +1,16 @@
-from datetime import datetime
 import json
 
 from agents.agent import Agent
 from agents.agent_context import AgentContext
+from clock import Clock
 from models.model import Model
 from utils import get_geolocation, get_weather_data
 
 
 class WeatherAgent(Agent):
-    def __init__(self, model: Model, prompt_dir="agents/prompts/weather_agent", agent_context: AgentContext | None = None):
-        super().__init__(model, prompt_dir, agent_context)
+    def __init__(self, model: Model, prompt_dir="agents/prompts/weather_agent", agent_context: AgentContext | None = None,
+                 agent_id: str = "default", clock: Clock | None = None):
+        super().__init__(model, prompt_dir, agent_context, agent_id=agent_id, clock=clock)
 
     def agent_as_tool(self) -> callable:
         """
@@ -43,7 +44,7 @@ class WeatherAgent(Agent):
         current_weather = json.dumps(weather_data["current"], indent=2)
         daily_weather_data = json.dumps(weather_data["daily"][0], indent=2)
 
-        now = datetime.now()
+        now = self.clock.now()
         current_time = now.strftime("%I:%M %p")
 
         user_prompt = self.prompt_set["morning_report_prompt"](
@@ -0,0 +1,43 @@
+"""
+Report the token savings and throughput of the email body cleaning pipeline.
+
+Cleans every message of an email store (by default the local Gmail database) and compares the
+estimated tokens of the raw bodies against their cleaned "LLM view".
+
+Run from the repository root:
+
+    python -m benchmarks.bench_email_cleaning --db config/gmail.db
+"""
+import argparse
+import time
+
+from email_handling.email_cleaner import clean_body
+from email_handling.email_store import EmailStore
+from utils import estimate_tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report email body cleaning token savings.")
+    parser.add_argument("--db", default="config/gmail.db", help="The email store to read.")
+    parser.add_argument("--top", type=int, default=5, help="How many of the most reduced emails to list.")
+    args = parser.parse_args()
+
+    store = EmailStore(args.db, legacy_json_path=None)
+    messages = [msg for thread in store.get_all_threads() for msg in thread.messages]
+
+    start = time.perf_counter()
+    cleaned = [clean_body(msg.body) for msg in messages]
+    elapsed = time.perf_counter() - start
+
+    raw_tokens = [estimate_tokens(msg.body) for msg in messages]
+    clean_tokens = [estimate_tokens(text) for text in cleaned]
+    total_raw, total_clean = sum(raw_tokens), sum(clean_tokens)
+    print(f"Messages:       {len(messages)}")
+    print(f"Raw tokens:     {total_raw}")
+    print(f"Cleaned tokens: {total_clean} ({100 * (total_raw - total_clean) / max(total_raw, 1):.1f}% saved)")
+    print(f"Throughput:     {len(messages) / elapsed if elapsed > 0 else float('inf'):.0f} messages/sec")
+
+    most_reduced = sorted(range(len(messages)), key=lambda i: clean_tokens[i] - raw_tokens[i])[:args.top]
+    for i in most_reduced:
+        print(f"  {raw_tokens[i]:6d} -> {clean_tokens[i]:5d}  {messages[i].sender[:40]}: {messages[i].subject[:50]}")
+    store.close()
@@ -0,0 +1,115 @@
+"""
+Benchmark top-N unread email queries on a synthetic mailbox.
+
+Compares the old approach of loading every unread message and sorting by re-parsed timestamp
+strings against the indexed `EmailStore.get_unread_messages(limit=...)` query.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_unread --messages 100000
+"""
+import argparse
+from datetime import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from email_handling.email_objects import EmailMessage, EmailThread, TIMESTAMP_FORMAT, format_timestamp
+from email_handling.email_store import EmailStore
+
+
+def build_mailbox(store: EmailStore, messages: int, unread_fraction: float, messages_per_thread: int = 4,
+                  seed: int = 0) -> list[str]:
+    """
+    Fill a store with synthetic threads spread over the last two years.
+
+    Returns:
+        list[str]: The ids of the unread messages.
+    """
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    two_years_ms = 2 * 365 * 24 * 3600 * 1000
+    threads, read_ids, unread_ids = [], [], []
+    for thread_index in range(0, messages, messages_per_thread):
+        thread_messages = []
+        for message_index in range(thread_index, min(thread_index + messages_per_thread, messages)):
+            internal_date = now_ms - rng.randrange(two_years_ms)
+            msg = EmailMessage(
+                subject=f"Synthetic subject {message_index}",
+                sender=f"sender{rng.randrange(500)}@example.com",
+                recipients=["me@example.com"],
+                body="Lorem ipsum dolor sit amet. " * 8,
+                timestamp=format_timestamp(internal_date),
+                labels=["INBOX"],
+                message_id=f"m{message_index}",
+                internal_date=internal_date
+            )
+            thread_messages.append(msg)
+            (unread_ids if rng.random() < unread_fraction else read_ids).append(msg.message_id)
+        threads.append(EmailThread(thread_id=f"t{thread_index}", timestamp=thread_messages[0].timestamp,
+                                   messages=thread_messages))
+        if len(threads) == 1000:
+            store.upsert_threads(threads)
+            threads = []
+    store.upsert_threads(threads)
+    store.mark_read(read_ids)
+    return unread_ids
+
+
+def baseline_top_n(store: EmailStore, count: int) -> list[EmailMessage]:
+    """The previous implementation: load every unread message, then sort by parsed timestamp."""
+    def parse(msg):
+        try:
+            return datetime.strptime(msg.timestamp, TIMESTAMP_FORMAT)
+        except ValueError:
+            return datetime.min
+
+    unread = store.get_unread_messages()
+    unread.sort(key=parse, reverse=True)
+    return unread[:count]
+
+
+def time_call(function, repeats: int) -> float:
+    """Return the best wall-clock time of `repeats` calls, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark top-N unread email queries.")
+    parser.add_argument("--messages", type=int, default=100_000, help="Messages in the synthetic mailbox.")
+    parser.add_argument("--unread", type=float, default=0.2, help="Fraction of messages left unread.")
+    parser.add_argument("--count", type=int, default=5, help="N in the top-N query.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions; the best is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = EmailStore(str(Path(tmp_dir) / "bench.db"), legacy_json_path=None)
+        start = time.perf_counter()
+        unread_ids = build_mailbox(store, args.messages, args.unread)
+        print(f"Built {args.messages} messages ({len(unread_ids)} unread) in {time.perf_counter() - start:.1f}s")
+
+        plan = store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE agent_read = 0 ORDER BY internal_date DESC LIMIT ?",
+            (args.count,)
+        ).fetchall()
+        print("Query plan: " + "; ".join(row["detail"] for row in plan))
+
+        baseline = baseline_top_n(store, args.count)
+        indexed = store.get_unread_messages(limit=args.count)
+        # Formatted timestamps have minute resolution, so compare dates rather than ids
+        assert [msg.timestamp for msg in baseline] == [msg.timestamp for msg in indexed]
+
+        baseline_ms = time_call(lambda: baseline_top_n(store, args.count), args.repeats)
+        indexed_ms = time_call(lambda: store.get_unread_messages(limit=args.count), args.repeats)
+        mark_read_ms = time_call(lambda: (store.mark_read([indexed[0].message_id]),
+                                          store.mark_read([indexed[0].message_id], read=False)), args.repeats)
+        print(f"Top {args.count} unread, scan and sort: {baseline_ms:9.2f} ms")
+        print(f"Top {args.count} unread, indexed:       {indexed_ms:9.2f} ms  ({baseline_ms / indexed_ms:.0f}x)")
+        print(f"Mark read and unread again:   {mark_read_ms:9.2f} ms")
+        store.close()
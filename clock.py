@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import threading
+import time
+
+
+class Clock:
+    """
+    Source of the current time for agents, tools and the scheduler.
+
+    Everything that needs "now" asks a `Clock` instead of calling `datetime.now()` directly, so a
+    run can be moved onto simulated time.
+    """
+
+    def now(self) -> datetime:
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def sleep(self, seconds: float):
+        raise NotImplementedError("Subclasses must implement this method.")
+
+
+class SystemClock(Clock):
+    """The real wall clock."""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """
+    A clock whose time only moves when told to.
+
+    Time is advanced explicitly with `advance` or `set`, or by `sleep`, which returns immediately
+    after moving the clock forward. This lets a replay cover a day in seconds.
+    """
+
+    def __init__(self, start: datetime):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def set(self, when: datetime):
+        """Move the clock to `when`. The clock never moves backwards."""
+        with self._lock:
+            if when > self._now:
+                self._now = when
+
+    def advance(self, delta: timedelta):
+        """Move the clock forward by `delta`."""
+        with self._lock:
+            self._now += delta
+
+    def sleep(self, seconds: float):
+        self.advance(timedelta(seconds=seconds))
+
+
+CLOCK: Clock = SystemClock()
+
+
+def get_clock() -> Clock:
+    """Get the process-wide clock."""
+    return CLOCK
+
+
+def set_clock(clock: Clock):
+    """
+    Replace the process-wide clock, e.g. with a `SimulatedClock` for replays and tests.
+
+    Args:
+        clock (Clock): The clock to use from now on.
+    """
+    global CLOCK
+    CLOCK = clock
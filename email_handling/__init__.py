@@ -1,5 +1,9 @@
+from .email_cleaner import clean_body, html_to_text
 from .email_objects import EmailMessage, EmailThread
+from .near_duplicates import MinHasher
+from .email_store import EmailStore
 from .gmail_handler import get_credentials, GmailHandler, GMAIL_HANDLER
+from .email_sync import EmailSyncWorker
 
 
-__all__ = ["EmailMessage", "EmailThread", "get_credentials", "GmailHandler", "GMAIL_HANDLER"]
\ No newline at end of file
+__all__ = ["clean_body", "html_to_text", "EmailMessage", "EmailThread", "MinHasher", "EmailStore", "get_credentials", "GmailHandler", "GMAIL_HANDLER", "EmailSyncWorker"]
\ No newline at end of file
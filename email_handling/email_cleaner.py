@@ -0,0 +1,257 @@
+from html import unescape
+from html.parser import HTMLParser
+import re
+from urllib.parse import urlsplit
+
+
+# Bump whenever the cleaning rules change, so stored clean bodies are recomputed
+CLEANER_VERSION = 2
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"')\]]+")
+# Links at most this long without a query string are kept verbatim, e.g. meeting links
+MAX_KEPT_URL_LENGTH = 60
+
+# Markers after which the rest of a message is a quoted earlier message. Forwarded messages are
+# the content of the email, so "Forwarded message" markers are deliberately not quote headers.
+QUOTE_HEADER_PATTERNS = [
+    re.compile(r"^On .{5,200}wrote:\s*$", re.IGNORECASE | re.DOTALL),
+    re.compile(r"^-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+]
+FORWARD_HEADER_PATTERN = re.compile(r"^-{2,}\s*Forwarded message\s*-{2,}\s*$|^Begin forwarded message:\s*$",
+                                    re.IGNORECASE)
+# Outlook-style quote header: a "From:" line followed by "Sent:" or "Date:", optionally preceded
+# by a line of underscores
+OUTLOOK_SEPARATOR_PATTERN = re.compile(r"^_{10,}$")
+OUTLOOK_FROM_PATTERN = re.compile(r"^\*?From:\*?\s.+$", re.IGNORECASE)
+OUTLOOK_DATE_PATTERN = re.compile(r"^\*?(Sent|Date):\*?\s.+$", re.IGNORECASE)
+SIGNATURE_DELIMITER_PATTERN = re.compile(r"^--$")
+SIGNATURE_PATTERNS = [
+    re.compile(r"^Sent from my \w+", re.IGNORECASE),
+    re.compile(r"^Get Outlook for \w+", re.IGNORECASE),
+]
+# A "--" line only starts a signature if at most this many lines follow it; otherwise it is a
+# separator inside the message
+MAX_SIGNATURE_LINES = 6
+# Sentences that only appear in email headers and footers
+FOOTER_SENTENCE_PATTERN = re.compile(
+    r"you are receiving this|you received this (email|message)|no longer wish to receive|"
+    r"(click here |here )?to unsubscribe\b|unsubscribe (here|from (this|these|our|all) (list|emails|mailings))|"
+    r"all rights reserved|^\s*(©|\(c\)|copyright)\s|add us to your address book|"
+    r"do not reply to this (email|message)",
+    re.IGNORECASE
+)
+# Link labels of email headers and footers; a line made only of these is boilerplate
+FOOTER_LINK_PATTERN = re.compile(
+    r"unsubscribe|view (this email )?(in|as a) (web )?(browser|web ?page)|view web version|"
+    r"manage (your )?(email )?preferences|update (your )?preferences|(email )?preferences|"
+    r"privacy policy|privacy|terms of (use|service)|terms|contact us|help center|\[link(: [^\]]*)?\]",
+    re.IGNORECASE
+)
+# Footers are only looked for in messages with more lines than this, so short personal emails
+# that happen to mention e.g. a privacy policy are kept whole
+MIN_FOOTER_MESSAGE_LINES = 6
+# Zero-width and soft hyphen characters newsletters pad their preview text with
+INVISIBLE_PATTERN = re.compile("[\u00ad\u034f\u200b-\u200f\u2060\ufeff]")
+HTML_DOCUMENT_PATTERN = re.compile(r"^\s*(<!DOCTYPE html|<html[\s>])", re.IGNORECASE)
+# Longer lines are prose, never dropped as boilerplate even if they mention e.g. unsubscribing
+MAX_FOOTER_LINE_LENGTH = 200
+# Lines with no letters or digits, e.g. separators and leftover bullets
+EMPTY_LINE_PATTERN = re.compile(r"^[\W_]*$")
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document, keeping block structure as line breaks."""
+
+    BLOCK_TAGS = {"p", "div", "br", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol",
+                  "blockquote", "section", "article", "header", "footer", "hr"}
+    SKIPPED_TAGS = {"script", "style", "head", "title", "noscript"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in ("td", "th"):
+            self.parts.append(" ")
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in ("br", "hr"):
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._skip_depth == 0:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """
+    Convert an HTML email body to plain text.
+
+    Scripts, styles and the document head are dropped, and block elements become line breaks.
+    Link targets are dropped; the link text is kept.
+
+    Args:
+        html (str): The HTML body.
+
+    Returns:
+        str: The visible text.
+    """
+    extractor = _HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    text = "".join(extractor.parts).replace("\xa0", " ")
+    return re.sub(r"[ \t]+", " ", text)
+
+
+def shorten_url(url: str) -> str:
+    """
+    Shorten a URL for an LLM prompt.
+
+    Short links without a query string are kept; long or tracking links are reduced to their
+    domain, which is all a model can use anyway.
+
+    Returns:
+        str: The URL, or a "[link: domain]" marker.
+    """
+    parts = urlsplit(url)
+    if len(url) <= MAX_KEPT_URL_LENGTH and not parts.query:
+        return url
+    return f"[link: {parts.netloc}]" if parts.netloc else "[link]"
+
+
+def is_outlook_header(line: str, following: list[str]) -> bool:
+    """Check whether a line starts an Outlook-style "From:" header, given the lines after it."""
+    return (OUTLOOK_FROM_PATTERN.match(line) is not None
+            and any(OUTLOOK_DATE_PATTERN.match(next_line) for next_line in following))
+
+
+def trim_quoted_reply(lines: list[str]) -> list[str]:
+    """
+    Cut a message at the start of its quoted reply chain, and drop ">"-quoted lines.
+
+    A quote header is only looked for after the first line with content, so a message is never cut
+    to nothing. Forwarded messages are kept, including their "From:"/"Date:" header.
+    """
+    seen_content = False
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if FORWARD_HEADER_PATTERN.match(stripped):
+            break
+        if not seen_content:
+            seen_content = not EMPTY_LINE_PATTERN.match(stripped)
+            continue
+        following = [next_line.strip() for next_line in lines[index + 1:index + 4]]
+        # "On <date>, <name> wrote:" is often wrapped over two lines
+        candidates = [stripped] + ([stripped + " " + following[0]] if following else [])
+        is_quote_header = any(pattern.match(candidate) for pattern in QUOTE_HEADER_PATTERNS for candidate in candidates)
+        if is_quote_header or is_outlook_header(stripped, following[:2]) or (
+                OUTLOOK_SEPARATOR_PATTERN.match(stripped) and following
+                and is_outlook_header(following[0], following[1:])):
+            lines = lines[:index]
+            break
+    return [line for line in lines if not line.lstrip().startswith(">")]
+
+
+def is_footer_line(line: str) -> bool:
+    """
+    Check whether a line is email header or footer boilerplate.
+
+    A line is boilerplate if it is a typical footer sentence ("You are receiving this email
+    because...") or consists only of footer link labels ("Unsubscribe | Privacy Policy"). A line
+    merely mentioning e.g. unsubscribing is not.
+    """
+    if len(line) > MAX_FOOTER_LINE_LENGTH:
+        return False
+    if FOOTER_SENTENCE_PATTERN.search(line):
+        return True
+    return FOOTER_LINK_PATTERN.search(line) is not None and EMPTY_LINE_PATTERN.match(
+        FOOTER_LINK_PATTERN.sub("", line)) is not None
+
+
+def remove_signature_and_footer(lines: list[str]) -> list[str]:
+    """
+    Cut a message at its signature and drop boilerplate lines.
+
+    Boilerplate is only looked for in messages longer than a few lines, and there only in the first
+    few lines ("view in browser" headers) and the last third of the message (footers).
+    """
+    for index, line in enumerate(lines[1:], start=1):
+        stripped = line.strip()
+        if any(pattern.match(stripped) for pattern in SIGNATURE_PATTERNS):
+            lines = lines[:index]
+            break
+        if SIGNATURE_DELIMITER_PATTERN.match(stripped):
+            remaining = [next_line for next_line in lines[index + 1:] if next_line.strip()]
+            if len(remaining) <= MAX_SIGNATURE_LINES:
+                lines = lines[:index]
+                break
+    content_lines = [index for index, line in enumerate(lines) if line.strip()]
+    if len(content_lines) <= MIN_FOOTER_MESSAGE_LINES:
+        return lines
+    header_end = content_lines[3] if len(content_lines) > 3 else len(lines)
+    footer_start = content_lines[len(content_lines) * 2 // 3]
+    return [line for index, line in enumerate(lines)
+            if not ((index < header_end or index >= footer_start) and is_footer_line(line))]
+
+
+def looks_like_html(body: str) -> bool:
+    """Check whether a body is an HTML document, e.g. one stored by an older version as is."""
+    return HTML_DOCUMENT_PATTERN.match(body) is not None
+
+
+def clean_body(body: str, is_html: bool | None = None) -> str:
+    """
+    Produce the compact "LLM view" of an email body.
+
+    The pipeline converts HTML to text, decodes leftover HTML entities, drops invisible padding
+    characters, shortens or drops links, trims quoted reply chains, removes signatures and footers,
+    and collapses whitespace. Lines that were nothing but a link are dropped entirely.
+
+    Args:
+        body (str): The raw body.
+        is_html (bool | None, optional): Whether the body is HTML. If None, it is detected.
+
+    Returns:
+        str: The cleaned body.
+    """
+    if is_html is None:
+        is_html = looks_like_html(body)
+    text = html_to_text(body) if is_html else unescape(body)
+    text = INVISIBLE_PATTERN.sub("", text).replace("\xa0", " ")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    lines = []
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if URL_PATTERN.fullmatch(stripped) and shorten_url(stripped) != stripped:
+            # A bare tracking link, typically an image or button link of a newsletter
+            continue
+        lines.append(URL_PATTERN.sub(lambda match: shorten_url(match.group(0)), line).rstrip())
+
+    lines = trim_quoted_reply(lines)
+    lines = remove_signature_and_footer(lines)
+
+    cleaned = []
+    for line in lines:
+        line = re.sub(r"[ \t]{2,}", " ", line).strip()
+        if EMPTY_LINE_PATTERN.match(line):
+            if cleaned and cleaned[-1] != "":
+                cleaned.append("")
+            continue
+        if cleaned and line == cleaned[-1]:
+            continue
+        cleaned.append(line)
+    return "\n".join(cleaned).strip()
@@ -1,4 +1,30 @@
 from base64 import urlsafe_b64decode
+from datetime import datetime
+
+from email_handling.email_cleaner import clean_body
+
+
+TIMESTAMP_FORMAT = "%I:%M %p on %A, %B %d, %Y"
+
+
+def format_timestamp(internal_date: int) -> str:
+    """Format a Gmail `internalDate` (epoch milliseconds) the way emails are shown to agents."""
+    return datetime.fromtimestamp(internal_date / 1000).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """
+    Convert a formatted timestamp back to epoch milliseconds.
+
+    Only needed for messages stored before `internal_date` was kept.
+
+    Returns:
+        int: The epoch milliseconds, or 0 if the timestamp cannot be parsed.
+    """
+    try:
+        return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp() * 1000)
+    except (ValueError, TypeError):
+        return 0
 
 
 class EmailMessage:
@@ -13,7 +39,9 @@ class EmailMessage:
         body: str,
         timestamp: str,
         labels: list[str] | None = None,
-        message_id: str = ""
+        message_id: str = "",
+        internal_date: int = 0,
+        llm_body: str | None = None
     ):
         self.subject = subject
         self.sender = sender
@@ -22,18 +50,23 @@ class EmailMessage:
         self.timestamp = timestamp
         self.labels = labels if labels is not None else []
         self.message_id = message_id
+        # Gmail's internalDate in epoch milliseconds; used for sorting, `timestamp` is for display
+        self.internal_date = internal_date
+        # Compact body sent to LLMs: links shortened, quoted replies, signatures and footers removed
+        self.llm_body = llm_body if llm_body is not None else clean_body(body)
         self.agent_read = False
 
     @property
     def recipients_str(self) -> str:
         return ", ".join(self.recipients)
 
-    def as_formatted_string(self) -> str:
+    def as_formatted_string(self, raw: bool = False) -> str:
+        """Format the email for a prompt, with its cleaned body unless `raw` is True."""
         return (f"From: {self.sender}\n"
                 f"To: {self.recipients_str}\n"
                 f"Subject: {self.subject}\n"
                 f"Date: {self.timestamp}\n\n"
-                f"{self.body}")
+                f"{self.body if raw else self.llm_body}")
 
     def to_dict(self) -> dict:
         """Convert EmailMessage to a dictionary."""
@@ -42,9 +75,11 @@ class EmailMessage:
             'sender': self.sender,
             'recipients': self.recipients,
             'body': self.body,
+            'llm_body': self.llm_body,
             'timestamp': self.timestamp,
             'labels': self.labels,
             'message_id': self.message_id,
+            'internal_date': self.internal_date,
             'agent_read': self.agent_read
         }
 
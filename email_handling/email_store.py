@@ -0,0 +1,738 @@
+import json
+from email.utils import parseaddr
+from pathlib import Path
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from email_handling.email_cleaner import CLEANER_VERSION, clean_body
+from email_handling.email_objects import EmailMessage, EmailThread, parse_timestamp
+from email_handling.near_duplicates import MinHasher
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    history_id TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    position INTEGER NOT NULL DEFAULT 0,
+    subject TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    body TEXT NOT NULL,
+    llm_body TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL,
+    internal_date INTEGER NOT NULL DEFAULT 0,
+    agent_read INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS message_labels (
+    message_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    PRIMARY KEY (message_id, label)
+);
+CREATE TABLE IF NOT EXISTS message_categories (
+    message_id TEXT PRIMARY KEY,
+    categories TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS thread_summaries (
+    thread_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    last_message_id TEXT NOT NULL,
+    message_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS message_signatures (
+    message_id TEXT PRIMARY KEY,
+    signature BLOB,
+    cluster_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signature_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    message_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Created after `_add_missing_columns`, since they may index columns older databases lack
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages (thread_id, position);
+DROP INDEX IF EXISTS idx_messages_agent_read;
+CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages (internal_date DESC) WHERE agent_read = 0;
+CREATE INDEX IF NOT EXISTS idx_message_labels_label ON message_labels (label, message_id);
+CREATE INDEX IF NOT EXISTS idx_message_signatures_cluster ON message_signatures (cluster_id);
+CREATE INDEX IF NOT EXISTS idx_signature_bands_bucket ON signature_bands (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_signature_bands_message ON signature_bands (message_id);
+"""
+
+# Full-text index over messages, kept in sync by triggers so every sync updates it incrementally.
+# It is an external-content table: it reads subject, sender and the cleaned body from `messages`
+# by rowid instead of storing its own copy. Indexing the cleaned body keeps tracking links and
+# footers out of matches and snippets.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, llm_body, content='messages', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, subject, sender, llm_body) VALUES (new.rowid, new.subject, new.sender, new.llm_body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, llm_body)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.llm_body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF subject, sender, llm_body ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, llm_body)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.llm_body);
+    INSERT INTO messages_fts (rowid, subject, sender, llm_body) VALUES (new.rowid, new.subject, new.sender, new.llm_body);
+END;
+"""
+FTS_TRIGGERS = ["messages_fts_insert", "messages_fts_delete", "messages_fts_update"]
+
+# Near-duplicates must share at least this fraction of their subject words
+MIN_SUBJECT_SIMILARITY = 0.5
+
+# Relative weight of matches in the subject, sender and body columns when ranking search results
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+class EmailStore:
+    """
+    SQLite store of Gmail messages, threads and labels.
+
+    Writes are incremental: a sync upserts only the threads and messages it fetched, and reads
+    load only the rows asked for. The database runs in WAL mode so reads are not blocked by a sync
+    writing in the background. A legacy JSON database is migrated once on first open.
+
+    Every new message is assigned a near-duplicate cluster on insert: its MinHash signature is
+    looked up in the LSH band buckets of the cluster representatives from the same sender, and it
+    joins the cluster of the most similar representative with a similar subject, if above
+    `duplicate_threshold`. Otherwise it starts, and represents, a cluster of its own.
+    """
+
+    def __init__(self, db_path: str = "config/gmail.db", legacy_json_path: str | None = "config/gmail_db.json",
+                 hasher: MinHasher | None = None, duplicate_threshold: float = 0.8):
+        """
+        Initialize the EmailStore.
+
+        Args:
+            db_path: Path to the SQLite database file, or ":memory:".
+            legacy_json_path: Path of a JSON database written by older versions of `GmailHandler`.
+                It is imported the first time the store is opened, and left in place.
+            hasher: The MinHasher used for near-duplicate detection. Must be configured the same
+                every time a database is opened. Defaults to a `MinHasher`.
+            duplicate_threshold: The estimated Jaccard similarity above which two messages are
+                near-duplicates.
+        """
+        self.hasher = hasher if hasher is not None else MinHasher()
+        self.duplicate_threshold = duplicate_threshold
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock, self._conn:
+            if db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._add_missing_columns()
+            self._conn.executescript(INDEXES)
+            self._clean_bodies()
+            self._create_fts()
+            self._index_missing_signatures()
+        if legacy_json_path is not None and self.get_meta("json_migrated") is None:
+            self.migrate_json(legacy_json_path)
+
+    def _add_missing_columns(self):
+        """Bring databases created by older versions up to the current schema."""
+        thread_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(threads)")}
+        if "history_id" not in thread_columns:
+            self._conn.execute("ALTER TABLE threads ADD COLUMN history_id TEXT")
+        message_columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if "internal_date" not in message_columns:
+            self._conn.execute("ALTER TABLE messages ADD COLUMN internal_date INTEGER NOT NULL DEFAULT 0")
+            # Parse the formatted timestamps once here instead of on every read
+            rows = self._conn.execute("SELECT message_id, timestamp FROM messages").fetchall()
+            self._conn.executemany(
+                "UPDATE messages SET internal_date = ? WHERE message_id = ?",
+                [(parse_timestamp(row["timestamp"]), row["message_id"]) for row in rows]
+            )
+        if "llm_body" not in message_columns:
+            self._conn.execute("ALTER TABLE messages ADD COLUMN llm_body TEXT NOT NULL DEFAULT ''")
+
+    def _clean_bodies(self):
+        """Recompute the cleaned bodies of stored messages if the cleaning rules changed."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'cleaner_version'").fetchone()
+        if row is not None and row["value"] == str(CLEANER_VERSION):
+            return
+        rows = self._conn.execute("SELECT message_id, body FROM messages").fetchall()
+        self._conn.executemany(
+            "UPDATE messages SET llm_body = ? WHERE message_id = ?",
+            [(clean_body(row["body"]), row["message_id"]) for row in rows]
+        )
+        # Signatures are computed from the cleaned body; recompute them too
+        self._conn.execute("DELETE FROM message_signatures")
+        self._conn.execute("DELETE FROM signature_bands")
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('cleaner_version', ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (str(CLEANER_VERSION),)
+        )
+
+    def _create_fts(self):
+        """Create the full-text index, indexing existing messages if the index is new."""
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(messages_fts)")]
+        if columns and "llm_body" not in columns:
+            # Older versions indexed the raw body
+            for trigger in FTS_TRIGGERS:
+                self._conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            self._conn.execute("DROP TABLE messages_fts")
+            columns = []
+        self._conn.executescript(FTS_SCHEMA)
+        if not columns:
+            self._conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+    def _index_missing_signatures(self):
+        """Assign clusters to messages stored before near-duplicate detection, oldest first."""
+        rows = self._conn.execute(
+            "SELECT message_id, subject, sender, llm_body FROM messages WHERE message_id NOT IN"
+            " (SELECT message_id FROM message_signatures) ORDER BY internal_date"
+        ).fetchall()
+        for row in rows:
+            self._assign_cluster(row["message_id"], row["subject"], row["sender"], row["llm_body"])
+
+    @staticmethod
+    def _sender_address(sender: str) -> str:
+        return parseaddr(sender)[1].lower() or sender.lower()
+
+    def _assign_cluster(self, message_id: str, subject: str, sender: str, llm_body: str) -> str:
+        """
+        Index a message's MinHash signature and assign it a cluster. Must be called inside a
+        transaction.
+
+        Returns:
+            str: The cluster id, which is the id of the cluster's first message.
+        """
+        signature = self.hasher.signature(f"{subject}\n{llm_body}")
+        cluster_id = message_id
+        if signature is not None:
+            sender_address = self._sender_address(sender)
+            band_keys = self.hasher.band_keys(signature, namespace=sender_address)
+            # An OR of equalities, unlike a row-value IN, lets SQLite search the bucket index per band
+            buckets = " OR ".join("(b.band = ? AND b.bucket = ?)" for _ in band_keys)
+            candidates = self._conn.execute(
+                "SELECT DISTINCT s.message_id, s.signature, s.cluster_id, m.sender, m.subject FROM signature_bands b"
+                " JOIN message_signatures s ON s.message_id = b.message_id"
+                " JOIN messages m ON m.message_id = b.message_id"
+                f" WHERE ({buckets}) AND b.message_id != ?",
+                [value for band, key in enumerate(band_keys) for value in (band, key)] + [message_id]
+            ).fetchall()
+            best_similarity = self.duplicate_threshold
+            for candidate in candidates:
+                if (self._sender_address(candidate["sender"]) != sender_address
+                        or self.hasher.subject_similarity(subject, candidate["subject"]) < MIN_SUBJECT_SIMILARITY):
+                    continue
+                similarity = self.hasher.similarity(signature, np.frombuffer(candidate["signature"], dtype=np.uint32))
+                if similarity >= best_similarity:
+                    best_similarity, cluster_id = similarity, candidate["cluster_id"]
+            if cluster_id == message_id:
+                # Only cluster representatives are bucketed, so a message is compared against one
+                # member per cluster rather than every copy of a large blast
+                self._conn.executemany(
+                    "INSERT INTO signature_bands (band, bucket, message_id) VALUES (?, ?, ?)",
+                    [(band, key, message_id) for band, key in enumerate(band_keys)]
+                )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO message_signatures (message_id, signature, cluster_id) VALUES (?, ?, ?)",
+            (message_id, signature.tobytes() if signature is not None else None, cluster_id)
+        )
+        return cluster_id
+
+    def _promote_representatives(self, deleted_ids: list[str]):
+        """
+        Hand the clusters represented by messages about to be deleted to their oldest surviving
+        member, re-keying the cluster and bucketing the new representative, so later copies still
+        find the cluster. Must be called inside a transaction.
+        """
+        placeholders = ",".join("?" * len(deleted_ids))
+        clusters = [row["cluster_id"] for row in self._conn.execute(
+            f"SELECT cluster_id FROM message_signatures WHERE message_id IN ({placeholders})"
+            " AND cluster_id = message_id", deleted_ids
+        )]
+        for cluster_id in clusters:
+            successor = self._conn.execute(
+                "SELECT s.message_id, s.signature, m.sender FROM message_signatures s"
+                " JOIN messages m ON m.message_id = s.message_id"
+                f" WHERE s.cluster_id = ? AND s.message_id NOT IN ({placeholders})"
+                " ORDER BY m.internal_date LIMIT 1", [cluster_id] + deleted_ids
+            ).fetchone()
+            if successor is None:
+                continue
+            self._conn.execute("UPDATE message_signatures SET cluster_id = ? WHERE cluster_id = ?",
+                               (successor["message_id"], cluster_id))
+            if successor["signature"] is not None:
+                signature = np.frombuffer(successor["signature"], dtype=np.uint32)
+                band_keys = self.hasher.band_keys(signature, namespace=self._sender_address(successor["sender"]))
+                self._conn.executemany(
+                    "INSERT INTO signature_bands (band, bucket, message_id) VALUES (?, ?, ?)",
+                    [(band, key, successor["message_id"]) for band, key in enumerate(band_keys)]
+                )
+
+    def migrate_json(self, json_path: str):
+        """
+        Import a legacy JSON database in a single transaction.
+
+        Args:
+            json_path (str): Path of the JSON database.
+        """
+        path = Path(json_path)
+        if path.exists():
+            with open(path, "r") as f:
+                data = json.load(f)
+            messages = data.get("messages", {})
+            thread_of = {}
+            threads = []
+            for thread_id, thread_data in data.get("threads", {}).items():
+                for position, message_id in enumerate(thread_data.get("message_ids", [])):
+                    thread_of[message_id] = (thread_id, position)
+                threads.append((thread_id, thread_data.get("timestamp", "")))
+
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO threads (thread_id, timestamp) VALUES (?, ?)", threads
+                )
+                for message_id, msg_data in messages.items():
+                    msg = EmailMessage(
+                        subject=msg_data["subject"],
+                        sender=msg_data["sender"],
+                        recipients=msg_data["recipients"],
+                        body=msg_data["body"],
+                        labels=msg_data.get("labels", []),
+                        timestamp=msg_data.get("timestamp", ""),
+                        message_id=msg_data["message_id"],
+                        internal_date=msg_data.get("internal_date") or parse_timestamp(msg_data.get("timestamp", ""))
+                    )
+                    msg.agent_read = msg_data.get("agent_read", False)
+                    thread_id, position = thread_of.get(message_id, (None, 0))
+                    self._upsert_message(msg, thread_id, position)
+            print(f"Migrated {len(messages)} messages and {len(threads)} threads from {json_path}")
+        self.set_meta("json_migrated", "1")
+
+    def _upsert_message(self, msg: EmailMessage, thread_id: str | None, position: int):
+        """Insert or update a message and its labels. Must be called inside a transaction."""
+        self._conn.execute(
+            "INSERT INTO messages (message_id, thread_id, position, subject, sender, recipients, body, llm_body,"
+            " timestamp, internal_date, agent_read)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(message_id) DO UPDATE SET thread_id = excluded.thread_id, position = excluded.position,"
+            " subject = excluded.subject, sender = excluded.sender, recipients = excluded.recipients,"
+            " body = excluded.body, llm_body = excluded.llm_body, timestamp = excluded.timestamp,"
+            " internal_date = excluded.internal_date",
+            (msg.message_id, thread_id, position, msg.subject, msg.sender, json.dumps(msg.recipients), msg.body,
+             msg.llm_body, msg.timestamp, msg.internal_date, int(msg.agent_read))
+        )
+        self._set_labels(msg.message_id, msg.labels)
+        # Gmail messages never change, so a message is only clustered the first time it is stored
+        indexed = self._conn.execute(
+            "SELECT 1 FROM message_signatures WHERE message_id = ?", (msg.message_id,)
+        ).fetchone()
+        if indexed is None:
+            self._assign_cluster(msg.message_id, msg.subject, msg.sender, msg.llm_body)
+
+    def _set_labels(self, message_id: str, labels: list[str]):
+        """Replace a message's labels. Must be called inside a transaction."""
+        self._conn.execute("DELETE FROM message_labels WHERE message_id = ?", (message_id,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO message_labels (message_id, label) VALUES (?, ?)",
+            [(message_id, label) for label in labels]
+        )
+
+    def upsert_threads(self, threads: list[EmailThread], history_ids: dict[str, str] | None = None):
+        """
+        Insert or update threads and their messages in one transaction.
+
+        Messages that are already stored keep their `agent_read` flag.
+
+        Args:
+            threads (list[EmailThread]): The fetched threads.
+            history_ids (dict[str, str] | None, optional): The Gmail historyId of each thread as
+                fetched, used to tell whether a thread changed since.
+
+        Returns:
+            list[str]: The ids of the messages that were not stored before.
+        """
+        history_ids = history_ids or {}
+        new_message_ids = []
+        with self._lock, self._conn:
+            for thread in threads:
+                self._conn.execute(
+                    "INSERT INTO threads (thread_id, timestamp, history_id) VALUES (?, ?, ?)"
+                    " ON CONFLICT(thread_id) DO UPDATE SET timestamp = excluded.timestamp,"
+                    " history_id = COALESCE(excluded.history_id, threads.history_id)",
+                    (thread.thread_id, thread.timestamp, history_ids.get(thread.thread_id))
+                )
+                for position, msg in enumerate(thread.messages):
+                    if not self.has_message(msg.message_id):
+                        new_message_ids.append(msg.message_id)
+                    self._upsert_message(msg, thread.thread_id, position)
+        return new_message_ids
+
+    def thread_history_ids(self, thread_ids: list[str]) -> dict[str, str | None]:
+        """Get the stored historyId of each of the given threads that is stored."""
+        if not thread_ids:
+            return {}
+        placeholders = ",".join("?" * len(thread_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT thread_id, history_id FROM threads WHERE thread_id IN ({placeholders})", thread_ids
+            ).fetchall()
+        return {row["thread_id"]: row["history_id"] for row in rows}
+
+    def add_labels(self, message_id: str, labels: list[str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO message_labels (message_id, label)"
+                " SELECT ?, ? WHERE EXISTS (SELECT 1 FROM messages WHERE message_id = ?)",
+                [(message_id, label, message_id) for label in labels]
+            )
+
+    def remove_labels(self, message_id: str, labels: list[str]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM message_labels WHERE message_id = ? AND label = ?",
+                [(message_id, label) for label in labels]
+            )
+
+    def delete_messages(self, message_ids: list[str]):
+        """Delete messages and their labels. Threads left without messages are deleted too."""
+        if not message_ids:
+            return
+        placeholders = ",".join("?" * len(message_ids))
+        with self._lock, self._conn:
+            self._promote_representatives(message_ids)
+            self._conn.execute(f"DELETE FROM message_labels WHERE message_id IN ({placeholders})", message_ids)
+            self._conn.execute(f"DELETE FROM message_categories WHERE message_id IN ({placeholders})", message_ids)
+            self._conn.execute(f"DELETE FROM message_signatures WHERE message_id IN ({placeholders})", message_ids)
+            self._conn.execute(f"DELETE FROM signature_bands WHERE message_id IN ({placeholders})", message_ids)
+            self._conn.execute(f"DELETE FROM messages WHERE message_id IN ({placeholders})", message_ids)
+            self._conn.execute(
+                "DELETE FROM threads WHERE NOT EXISTS"
+                " (SELECT 1 FROM messages WHERE messages.thread_id = threads.thread_id)"
+            )
+            self._conn.execute(
+                "DELETE FROM thread_summaries WHERE NOT EXISTS"
+                " (SELECT 1 FROM threads WHERE threads.thread_id = thread_summaries.thread_id)"
+            )
+
+    def has_thread(self, thread_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM threads WHERE thread_id = ?", (thread_id,)).fetchone()
+        return row is not None
+
+    def has_message(self, message_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM messages WHERE message_id = ?", (message_id,)).fetchone()
+        return row is not None
+
+    def _labels_for(self, message_ids: list[str]) -> dict[str, list[str]]:
+        labels = {message_id: [] for message_id in message_ids}
+        if not message_ids:
+            return labels
+        placeholders = ",".join("?" * len(message_ids))
+        rows = self._conn.execute(
+            f"SELECT message_id, label FROM message_labels WHERE message_id IN ({placeholders})", message_ids
+        ).fetchall()
+        for row in rows:
+            labels[row["message_id"]].append(row["label"])
+        return labels
+
+    def _messages_from_rows(self, rows: list[sqlite3.Row]) -> list[EmailMessage]:
+        labels = self._labels_for([row["message_id"] for row in rows])
+        messages = []
+        for row in rows:
+            msg = EmailMessage(
+                subject=row["subject"],
+                sender=row["sender"],
+                recipients=json.loads(row["recipients"]),
+                body=row["body"],
+                llm_body=row["llm_body"],
+                timestamp=row["timestamp"],
+                labels=labels[row["message_id"]],
+                message_id=row["message_id"],
+                internal_date=row["internal_date"]
+            )
+            msg.agent_read = bool(row["agent_read"])
+            messages.append(msg)
+        return messages
+
+    @staticmethod
+    def _thread_from_row(row: sqlite3.Row, messages: list[EmailMessage]) -> EmailThread:
+        thread = EmailThread(thread_id=row["thread_id"], timestamp=row["timestamp"], messages=messages)
+        thread.summary = row["summary"] or ""
+        return thread
+
+    def get_message(self, message_id: str) -> EmailMessage | None:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM messages WHERE message_id = ?", (message_id,)).fetchall()
+            messages = self._messages_from_rows(rows)
+        return messages[0] if messages else None
+
+    def get_thread(self, thread_id: str) -> EmailThread | None:
+        with self._lock:
+            thread_row = self._conn.execute(
+                "SELECT threads.*, thread_summaries.summary FROM threads"
+                " LEFT JOIN thread_summaries USING (thread_id) WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+            if thread_row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT * FROM messages WHERE thread_id = ? ORDER BY position", (thread_id,)
+            ).fetchall()
+            messages = self._messages_from_rows(rows)
+        return self._thread_from_row(thread_row, messages)
+
+    def get_all_threads(self) -> list[EmailThread]:
+        with self._lock:
+            thread_rows = self._conn.execute(
+                "SELECT threads.*, thread_summaries.summary FROM threads LEFT JOIN thread_summaries USING (thread_id)"
+            ).fetchall()
+            rows = self._conn.execute("SELECT * FROM messages ORDER BY thread_id, position").fetchall()
+            messages = self._messages_from_rows(rows)
+        by_thread = {}
+        for row, msg in zip(rows, messages):
+            by_thread.setdefault(row["thread_id"], []).append(msg)
+        return [self._thread_from_row(row, by_thread.get(row["thread_id"], [])) for row in thread_rows]
+
+    def get_unread_messages(self, limit: int | None = None) -> list[EmailMessage]:
+        """
+        Get the messages the agent has not read yet, most recent first.
+
+        The query walks the partial `idx_messages_unread` index, which holds only unread messages
+        in date order and is kept up to date by every insert and `mark_read`. Getting the top N
+        therefore reads N index entries instead of scanning and sorting the mailbox.
+
+        Args:
+            limit (int | None, optional): The maximum number of messages to return. If None, all
+                unread messages are returned.
+
+        Returns:
+            list[EmailMessage]: The unread messages, sorted by `internal_date` descending.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM messages WHERE agent_read = 0"
+                " ORDER BY internal_date DESC LIMIT ?",
+                (limit if limit is not None else -1,)
+            ).fetchall()
+            return self._messages_from_rows(rows)
+
+    def search(self, query: str, limit: int = 10, snippet_tokens: int = 16) -> list[dict]:
+        """
+        Full-text search over message subjects, senders and cleaned bodies.
+
+        Every word of the query must match (words are stemmed, so "meeting" finds "meetings"). If
+        nothing matches all words, messages matching any of them are returned instead. Results are
+        ranked by BM25, with subject and sender matches weighted above body matches.
+
+        Args:
+            query (str): Free-text query. FTS5 query syntax is not interpreted.
+            limit (int, optional): The maximum number of results.
+            snippet_tokens (int, optional): The approximate length of each snippet in tokens.
+
+        Returns:
+            list[dict]: The matches, best first, each with the message_id, thread_id, subject,
+            sender, timestamp and a short snippet around the matched words.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        quoted = ['"' + word + '"' for word in words]
+        weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+        sql = (
+            "SELECT m.message_id, m.thread_id, m.subject, m.sender, m.timestamp,"
+            f" snippet(messages_fts, -1, '[', ']', '...', ?) AS snippet"
+            " FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid"
+            f" WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts, {weights}) LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, (snippet_tokens, " AND ".join(quoted), limit)).fetchall()
+            if not rows and len(quoted) > 1:
+                rows = self._conn.execute(sql, (snippet_tokens, " OR ".join(quoted), limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_read(self, message_ids: list[str], read: bool = True):
+        """Set the `agent_read` flag of some messages."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE messages SET agent_read = ? WHERE message_id = ?",
+                [(int(read), message_id) for message_id in message_ids]
+            )
+
+    def get_categories(self, message_ids: list[str]) -> dict[str, list[str]]:
+        """
+        Get the stored categories of some messages.
+
+        Args:
+            message_ids (list[str]): The messages to look up.
+
+        Returns:
+            dict[str, list[str]]: The categories of each message that has been classified.
+        """
+        if not message_ids:
+            return {}
+        placeholders = ",".join("?" * len(message_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT message_id, categories FROM message_categories WHERE message_id IN ({placeholders})",
+                message_ids
+            ).fetchall()
+        return {row["message_id"]: json.loads(row["categories"]) for row in rows}
+
+    def set_categories(self, categories: dict[str, list[str]]):
+        """Store the categories of some messages, replacing any previous classification."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO message_categories (message_id, categories) VALUES (?, ?)"
+                " ON CONFLICT(message_id) DO UPDATE SET categories = excluded.categories",
+                [(message_id, json.dumps(labels)) for message_id, labels in categories.items()]
+            )
+
+    def get_clusters(self, message_ids: list[str]) -> dict[str, str]:
+        """
+        Get the near-duplicate cluster of some messages.
+
+        Returns:
+            dict[str, str]: The cluster id of each stored message. Messages without near-duplicates
+            are alone in a cluster whose id is their own.
+        """
+        if not message_ids:
+            return {}
+        placeholders = ",".join("?" * len(message_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT message_id, cluster_id FROM message_signatures WHERE message_id IN ({placeholders})",
+                message_ids
+            ).fetchall()
+        return {row["message_id"]: row["cluster_id"] for row in rows}
+
+    def cluster_members(self, cluster_id: str) -> list[str]:
+        """Get the ids of the messages in a near-duplicate cluster."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id FROM message_signatures WHERE cluster_id = ?", (cluster_id,)
+            ).fetchall()
+        return [row["message_id"] for row in rows]
+
+    def get_cluster_categories(self, cluster_ids: list[str]) -> dict[str, list[str]]:
+        """
+        Get categories already assigned to some member of each of the given clusters.
+
+        Returns:
+            dict[str, list[str]]: The categories of each cluster that has a classified member.
+        """
+        if not cluster_ids:
+            return {}
+        placeholders = ",".join("?" * len(cluster_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.cluster_id, c.categories FROM message_signatures s"
+                " JOIN message_categories c ON c.message_id = s.message_id"
+                f" WHERE s.cluster_id IN ({placeholders})", cluster_ids
+            ).fetchall()
+        return {row["cluster_id"]: json.loads(row["categories"]) for row in rows}
+
+    def get_cluster_summary(self, message_id: str) -> str | None:
+        """
+        Get the summary of an exact copy of a message within its near-duplicate cluster.
+
+        Only cluster members with the same subject and cleaned body are considered: near-duplicates
+        may differ in amounts and dates (numbers are ignored when clustering), which a summary
+        would get wrong. Only summaries of single-message threads are considered, since the summary
+        of a longer thread covers more than its copy of the message.
+
+        Returns:
+            str | None: The summary, or None if no copy has been summarized.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts.summary FROM message_signatures s"
+                " JOIN messages own ON own.message_id = s.message_id"
+                " JOIN message_signatures mate ON mate.cluster_id = s.cluster_id AND mate.message_id != s.message_id"
+                " JOIN messages m ON m.message_id = mate.message_id"
+                " AND m.subject = own.subject AND m.llm_body = own.llm_body"
+                " JOIN thread_summaries ts ON ts.thread_id = m.thread_id AND ts.message_count = 1"
+                " WHERE s.message_id = ? LIMIT 1", (message_id,)
+            ).fetchone()
+        return row["summary"] if row is not None else None
+
+    def get_thread_summary(self, thread_id: str) -> tuple[str, str] | None:
+        """
+        Get the stored summary of a thread.
+
+        Returns:
+            tuple[str, str] | None: The summary and the id of the last message it covers, or None if
+            the thread has not been summarized.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, last_message_id FROM thread_summaries WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return (row["summary"], row["last_message_id"]) if row is not None else None
+
+    def set_thread_summary(self, thread_id: str, summary: str, last_message_id: str, message_count: int):
+        """
+        Store the summary of a thread.
+
+        Args:
+            thread_id (str): The summarized thread.
+            summary (str): The summary.
+            last_message_id (str): The id of the last message the summary covers (its watermark).
+            message_count (int): The number of messages the summary covers.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO thread_summaries (thread_id, summary, last_message_id, message_count) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(thread_id) DO UPDATE SET summary = excluded.summary,"
+                " last_message_id = excluded.last_message_id, message_count = excluded.message_count",
+                (thread_id, summary, last_message_id, message_count)
+            )
+
+    def body_token_totals(self) -> tuple[int, int]:
+        """
+        Estimate the tokens of all stored bodies, raw and cleaned, using the four characters per
+        token approximation of `utils.estimate_tokens`.
+
+        Returns:
+            tuple[int, int]: The estimated raw and cleaned body tokens.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM((length(body) + 3) / 4), 0) AS raw,"
+                " COALESCE(SUM((length(llm_body) + 3) / 4), 0) AS clean FROM messages"
+            ).fetchone()
+        return row["raw"], row["clean"]
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row is not None else None
+
+    def set_meta(self, key: str, value: str | None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
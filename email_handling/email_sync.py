@@ -0,0 +1,107 @@
+from datetime import timedelta
+import threading
+
+from email_handling.gmail_handler import GmailHandler
+
+
+class EmailSyncWorker:
+    """
+    Keeps a `GmailHandler`'s local store fresh from a background thread.
+
+    The worker syncs every `interval`, and immediately whenever `trigger` is called, e.g. by a
+    Gmail push notification or by a read finding the store stale. Reads through the handler never
+    wait for a sync. New inbox messages found by a sync are posted to an `AgentContext` as
+    notifications, so the assistant wakes up for new mail instead of polling for it.
+    """
+
+    def __init__(self, handler: GmailHandler, agent_context=None,
+                 interval: timedelta = timedelta(minutes=5), max_notifications: int = 5,
+                 notification_ttl: timedelta | None = timedelta(days=1)):
+        """
+        Initialize the EmailSyncWorker.
+
+        Args:
+            handler: The handler to sync.
+            agent_context: The `AgentContext` new-mail notifications are posted to. If None, nothing
+                is posted. Not imported here, since the agents package depends on this one.
+            interval: Time between scheduled syncs.
+            max_notifications: The most new messages notified individually per sync; beyond that a
+                single summary notification is posted.
+            notification_ttl: How long an unhandled new-mail notification is kept.
+        """
+        self.handler = handler
+        self.agent_context = agent_context
+        self.interval = interval
+        self.max_notifications = max_notifications
+        self.notification_ttl = notification_ttl
+        self.syncs = 0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        handler.sync_worker = self
+
+    def start(self):
+        """Start syncing in the background. The first sync runs right away."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="email-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker after the sync in progress, if any."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def trigger(self):
+        """Request a sync as soon as possible, e.g. on a push notification. Never blocks."""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.interval.total_seconds())
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            self.sync_once()
+
+    def sync_once(self) -> list[str]:
+        """
+        Run one sync on the calling thread and post notifications for new inbox messages.
+
+        Messages found by the very first sync of an empty mailbox store are not notified, since
+        they are the existing backlog rather than new mail.
+
+        Returns:
+            list[str]: The ids of the new messages.
+        """
+        first_sync = self.handler.store.get_meta("history_id") is None
+        try:
+            new_message_ids = self.handler.update_emails()
+        except Exception as error:
+            # Keep the worker alive through network and auth failures; the next sync retries
+            print(f"Email sync failed: {error}")
+            return []
+        self.syncs += 1
+        if not first_sync:
+            self._notify(new_message_ids)
+        return new_message_ids
+
+    def _notify(self, message_ids: list[str]):
+        if self.agent_context is None:
+            return
+        new_messages = [msg for msg in (self.handler.store.get_message(message_id) for message_id in message_ids)
+                        if msg is not None and "INBOX" in msg.labels]
+        for msg in new_messages[:self.max_notifications]:
+            self.agent_context.add_notification(
+                f"NEW EMAIL: From {msg.sender}, subject \"{msg.subject}\" (message ID {msg.message_id})",
+                ttl=self.notification_ttl
+            )
+        if len(new_messages) > self.max_notifications:
+            self.agent_context.add_notification(
+                f"NEW EMAIL: {len(new_messages) - self.max_notifications} more new emails arrived",
+                ttl=self.notification_ttl
+            )
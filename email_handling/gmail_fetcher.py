@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+from typing import Callable
+
+from googleapiclient.errors import HttpError
+
+
+# Only the parts of a thread `GmailHandler._parse_message` reads
+THREAD_FIELDS = (
+    "id,historyId,"
+    "messages(id,threadId,labelIds,internalDate,"
+    "payload(mimeType,headers(name,value),body/data,"
+    "parts(mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data)))))"
+)
+
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded", "backendError")
+
+
+def is_retryable(error: HttpError) -> bool:
+    """
+    Check whether a Gmail API error is a rate-limit or transient error worth retrying.
+
+    Args:
+        error (HttpError): The error returned by the API.
+
+    Returns:
+        bool: True for 429s, 5xx errors and 403s caused by rate limits or quota.
+    """
+    status = getattr(error.resp, "status", None)
+    if status == 429 or (status is not None and 500 <= int(status) < 600):
+        return True
+    if status == 403:
+        content = error.content.decode("utf-8", "replace") if isinstance(error.content, bytes) else str(error.content)
+        return any(reason in content for reason in RATE_LIMIT_REASONS)
+    return False
+
+
+class GmailFetcher:
+    """
+    Fetches Gmail threads with batch HTTP requests spread over a bounded pool of workers.
+
+    Thread ids are split into batches of `batch_size` requests, each sent as one HTTP round trip.
+    Up to `max_workers` batches are in flight at once; every worker uses its own HTTP connection
+    from `http_factory`, since `httplib2` connections must not be shared between threads. Requests
+    failing with rate-limit or transient errors are retried with exponential backoff and full
+    jitter; other failures are reported and skipped.
+    """
+
+    def __init__(self, service, http_factory: Callable | None = None, batch_size: int = 50, max_workers: int = 4,
+                 max_retries: int = 5, base_delay: float = 1.0, sleep: callable = time.sleep):
+        """
+        Initialize the GmailFetcher.
+
+        Args:
+            service: A Gmail API service resource from `googleapiclient.discovery.build`.
+            http_factory: Callable returning a new authorized HTTP object for a worker. If None, all
+                batches are sent sequentially over the service's own connection.
+            batch_size: The number of requests per batch. Gmail allows up to 100, but recommends 50.
+            max_workers: The maximum number of batches in flight at once.
+            max_retries: How many times a rate-limited request is retried before giving up.
+            base_delay: The initial backoff delay in seconds, doubled on each retry.
+            sleep: Function used to wait between retries; tests can inject a no-op.
+        """
+        self.service = service
+        self.http_factory = http_factory
+        self.batch_size = batch_size
+        self.max_workers = max_workers if http_factory is not None else 1
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.sleep = sleep
+        self._local = threading.local()
+
+    def _http(self):
+        if self.http_factory is None:
+            return None
+        if getattr(self._local, "http", None) is None:
+            self._local.http = self.http_factory()
+        return self._local.http
+
+    def _execute_batch(self, thread_ids: list[str]) -> tuple[dict[str, dict], list[str], dict[str, HttpError]]:
+        """
+        Send one batch of thread requests.
+
+        Returns:
+            tuple: The fetched threads by id, the ids to retry, and the ids that failed for good
+            with their errors.
+        """
+        fetched, retry, failed = {}, [], {}
+
+        def callback(request_id: str, response: dict, exception: HttpError | None):
+            if exception is None:
+                fetched[request_id] = response
+            elif isinstance(exception, HttpError) and is_retryable(exception):
+                retry.append(request_id)
+            else:
+                failed[request_id] = exception
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for thread_id in thread_ids:
+            batch.add(
+                self.service.users().threads().get(userId="me", id=thread_id, format="full", fields=THREAD_FIELDS),
+                request_id=thread_id
+            )
+        try:
+            batch.execute(http=self._http())
+        except HttpError as error:
+            # The batch request as a whole was rejected
+            if not is_retryable(error):
+                raise
+            return fetched, [thread_id for thread_id in thread_ids if thread_id not in fetched], failed
+        return fetched, retry, failed
+
+    def _fetch_chunk(self, thread_ids: list[str]) -> tuple[dict[str, dict], dict[str, HttpError]]:
+        results, failed_for_good = {}, {}
+        pending = thread_ids
+        for attempt in range(self.max_retries + 1):
+            fetched, pending, failed = self._execute_batch(pending)
+            results.update(fetched)
+            failed_for_good.update(failed)
+            for thread_id, error in failed.items():
+                print(f"Could not fetch thread {thread_id}: {error}")
+            if not pending:
+                break
+            if attempt < self.max_retries:
+                self.sleep(random.uniform(0, self.base_delay * 2 ** attempt))
+        else:
+            print(f"Giving up on {len(pending)} rate-limited thread(s)")
+        return results, failed_for_good
+
+    def fetch_threads(self, thread_ids: list[str]) -> tuple[dict[str, dict], dict[str, HttpError]]:
+        """
+        Fetch several threads.
+
+        Args:
+            thread_ids (list[str]): The ids of the threads to fetch.
+
+        Returns:
+            tuple: The raw thread resources by thread id, and the errors of the threads that failed
+            for good (e.g. a 404 for a deleted thread) by thread id. Threads in neither were still
+            rate-limited when the retries ran out, and are worth fetching again later.
+        """
+        chunks = [thread_ids[i:i + self.batch_size] for i in range(0, len(thread_ids), self.batch_size)]
+        results, failed = {}, {}
+        if self.max_workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                chunk_results, chunk_failed = self._fetch_chunk(chunk)
+                results.update(chunk_results)
+                failed.update(chunk_failed)
+            return results, failed
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks)),
+                                thread_name_prefix="gmail-fetch") as executor:
+            for chunk_results, chunk_failed in executor.map(self._fetch_chunk, chunks):
+                results.update(chunk_results)
+                failed.update(chunk_failed)
+        return results, failed
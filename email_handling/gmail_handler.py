@@ -1,16 +1,23 @@
 import base64
 import json
 from pathlib import Path
+import threading
 from typing import Optional
 
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from email_handling.email_objects import EmailMessage, EmailThread
-from datetime import datetime
+from clock import get_clock
+from email_handling.email_cleaner import clean_body, html_to_text
+from email_handling.email_objects import EmailMessage, EmailThread, format_timestamp
+from email_handling.email_store import EmailStore
+from email_handling.gmail_fetcher import GmailFetcher
+from utils import estimate_tokens
 
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
@@ -40,91 +47,37 @@ class GmailHandler:
     Fetches new emails from Gmail API and stores them locally.
     """
     
-    def __init__(self, db_path: str = "config/gmail_db.json"):
+    def __init__(self, db_path: str = "config/gmail.db", legacy_json_path: str | None = "config/gmail_db.json",
+                 store: EmailStore | None = None):
         """
         Initialize the GmailHandler with a database file path.
         
         Args:
-            db_path: Path to the JSON database file
+            db_path: Path to the SQLite database file
+            legacy_json_path: Path to a JSON database from older versions, migrated on first open
+            store: Optional already opened store, used instead of `db_path`
         """
-        self.db_path = Path(db_path)
+        self.store = store if store is not None else EmailStore(db_path, legacy_json_path)
         self.service = None
-        self.threads = {}  # thread_id -> EmailThread
-        self.messages = {}  # message_id -> EmailMessage
+        self.fetcher = None
         self.last_updated = None
-        self._load_database()
-    
-    def _load_database(self):
-        """Load the email database from disk if it exists."""
-        if self.db_path.exists():
-            with open(self.db_path, 'r') as f:
-                data = json.load(f)
-                
-            # Reconstruct EmailMessage objects
-            for msg_id, msg_data in data.get('messages', {}).items():
-                msg = EmailMessage(
-                    subject=msg_data['subject'],
-                    sender=msg_data['sender'],
-                    recipients=msg_data['recipients'],
-                    body=msg_data['body'],
-                    labels=msg_data.get('labels', []),
-                    timestamp=msg_data.get('timestamp', ""),
-                    message_id=msg_data['message_id']
-                )
-                msg.agent_read = msg_data.get('agent_read', False)
-                self.messages[msg_id] = msg
-            
-            # Reconstruct EmailThread objects
-            for thread_id, thread_data in data.get('threads', {}).items():
-                messages = [self.messages[msg_id] for msg_id in thread_data['message_ids'] 
-                           if msg_id in self.messages]
-                self.threads[thread_id] = EmailThread(
-                    thread_id=thread_id,
-                    timestamp=thread_data.get('timestamp', ""),
-                    messages=messages
-                )
-    
-    def _save_database(self):
-        """Save the email database to disk."""
-        # Ensure the directory exists
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Serialize messages
-        messages_data = {}
-        for msg_id, msg in self.messages.items():
-            messages_data[msg_id] = {
-                'subject': msg.subject,
-                'sender': msg.sender,
-                'recipients': msg.recipients,
-                'body': msg.body,
-                'labels': msg.labels,
-                'timestamp': msg.timestamp,
-                'message_id': msg.message_id,
-                'agent_read': msg.agent_read
-            }
-        
-        # Serialize threads
-        threads_data = {}
-        for thread_id, thread in self.threads.items():
-            threads_data[thread_id] = {
-                'thread_id': thread_id,
-                'timestamp': thread.timestamp,
-                'message_ids': [msg.message_id for msg in thread.messages]
-            }
-        
-        data = {
-            'messages': messages_data,
-            'threads': threads_data
-        }
-        
-        with open(self.db_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Optional background worker keeping the store fresh; see `EmailSyncWorker`
+        self.sync_worker = None
+        self._sync_lock = threading.Lock()
+        self._new_message_ids = []
     
     def _initialize_service(self):
-        """Initialize the Gmail API service if not already done."""
+        """Initialize the Gmail API service and thread fetcher if not already done."""
         if self.service is None:
             creds = get_credentials()
             self.service = build('gmail', 'v1', credentials=creds)
+            # Each fetch worker gets its own connection; httplib2 is not thread-safe
+            self.fetcher = GmailFetcher(
+                self.service,
+                http_factory=lambda: AuthorizedHttp(creds, http=httplib2.Http())
+            )
+        elif self.fetcher is None:
+            self.fetcher = GmailFetcher(self.service)
     
     def _parse_message(self, raw_message: dict) -> EmailMessage:
         """
@@ -136,8 +89,7 @@ class GmailHandler:
         Returns:
             EmailMessage object
         """
-        timestamp = raw_message.get('internalDate', "")
-        timestamp = datetime.fromtimestamp(int(timestamp) / 1000).strftime("%I:%M %p on %A, %B %d, %Y")
+        internal_date = int(raw_message.get('internalDate', 0))
         headers = raw_message['payload']['headers']
         header_dict = {h['name'].lower(): h['value'] for h in headers}
         
@@ -146,16 +98,10 @@ class GmailHandler:
         to = header_dict.get('to', '')
         recipients = [r.strip() for r in to.split(',') if r.strip()]
         
-        # Extract body
-        body = ""
-        if 'parts' in raw_message['payload']:
-            for part in raw_message['payload']['parts']:
-                if part['mimeType'] == 'text/plain':
-                    if 'data' in part['body']:
-                        body = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
-                        break
-        elif 'body' in raw_message['payload'] and 'data' in raw_message['payload']['body']:
-            body = base64.urlsafe_b64decode(raw_message['payload']['body']['data']).decode('utf-8')
+        # Extract body, preferring a plain text part and converting HTML-only messages to text
+        body, is_html = self._extract_body(raw_message['payload'])
+        if is_html:
+            body = html_to_text(body)
         
         labels = raw_message.get('labelIds', [])
         message_id = raw_message['id']
@@ -166,91 +112,258 @@ class GmailHandler:
             recipients=recipients,
             body=body,
             labels=labels,
-            timestamp=timestamp,
-            message_id=message_id
+            timestamp=format_timestamp(internal_date),
+            message_id=message_id,
+            internal_date=internal_date,
+            llm_body=clean_body(body)
         )
     
-    def _ensure_fresh_emails(self, max_age_minutes: int = 5):
+    def _extract_body(self, payload: dict) -> tuple[str, bool]:
         """
-        Ensure emails are up-to-date by checking last update time.
-        If emails haven't been updated recently, fetch new ones.
+        Find the body of a message payload, searching nested multipart parts.
         
         Args:
-            max_age_minutes: Maximum age in minutes before forcing an update
+            payload: The payload (or part) of a raw Gmail API message
+            
+        Returns:
+            The decoded body, and whether it is HTML. The body is empty if there is no text part.
         """
-        if self.last_updated is None:
-            # Never updated, fetch emails
-            self.update_emails()
-        else:
-            time_since_update = datetime.now() - self.last_updated
-            if time_since_update.total_seconds() > (max_age_minutes * 60):
-                self.update_emails()
+        plain, html = None, None
+        pending = [payload]
+        while pending and plain is None:
+            part = pending.pop(0)
+            data = part.get('body', {}).get('data')
+            if data and part.get('mimeType') == 'text/plain':
+                plain = base64.urlsafe_b64decode(data).decode('utf-8', 'replace')
+            elif data and part.get('mimeType') == 'text/html' and html is None:
+                html = base64.urlsafe_b64decode(data).decode('utf-8', 'replace')
+            elif data and not part.get('parts') and part is payload:
+                # Single-part message with an unusual or missing MIME type
+                plain = base64.urlsafe_b64decode(data).decode('utf-8', 'replace')
+            pending.extend(part.get('parts', []))
+        if plain is not None:
+            return plain, False
+        if html is not None:
+            return html, True
+        return "", False
     
-    def update_emails(self, max_results: int = 100):
+    def _ensure_fresh_emails(self, max_age_minutes: int = 5):
         """
-        Fetch new emails from Gmail and update the local database.
+        Ask the background sync worker for a sync if emails haven't been updated recently.
+        
+        With a sync worker this never blocks: reads always serve the local store. Without one
+        (e.g. tools used from a script or a notebook), the first read syncs before returning, so
+        the store is never served without having been synced.
         
         Args:
-            max_results: Maximum number of threads to fetch
+            max_age_minutes: Maximum age in minutes before requesting an update
         """
-        self._initialize_service()
+        if self.sync_worker is None:
+            if self.last_updated is None:
+                self.update_emails()
+            return
+        if (self.last_updated is None
+                or (get_clock().now() - self.last_updated).total_seconds() > max_age_minutes * 60):
+            self.sync_worker.trigger()
+    
+    def update_emails(self, max_results: int = 100) -> list[str]:
+        """
+        Sync the local database with Gmail.
         
-        try:
-            # Fetch threads
-            threads_response = self.service.users().threads().list(
-                userId='me',
-                maxResults=max_results
-            ).execute()
+        If a previous sync recorded a historyId, only the changes since then are applied (see
+        `_sync_incremental`). Otherwise, or if Gmail no longer has history that old, a full sync
+        is done.
+        
+        Args:
+            max_results: Maximum number of threads to list in a full sync
             
-            threads = threads_response.get('threads', [])
+        Returns:
+            The ids of the messages stored for the first time by this sync
+        """
+        with self._sync_lock:
+            self._initialize_service()
+            self._new_message_ids = []
             
-            for thread_info in threads:
-                thread_id = thread_info['id']
-                
-                # Skip if we already have this thread
-                if thread_id in self.threads:
-                    continue
-                
-                # Fetch full thread details
-                thread_data = self.service.users().threads().get(
-                    userId='me',
-                    id=thread_id
-                ).execute()
+            try:
+                history_id = self.store.get_meta('history_id')
+                synced = False
+                if history_id is not None:
+                    synced = self._sync_incremental(history_id)
+                if not synced:
+                    self._sync_full(max_results)
                 
-                thread_messages = []
-                for raw_message in thread_data.get('messages', []):
-                    message_id = raw_message['id']
-                    
-                    # Skip if we already have this message
-                    if message_id in self.messages:
-                        thread_messages.append(self.messages[message_id])
-                        continue
-                    
-                    # Parse and store the message
-                    email_message = self._parse_message(raw_message)
-                    self.messages[message_id] = email_message
-                    thread_messages.append(email_message)
+                # Update the last_updated timestamp
+                self.last_updated = get_clock().now()
                 
-                # Create and store the thread
-                # Use the timestamp of the first message as the thread timestamp
-                thread_timestamp = thread_messages[0].timestamp if thread_messages else ""
-                email_thread = EmailThread(
-                    thread_id=thread_id,
-                    timestamp=thread_timestamp,
-                    messages=thread_messages
-                )
-                self.threads[thread_id] = email_thread
+            except HttpError as error:
+                print(f"An error occurred: {error}")
             
-            # Save the updated database
-            self._save_database()
+            return self._new_message_ids
+    
+    def _store_threads(self, thread_ids: list[str]) -> tuple[int, list[str]]:
+        """
+        Fetch threads, batched and in parallel, and upsert them into the store.
+        
+        Args:
+            thread_ids: The threads to fetch
+            
+        Threads Gmail no longer has (404, e.g. a discarded draft-only thread) are deleted from the
+        store. Other threads that failed for good are skipped.
+        
+        Returns:
+            The number of threads stored, and the ids of the threads still rate-limited when the
+            fetcher gave up, which are worth retrying
+        """
+        raw_threads, failed = self.fetcher.fetch_threads(thread_ids)
+        
+        gone_thread_ids = [thread_id for thread_id, error in failed.items()
+                           if getattr(error.resp, 'status', None) == 404]
+        for thread_id in gone_thread_ids:
+            thread = self.store.get_thread(thread_id)
+            if thread is not None:
+                self.store.delete_messages([msg.message_id for msg in thread.messages])
+        
+        threads = []
+        history_ids = {}
+        retry_thread_ids = []
+        for thread_id in thread_ids:
+            if thread_id not in raw_threads:
+                if thread_id not in failed:
+                    retry_thread_ids.append(thread_id)
+                continue
             
-            # Update the last_updated timestamp
-            self.last_updated = datetime.now()
+            thread_messages = []
+            for raw_message in raw_threads[thread_id].get('messages', []):
+                # Parse the message; known messages keep their read flag when stored
+                thread_messages.append(self._parse_message(raw_message))
             
-            print(f"Updated database with {len(threads)} threads")
+            # Use the timestamp of the first message as the thread timestamp
+            thread_timestamp = thread_messages[0].timestamp if thread_messages else ""
+            threads.append(EmailThread(
+                thread_id=thread_id,
+                timestamp=thread_timestamp,
+                messages=thread_messages
+            ))
+            history_ids[thread_id] = raw_threads[thread_id].get('historyId')
+        
+        # Write only the fetched threads and their messages
+        self._new_message_ids.extend(self.store.upsert_threads(threads, history_ids))
+        
+        messages = [msg for thread in threads for msg in thread.messages]
+        if messages:
+            raw_tokens = sum(estimate_tokens(msg.body) for msg in messages)
+            clean_tokens = sum(estimate_tokens(msg.llm_body) for msg in messages)
+            saved = 100 * (raw_tokens - clean_tokens) / raw_tokens if raw_tokens else 0
+            print(f"Cleaned {len(messages)} email bodies: {raw_tokens} -> {clean_tokens} tokens ({saved:.0f}% saved)")
+        return len(threads), retry_thread_ids
+    
+    def _get_pending_thread_ids(self) -> list[str]:
+        """Get the threads a previous sync could not fetch, which the next sync retries."""
+        pending = self.store.get_meta('pending_thread_ids')
+        return json.loads(pending) if pending else []
+    
+    def _set_pending_thread_ids(self, thread_ids: list[str]):
+        self.store.set_meta('pending_thread_ids', json.dumps(thread_ids))
+        if thread_ids:
+            print(f"Could not fetch {len(thread_ids)} thread(s); retrying them next sync")
+    
+    def _sync_full(self, max_results: int):
+        """
+        List the most recent threads and fetch those that are new or changed since stored.
+        
+        Args:
+            max_results: Maximum number of threads to list
+        """
+        # Read the mailbox's historyId first, so changes made during the sync are replayed next time
+        profile = self.service.users().getProfile(userId='me').execute()
+        
+        threads_response = self.service.users().threads().list(
+            userId='me',
+            maxResults=max_results
+        ).execute()
+        threads = threads_response.get('threads', [])
+        
+        stored_history_ids = self.store.thread_history_ids([thread_info['id'] for thread_info in threads])
+        changed_thread_ids = [
+            thread_info['id'] for thread_info in threads
+            if thread_info['id'] not in stored_history_ids
+            or stored_history_ids[thread_info['id']] != thread_info.get('historyId')
+        ]
+        stored, retry_thread_ids = self._store_threads(changed_thread_ids)
+        # Rate-limited threads would be skipped by the following incremental syncs, whose history
+        # starts after this one
+        self._set_pending_thread_ids(retry_thread_ids)
+        self.store.set_meta('history_id', profile['historyId'])
+        
+        print(f"Full sync: {stored} new or changed of {len(threads)} threads")
+    
+    def _sync_incremental(self, start_history_id: str) -> bool:
+        """
+        Apply the mailbox changes recorded since `start_history_id`.
+        
+        New messages are fetched with their threads; label changes and deletions are applied to
+        the store directly, without fetching anything. Threads that could not be fetched, e.g.
+        because of rate limits, are recorded and retried by the next sync, since the historyId
+        watermark moves past their changes.
+        
+        Args:
+            start_history_id: The historyId recorded by the previous sync
             
+        Returns:
+            True if the changes were applied, False if Gmail no longer has history that old and a
+            full sync is needed
+        """
+        changed_thread_ids = []
+        deleted_message_ids = []
+        label_changes = []  # (message_id, added labels, removed labels)
+        latest_history_id = start_history_id
+        page_token = None
+        try:
+            while True:
+                response = self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+                    pageToken=page_token
+                ).execute()
+                
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        thread_id = added['message']['threadId']
+                        if thread_id not in changed_thread_ids:
+                            changed_thread_ids.append(thread_id)
+                    for deleted in record.get('messagesDeleted', []):
+                        deleted_message_ids.append(deleted['message']['id'])
+                    for change in record.get('labelsAdded', []):
+                        label_changes.append((change['message']['id'], change.get('labelIds', []), []))
+                    for change in record.get('labelsRemoved', []):
+                        label_changes.append((change['message']['id'], [], change.get('labelIds', [])))
+                
+                latest_history_id = response.get('historyId', latest_history_id)
+                page_token = response.get('nextPageToken')
+                if page_token is None:
+                    break
         except HttpError as error:
-            print(f"An error occurred: {error}")
+            if getattr(error.resp, 'status', None) == 404:
+                print("Gmail history expired; running a full sync")
+                return False
+            raise
+        
+        for message_id, added_labels, removed_labels in label_changes:
+            self.store.add_labels(message_id, added_labels)
+            self.store.remove_labels(message_id, removed_labels)
+        self.store.delete_messages(deleted_message_ids)
+        for thread_id in self._get_pending_thread_ids():
+            if thread_id not in changed_thread_ids:
+                changed_thread_ids.append(thread_id)
+        stored, retry_thread_ids = self._store_threads(changed_thread_ids)
+        self._set_pending_thread_ids(retry_thread_ids)
+        self.store.set_meta('history_id', latest_history_id)
+        
+        if stored or label_changes or deleted_message_ids:
+            print(f"Incremental sync: {stored} threads with new messages, {len(label_changes)} label changes, "
+                  f"{len(deleted_message_ids)} deletions")
+        return True
     
     def get_thread(self, thread_id: str) -> Optional[EmailThread]:
         """
@@ -263,7 +376,7 @@ class GmailHandler:
             EmailThread if found, None otherwise
         """
         self._ensure_fresh_emails()
-        return self.threads.get(thread_id)
+        return self.store.get_thread(thread_id)
     
     def get_all_threads(self) -> list[EmailThread]:
         """
@@ -273,7 +386,7 @@ class GmailHandler:
             List of all EmailThread objects
         """
         self._ensure_fresh_emails()
-        return list(self.threads.values())
+        return self.store.get_all_threads()
     
     def get_message(self, message_id: str) -> Optional[EmailMessage]:
         """
@@ -286,7 +399,21 @@ class GmailHandler:
             EmailMessage if found, None otherwise
         """
         self._ensure_fresh_emails()
-        return self.messages.get(message_id)
+        return self.store.get_message(message_id)
+    
+    def search_emails(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Search the local email database.
+        
+        Args:
+            query: Free-text query matched against subjects, senders and bodies
+            limit: Maximum number of results
+            
+        Returns:
+            Ranked matches with a short snippet each; see `EmailStore.search`
+        """
+        self._ensure_fresh_emails()
+        return self.store.search(query, limit)
     
     def get_unread_emails(self, count: int = 5) -> list[EmailMessage]:
         """
@@ -299,23 +426,6 @@ class GmailHandler:
             List of unread EmailMessage objects, sorted by timestamp (most recent first)
         """
         self._ensure_fresh_emails()
-        # Filter for unread messages
-        unread_messages = [msg for msg in self.messages.values() if not msg.agent_read]
-        
-        # Sort by timestamp (most recent first)
-        # Parse timestamp format: "HH:MM AM/PM on Day, Month Date, Year"
-        def parse_timestamp(msg):
-            try:
-                from datetime import datetime
-                return datetime.strptime(msg.timestamp, "%I:%M %p on %A, %B %d, %Y")
-            except (ValueError, AttributeError):
-                # Return a very old date if parsing fails
-                return datetime.min
-        
-        unread_messages.sort(key=parse_timestamp, reverse=True)
-        
-        # Return up to 'count' messages
-        return unread_messages[:count]
-
+        return self.store.get_unread_messages(limit=count)
 
 GMAIL_HANDLER = GmailHandler()
\ No newline at end of file
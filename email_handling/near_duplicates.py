@@ -0,0 +1,111 @@
+import re
+import zlib
+
+import numpy as np
+
+
+# Modulus of the MinHash permutations a * x + b. Shingle hashes are 32-bit and a, b are below
+# 2 ** 31, so a * x + b stays below 2 ** 64 and numpy's uint64 arithmetic never overflows
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_COEFFICIENT = 1 << 31
+MAX_HASH = (1 << 32) - 1
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class MinHasher:
+    """
+    MinHash signatures and LSH band keys for near-duplicate detection.
+
+    A text is reduced to the set of its word shingles, and its signature keeps the minimum hash
+    of that set under `num_perm` random permutations. The fraction of equal signature entries of
+    two texts estimates the Jaccard similarity of their shingle sets. Signatures are split into
+    `bands` bands; texts sharing any band key are candidate duplicates, which finds pairs above a
+    similarity of roughly (1 / bands) ** (1 / rows) while comparing only a handful of candidates.
+
+    Numbers are replaced with "0" before shingling, so blasts that only differ in prices, dates or
+    tracking numbers still match.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 3, min_shingles: int = 8,
+                 seed: int = 0):
+        """
+        Initialize the MinHasher.
+
+        Args:
+            num_perm: The signature length. Must be divisible by `bands`.
+            bands: The number of LSH bands. With 128 permutations, 16 bands of 8 rows make texts
+                above ~70% similarity likely candidates.
+            shingle_size: The number of consecutive words per shingle.
+            min_shingles: Texts with fewer shingles get no signature, since short emails such as
+                "Thanks!" are identical without being duplicates.
+            seed: Seed for the permutations. Stored signatures are only comparable between
+                hashers with the same seed and sizes.
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MAX_COEFFICIENT, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MAX_COEFFICIENT, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set[int]:
+        """Get the hashed word shingles of a text."""
+        words = [re.sub(r"\d+", "0", word) for word in WORD_PATTERN.findall(text.lower())]
+        if len(words) < self.shingle_size:
+            return set()
+        return {zlib.crc32(" ".join(words[i:i + self.shingle_size]).encode("utf-8"))
+                for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray | None:
+        """
+        Compute the MinHash signature of a text.
+
+        Returns:
+            np.ndarray | None: The (num_perm,) uint32 signature, or None if the text is too short.
+        """
+        shingles = self.shingles(text)
+        if len(shingles) < self.min_shingles:
+            return None
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray, namespace: str = "") -> list[int]:
+        """
+        Get the LSH bucket key of every band of a signature.
+
+        Args:
+            signature (np.ndarray): The signature.
+            namespace (str, optional): Mixed into every key, so only signatures of the same
+                namespace (e.g. the same sender) share buckets.
+
+        Returns:
+            list[int]: One key per band.
+        """
+        prefix = namespace.encode("utf-8")
+        return [zlib.crc32(prefix + signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    @staticmethod
+    def subject_similarity(subject: str, other: str) -> float:
+        """
+        Get the Jaccard similarity of the words of two subjects, ignoring case and numbers.
+
+        Transactional emails share a template but differ in their subject ("Bill increase alert",
+        "Late fee charged"), so near-duplicates must also have similar subjects.
+        """
+        words = {re.sub(r"\d+", "0", word) for word in WORD_PATTERN.findall(subject.lower())}
+        other_words = {re.sub(r"\d+", "0", word) for word in WORD_PATTERN.findall(other.lower())}
+        if not words and not other_words:
+            return 1.0
+        return len(words & other_words) / len(words | other_words)
+
+    @staticmethod
+    def similarity(signature: np.ndarray, other: np.ndarray) -> float:
+        """Estimate the Jaccard similarity of the texts behind two signatures."""
+        return float(np.mean(signature == other))
@@ -0,0 +1,167 @@
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+import geocoder
+
+
+LOCATION_KEYS = ("lat", "lng", "city", "state", "country")
+
+
+def lookup_ip_geolocation() -> dict:
+    """
+    Look up the geolocation of the user's IP address over the network.
+
+    Returns:
+        dict: A dictionary with 'lat', 'lng', 'city', 'state' and 'country' entries.
+
+    Raises:
+        RuntimeError: If the lookup fails.
+    """
+    g = geocoder.ip('me')
+    if not g.ok or g.latlng is None:
+        raise RuntimeError(f"IP geolocation lookup failed: {g.status}")
+    return {
+        'lat': g.latlng[0],
+        'lng': g.latlng[1],
+        'city': g.city,
+        'state': g.state,
+        'country': g.country
+    }
+
+
+class LocationService:
+    """
+    Provides the user's location from a process-wide cache.
+
+    The location is looked up at most once per `ttl` seconds. Once the cached value is stale it is
+    still served while a background thread refreshes it, so callers never wait on the network
+    after the first lookup. The last known location is persisted to disk and used as the offline
+    fallback, both at startup and whenever a lookup fails. A fixed location can be configured with
+    the `AIPA_LOCATION` environment variable (a JSON object with the keys in `LOCATION_KEYS`),
+    which disables lookups entirely.
+    """
+
+    def __init__(
+        self,
+        lookup: callable = lookup_ip_geolocation,
+        ttl: float = 60 * 60,
+        cache_path: str | None = "config/last_location.json",
+        override: dict | None = None
+    ):
+        """
+        Initialize the LocationService.
+
+        Args:
+            lookup: Callable performing the actual location lookup. Tests can inject a stub here.
+            ttl: How long, in seconds, a looked-up location is considered fresh.
+            cache_path: Path of the file persisting the last known location. If None, nothing is
+                persisted.
+            override: A fixed location to always return. Defaults to the `AIPA_LOCATION`
+                environment variable, if set.
+        """
+        self.lookup = lookup
+        self.ttl = ttl
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        if override is None and os.getenv("AIPA_LOCATION"):
+            override = json.loads(os.getenv("AIPA_LOCATION"))
+        self.override = override
+        self.location = None
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def get(self) -> dict:
+        """
+        Get the user's location.
+
+        Returns:
+            dict: A dictionary containing geolocation information:
+                - lat (float): Latitude
+                - lng (float): Longitude
+                - city (str): City name
+                - state (str): State name
+                - country (str): Country name
+
+        Raises:
+            RuntimeError: If no location has ever been determined and the lookup fails.
+        """
+        if self.override is not None:
+            return dict(self.override)
+
+        with self._lock:
+            if self.location is None:
+                self.location, self.fetched_at = self._load_persisted()
+
+        if self.location is None:
+            # Nothing known yet, so there is nothing to serve while waiting on the lookup
+            self.refresh()
+        elif time.time() - self.fetched_at > self.ttl:
+            self._start_background_refresh()
+
+        if self.location is None:
+            raise RuntimeError("Unable to determine the user's location")
+        return dict(self.location)
+
+    def refresh(self):
+        """
+        Look up the location now, keeping the last known location if the lookup fails.
+        """
+        try:
+            location = self.lookup()
+        except Exception as error:
+            print(f"Location lookup failed, using last known location: {error}")
+            return
+        with self._lock:
+            self.location = location
+            self.fetched_at = time.time()
+            self._persist()
+
+    def invalidate(self):
+        """Mark the cached location as stale so the next `get` triggers a refresh."""
+        self.fetched_at = 0.0
+
+    def _start_background_refresh(self):
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+            self._refresh_thread.start()
+
+    def _load_persisted(self) -> tuple[dict | None, float]:
+        """Load the last known location from disk. Must be called with the lock held."""
+        if self.cache_path is None or not self.cache_path.exists():
+            return None, 0.0
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+            return data["location"], data["fetched_at"]
+        except (OSError, KeyError, json.JSONDecodeError):
+            return None, 0.0
+
+    def _persist(self):
+        """Write the current location to disk. Must be called with the lock held."""
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, "w") as f:
+                json.dump({"location": self.location, "fetched_at": self.fetched_at}, f)
+        except OSError as error:
+            print(f"Could not persist location: {error}")
+
+
+LOCATION_SERVICE = LocationService()
+
+
+def set_location_service(service: LocationService):
+    """
+    Replace the process-wide location service, e.g. with one using a stub lookup in tests.
+
+    Args:
+        service (LocationService): The location service to use from now on.
+    """
+    global LOCATION_SERVICE
+    LOCATION_SERVICE = service
@@ -1,23 +1,48 @@
-from requests_cache import datetime
+from datetime import datetime
 from models import OllamaModel
 
+from agents.agent_context import AgentContext
+from agents.agent_pool import AGENT_POOL
 from agents.assistant_agent import AssistantAgent
+from agents.context_compactor import COMPACTOR_MODEL_NAME, ContextCompactor
+from agents.context_store import ContextStore
+from clock import SimulatedClock, set_clock
+from scheduling import Scheduler
 
-from email_handling import GmailHandler
+from email_handling import GMAIL_HANDLER, EmailSyncWorker, GmailHandler
 from agents import EmailAgent
 
 
 if __name__ == "__main__": 
+    clock = SimulatedClock(datetime(2025, 11, 5, 7, 0))  # Nov 5, 2025, 7:00 AM
+    set_clock(clock)
+
     assistant_model = OllamaModel("gpt-oss:20b")
-    assistant_agent = AssistantAgent(assistant_model, "agents/prompts/assistant_agent")
+    compactor = ContextCompactor(AGENT_POOL.get_model(COMPACTOR_MODEL_NAME))
+    compactor.start()
+    assistant_agent = AssistantAgent(assistant_model, "agents/prompts/assistant_agent", max_concurrent_tasks=2,
+                                     clock=clock, agent_context=AgentContext(store=ContextStore()),
+                                     compactor=compactor)
+
+    # New mail is synced in the background and arrives as notifications
+    email_sync = EmailSyncWorker(GMAIL_HANDLER, agent_context=assistant_agent.agent_context)
+    email_sync.start()
+
+    # The context is persisted, so instructions from a previous run are already there
+    known_context = {item.content for item in assistant_agent.agent_context.context_items.values()}
+    for instruction in ["RECURRING INSTRUCTION: Wake me up at 7:00 AM every weekday.",
+                        "RECURRING INSTRUCTION: Have coffee ready by 7:15 AM every weekday."]:
+        if instruction not in known_context:
+            assistant_agent.agent_context.add_context(instruction)
+
+    # The scheduler only wakes the agent when a recurring instruction is due or a notification
+    # arrives, instead of polling cycle_step()
+    scheduler = Scheduler(assistant_agent, clock=clock)
+    scheduler.run_pending()
 
-    assistant_agent.agent_context.add_context("RECURRING INSTRUCTION: Wake me up at 7:00 AM every weekday.")
-    assistant_agent.agent_context.add_context("RECURRING INSTRUCTION: Have coffee ready by 7:15 AM every weekday.")
+    clock.set(datetime(2025, 11, 5, 7, 15))  # Nov 5, 2025, 7:15 AM
 
-    assistant_agent.cycle_step()
-    assistant_agent.cycle_step()
+    scheduler.run_pending()
 
-    assistant_agent.debug_time = datetime(2025, 11, 5, 7, 5)  # Nov 5, 2025, 7:05 AM
-    
-    assistant_agent.cycle_step()
-    assistant_agent.cycle_step()
\ No newline at end of file
+    email_sync.stop()
+    compactor.stop()
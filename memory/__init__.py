@@ -0,0 +1,11 @@
+from .embedder import HashingEmbedder
+from .memory_store import MemoryRecord, MemoryStore
+from .vector_index import LSHIndex
+
+
+__all__ = [
+    "HashingEmbedder",
+    "LSHIndex",
+    "MemoryRecord",
+    "MemoryStore",
+]
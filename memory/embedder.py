@@ -0,0 +1,60 @@
+import hashlib
+import re
+
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """
+    Embeds text with the hashing trick, so no model has to be downloaded or run.
+
+    Each word and word bigram is hashed to one of `dim` buckets with a hash-derived sign, and the
+    resulting count vector is L2-normalized. Texts sharing vocabulary get a high cosine
+    similarity, which is enough to recall related tasks and context on the CPU in microseconds.
+    """
+
+    def __init__(self, dim: int = 512, use_bigrams: bool = True):
+        """
+        Initialize the HashingEmbedder.
+
+        Args:
+            dim: The number of dimensions of the embeddings.
+            use_bigrams: Whether word bigrams are hashed in addition to single words.
+        """
+        self.dim = dim
+        self.use_bigrams = use_bigrams
+
+    def features(self, text: str) -> list[str]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = list(tokens)
+        if self.use_bigrams:
+            features.extend(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a text.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            np.ndarray: A float32 vector of length `dim` with unit norm, or all zeros for a text
+            without words.
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self.features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if (value >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed several texts into a (len(texts), dim) matrix."""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
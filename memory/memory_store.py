@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import json
+from pathlib import Path
+import threading
+
+from clock import get_clock
+from memory.embedder import HashingEmbedder
+from memory.vector_index import LSHIndex
+
+
+@dataclass
+class MemoryRecord:
+    """
+    A single long-term memory.
+
+    Attributes:
+        text (str): The remembered text.
+        source (str): Where the memory came from, e.g. "task", "context" or "email".
+        created_at (datetime): When the memory was stored.
+        metadata (dict): Free-form extra information.
+    """
+    text: str
+    source: str
+    created_at: datetime
+    metadata: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "source": self.source,
+            "created_at": self.created_at.isoformat(),
+            "metadata": self.metadata
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MemoryRecord":
+        return cls(
+            text=data["text"],
+            source=data["source"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+            metadata=data.get("metadata", {})
+        )
+
+    def __str__(self):
+        return f"[{self.source}, {self.created_at.strftime('%Y-%m-%d %H:%M')}] {self.text}"
+
+
+class MemoryStore:
+    """
+    Long-term memory of completed tasks, email summaries and evicted context.
+
+    Memories are embedded with a `HashingEmbedder` and indexed in an `LSHIndex`, so only the few
+    memories relevant to the task at hand are retrieved into a prompt. Records are appended to a
+    JSONL file; since the embedder is deterministic, vectors are recomputed on load rather than
+    stored. Identical texts are only stored once.
+    """
+
+    def __init__(self, store_path: str | None = "config/memory.jsonl", embedder: HashingEmbedder | None = None):
+        """
+        Initialize the MemoryStore.
+
+        Args:
+            store_path: Path to the JSONL file persisting the memories. If None, memories are kept
+                in memory only.
+            embedder: The embedder to use. Defaults to a `HashingEmbedder`.
+        """
+        self.store_path = Path(store_path) if store_path is not None else None
+        self.embedder = embedder if embedder is not None else HashingEmbedder()
+        self.index = LSHIndex(self.embedder.dim)
+        self.records: list[MemoryRecord] = []
+        self._digests = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _load(self):
+        if self.store_path is None or not self.store_path.exists():
+            return
+        with open(self.store_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = MemoryRecord.from_dict(json.loads(line))
+                except (json.JSONDecodeError, KeyError, ValueError) as error:
+                    print(f"Skipping unreadable memory record: {error}")
+                    continue
+                digest = self._digest(record.text)
+                if digest not in self._digests:
+                    self._digests.add(digest)
+                    self.records.append(record)
+        self.index.add(self.embedder.embed_batch([record.text for record in self.records]))
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.strip().lower().encode("utf-8")).hexdigest()
+
+    def add(self, text: str, source: str, metadata: dict | None = None) -> MemoryRecord | None:
+        """
+        Store a memory.
+
+        Args:
+            text (str): The text to remember.
+            source (str): Where the memory came from, e.g. "task".
+            metadata (dict | None, optional): Free-form extra information.
+
+        Returns:
+            MemoryRecord | None: The new record, or None if the text was empty or already stored.
+        """
+        text = text.strip()
+        if not text:
+            return None
+        digest = self._digest(text)
+        record = MemoryRecord(text=text, source=source, created_at=get_clock().now(), metadata=metadata or {})
+        vector = self.embedder.embed(text)
+        with self._lock:
+            if digest in self._digests:
+                return None
+            self._digests.add(digest)
+            self.records.append(record)
+            self.index.add(vector)
+            if self.store_path is not None:
+                self.store_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.store_path, "a") as f:
+                    f.write(json.dumps(record.to_dict()) + "\n")
+        return record
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.2) -> list[tuple[MemoryRecord, float]]:
+        """
+        Find the memories most relevant to a query.
+
+        Args:
+            query (str): The query text, e.g. a task goal.
+            k (int, optional): The maximum number of memories to return.
+            min_score (float, optional): The minimum cosine similarity of a returned memory.
+
+        Returns:
+            list[tuple[MemoryRecord, float]]: (memory, similarity) pairs, most similar first.
+        """
+        vector = self.embedder.embed(query)
+        with self._lock:
+            hits = self.index.search(vector, k)
+            return [(self.records[record_id], score) for record_id, score in hits if score >= min_score]
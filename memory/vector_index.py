@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class LSHIndex:
+    """
+    Approximate nearest-neighbour index over unit vectors using random-hyperplane LSH.
+
+    Every vector is hashed in `num_tables` tables by the signs of its projections onto
+    `num_bits` random hyperplanes. A query only scores the vectors sharing a bucket with it in
+    some table, then ranks those candidates by exact cosine similarity. If the buckets yield fewer
+    than `k` candidates, the query falls back to scoring every vector, which is cheap at the sizes
+    a personal assistant accumulates.
+    """
+
+    def __init__(self, dim: int, num_tables: int = 8, num_bits: int = 10, seed: int = 0):
+        """
+        Initialize the LSHIndex.
+
+        Args:
+            dim: The dimension of the indexed vectors.
+            num_tables: The number of hash tables. More tables find more true neighbours.
+            num_bits: The number of hyperplanes per table. More bits make buckets smaller.
+            seed: Seed for the random hyperplanes, so a rebuilt index hashes identically.
+        """
+        self.dim = dim
+        rng = np.random.default_rng(seed)
+        self.hyperplanes = rng.standard_normal((num_tables, num_bits, dim)).astype(np.float32)
+        self.bit_weights = 1 << np.arange(num_bits, dtype=np.int64)
+        self.tables: list[dict[int, list[int]]] = [{} for _ in range(num_tables)]
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        """Get the (len(vectors), num_tables) bucket keys of some vectors."""
+        bits = np.einsum("tbd,nd->ntb", self.hyperplanes, vectors) > 0
+        return bits.astype(np.int64) @ self.bit_weights
+
+    def add(self, vectors: np.ndarray) -> list[int]:
+        """
+        Add vectors to the index.
+
+        Args:
+            vectors (np.ndarray): A (n, dim) matrix, or a single vector of length dim.
+
+        Returns:
+            list[int]: The positions of the added vectors, used as their ids.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        start = self._size
+        # Grow the backing matrix geometrically so repeated adds stay amortized O(1)
+        if start + len(vectors) > len(self.vectors):
+            capacity = max(2 * len(self.vectors), start + len(vectors), 64)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:start] = self.vectors[:start]
+            self.vectors = grown
+        self.vectors[start:start + len(vectors)] = vectors
+        self._size += len(vectors)
+
+        for offset, keys in enumerate(self._hash(vectors)):
+            for table, key in zip(self.tables, keys):
+                table.setdefault(int(key), []).append(start + offset)
+        return list(range(start, self._size))
+
+    def search(self, vector: np.ndarray, k: int = 5) -> list[tuple[int, float]]:
+        """
+        Find the indexed vectors most similar to a query vector.
+
+        Args:
+            vector (np.ndarray): The query vector.
+            k (int, optional): The number of results.
+
+        Returns:
+            list[tuple[int, float]]: Up to `k` (id, cosine similarity) pairs, most similar first.
+        """
+        if self._size == 0 or k <= 0:
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        keys = self._hash(vector[None, :])[0]
+        candidates = set()
+        for table, key in zip(self.tables, keys):
+            candidates.update(table.get(int(key), ()))
+        if len(candidates) < k:
+            candidate_ids = np.arange(self._size)
+        else:
+            candidate_ids = np.fromiter(candidates, dtype=np.int64)
+
+        scores = self.vectors[candidate_ids] @ vector
+        top = np.argsort(-scores)[:k]
+        return [(int(candidate_ids[i]), float(scores[i])) for i in top]
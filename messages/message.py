@@ -133,5 +133,33 @@ class Message:
         
         return result
 
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Message':
+        """
+        Reconstruct a Message from a dictionary created by `to_dict`.
+
+        Args:
+            data (dict): The message data.
+
+        Returns:
+            Message: The reconstructed message.
+        """
+        tool_calls = None
+        if data.get("tool_calls"):
+            tool_calls = [
+                ToolCall(
+                    name=tc["function"]["name"],
+                    arguments=tc["function"]["arguments"],
+                    id=tc.get("id")
+                )
+                for tc in data["tool_calls"]
+            ]
+        return cls(
+            role=data["role"],
+            content=data.get("content", ""),
+            thinking=data.get("thinking", ""),
+            tool_calls=tool_calls
+        )
+
     def __str__(self):
         return f"Message(role={self.role}, content={self.content}, thinking={self.thinking}, tool_calls={self.tool_calls})"
\ No newline at end of file
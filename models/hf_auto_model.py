@@ -6,6 +6,7 @@ from transformers import AutoModelForCausalLM, AutoTokenizer
 
 from models.model import Model
 from messages import Message, ToolCall
+from tool_registry import ToolSet
 
 
 class HFAutoModel(Model):
@@ -109,7 +110,8 @@ class HFAutoModel(Model):
                  max_length: int = 2048,
                  temperature: float = 0.7,
                  reasoning: bool = False,
-                 format: str | None = None) -> Message:
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
         """
         Generates a response from the model based on the provided messages.
 
@@ -121,6 +123,8 @@ class HFAutoModel(Model):
             False
             format (str | None, optional): The output format for the response. Currently supports
             "json" for JSON-formatted output. Defaults to None.
+            tools (ToolSet | None, optional): A pre-serialized tool set to offer the model. If None,
+            the tools added directly to the model are used. Defaults to None.
 
         Returns:
             Message: A Message object containing the response, thinking process, and tool calls.
@@ -137,11 +141,16 @@ class HFAutoModel(Model):
                 modified_messages[-1]["content"] += "\n\nPlease respond with valid JSON only."
             message_dicts = modified_messages
         
+        if tools is not None:
+            tool_specs = tools.serialized
+        else:
+            tool_specs = list(self.tools.values())
+
         text = self.tokenizer.apply_chat_template(
             message_dicts,
             add_generation_prompt=True,
             tokenize=False,
-            tools=list(self.tools.values()),
+            tools=tool_specs,
             enable_thinking=reasoning
         )
 
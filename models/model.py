@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 import torch
 
 from messages import Message, ToolCall
+from tool_registry import ToolSet
 
 
 class Model(ABC):
@@ -19,7 +20,8 @@ class Model(ABC):
                  max_length: int = 2048,
                  temperature: float = 0.8,
                  reasoning: bool = False,
-                 format: str | None = None) -> Message:
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
         raise NotImplementedError("Subclasses must implement this method.")
     
     @abstractmethod
@@ -2,6 +2,7 @@ from ollama import chat
 
 from models.model import Model
 from messages import Message, ToolCall
+from tool_registry import ToolSet
 
 
 class OllamaModel(Model):
@@ -13,7 +14,8 @@ class OllamaModel(Model):
                  max_length: int = 2048,
                  temperature: float = 0.8,
                  reasoning: bool = False,
-                 format: str | None = None) -> Message:
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
         """
         Generates a response from the model based on the provided messages.
 
@@ -25,6 +27,8 @@ class OllamaModel(Model):
             False
             format (str | None, optional): The output format for the response. Currently supports
             "json" for JSON-formatted output. Defaults to None.
+            tools (ToolSet | None, optional): A pre-serialized tool set to offer the model. If None,
+            the tools added directly to the model are used. Defaults to None.
 
         Returns:
             Message: A Message object containing the response, thinking process, and tool calls.
@@ -32,6 +36,11 @@ class OllamaModel(Model):
         # Convert Message objects to dictionaries for the Ollama API
         message_dicts = [msg.to_dict() for msg in messages]
         
+        if tools is not None:
+            tool_specs = tools.serialized
+        else:
+            tool_specs = [tool["function"] for tool in self.tools.values()]
+
         chat_kwargs = {
             "model": self.model_name,
             "messages": message_dicts,
@@ -40,7 +49,7 @@ class OllamaModel(Model):
                 "temperature": temperature,
             },
             "think": reasoning,
-            "tools": [tool["function"] for tool in self.tools.values()]
+            "tools": tool_specs
         }
         
         # Add format parameter if specified
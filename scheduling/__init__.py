@@ -0,0 +1,5 @@
+from .recurring import RecurringTrigger, parse_recurring_instruction
+from .scheduler import Scheduler
+
+
+__all__ = ["RecurringTrigger", "parse_recurring_instruction", "Scheduler"]
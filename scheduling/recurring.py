@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import re
+
+
+RECURRING_PREFIX = "RECURRING INSTRUCTION:"
+
+WEEKDAY_NAMES = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+ALL_DAYS = frozenset(range(7))
+WEEKDAYS = frozenset(range(5))
+WEEKEND = frozenset({5, 6})
+
+TIME_12H_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s?m\b\.?", re.IGNORECASE)
+TIME_24H_PATTERN = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+DAY_NAME_PATTERN = re.compile(r"\b(" + "|".join(sorted(WEEKDAY_NAMES, key=len, reverse=True)) + r")s?\b",
+                              re.IGNORECASE)
+# Instructions with a deadline ("Have coffee ready by 7:15 AM") rather than a start time
+DEADLINE_PATTERN = re.compile(r"\b(ready|done|finished|prepared|made|brewed|warm|set up)\s+by\b", re.IGNORECASE)
+# How long before its deadline a "ready by" instruction fires, e.g. to brew the coffee
+READY_BY_LEAD_TIME = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class RecurringTrigger:
+    """
+    A recurring time of day, on a set of days of the week, parsed from a recurring instruction.
+
+    Attributes:
+        instruction (str): The instruction text the trigger was parsed from.
+        hour (int): The hour of the day (0-23).
+        minute (int): The minute of the hour.
+        days (frozenset[int]): The days of the week the trigger fires on (Monday is 0).
+        context_id (int | None): The id of the context item holding the instruction, if any.
+        lead_time (timedelta): How long before `hour`:`minute` the trigger fires, for instructions
+            whose time is a deadline.
+    """
+    instruction: str
+    hour: int
+    minute: int
+    days: frozenset[int] = ALL_DAYS
+    context_id: int | None = None
+    lead_time: timedelta = timedelta(0)
+
+    def next_occurrence(self, after: datetime) -> datetime:
+        """
+        Get the first time at or after `after` at which the trigger fires.
+
+        The trigger fires `lead_time` before its time of day, on the days of its time of day.
+
+        Args:
+            after (datetime): The earliest acceptable time.
+
+        Returns:
+            datetime: The next time the trigger fires.
+        """
+        earliest = after + self.lead_time
+        candidate = earliest.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate < earliest.replace(second=0, microsecond=0):
+            candidate += timedelta(days=1)
+        while candidate.weekday() not in self.days:
+            candidate += timedelta(days=1)
+        return candidate - self.lead_time
+
+    def time_str(self) -> str:
+        return datetime(2000, 1, 1, self.hour, self.minute).strftime("%I:%M %p")
+
+
+def parse_recurring_instruction(instruction: str, context_id: int | None = None,
+                                lead_time: timedelta = READY_BY_LEAD_TIME) -> RecurringTrigger | None:
+    """
+    Parse a recurring instruction such as "Wake me up at 7:00 AM every weekday" into a trigger.
+
+    Both 12-hour ("7:00 AM", "7pm") and 24-hour ("19:30") times are understood, as are "noon" and
+    "midnight". Days may be given as "every day"/"daily", "weekday(s)", "weekend(s)" or day names.
+    If no days are given the trigger fires every day. A time that is a deadline ("Have coffee
+    ready by 7:15 AM") makes the trigger fire `lead_time` early, so the work is done in time.
+
+    Args:
+        instruction (str): The instruction text, with or without the "RECURRING INSTRUCTION:" prefix.
+        context_id (int | None, optional): The id of the context item holding the instruction.
+        lead_time (timedelta, optional): How early deadline instructions fire.
+
+    Returns:
+        RecurringTrigger | None: The parsed trigger, or None if the instruction has no time of day.
+    """
+    text = instruction
+    if text.upper().startswith(RECURRING_PREFIX):
+        text = text[len(RECURRING_PREFIX):]
+    text = text.strip()
+    lowered = text.lower()
+
+    match = TIME_12H_PATTERN.search(text)
+    if match:
+        hour = int(match.group(1)) % 12
+        minute = int(match.group(2) or 0)
+        if match.group(3).lower() == "p":
+            hour += 12
+    elif (match := TIME_24H_PATTERN.search(text)):
+        hour, minute = int(match.group(1)), int(match.group(2))
+    elif "noon" in lowered:
+        hour, minute = 12, 0
+    elif "midnight" in lowered:
+        hour, minute = 0, 0
+    else:
+        return None
+    if hour > 23 or minute > 59:
+        return None
+
+    if re.search(r"\bweekdays?\b", lowered):
+        days = WEEKDAYS
+    elif re.search(r"\bweekends?\b", lowered):
+        days = WEEKEND
+    else:
+        named_days = {WEEKDAY_NAMES[name.lower()] for name in DAY_NAME_PATTERN.findall(text)}
+        days = frozenset(named_days) if named_days else ALL_DAYS
+
+    lead_time = lead_time if DEADLINE_PATTERN.search(text) else timedelta(0)
+    return RecurringTrigger(instruction=text, hour=hour, minute=minute, days=days, context_id=context_id,
+                            lead_time=lead_time)
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import threading
+
+from agents.agent_context import ContextItem, Notification
+from clock import Clock
+from scheduling.recurring import RECURRING_PREFIX, RecurringTrigger, parse_recurring_instruction
+
+
+class Scheduler:
+    """
+    Wakes an assistant agent only when something needs its attention.
+
+    Recurring instructions in the agent's context are parsed into timer entries kept on a heap
+    ordered by due time. The scheduler sleeps until the earliest entry is due or a new notification
+    is added to the agent's context, and only then runs the agent's cycle steps. When nothing is
+    due, no LLM calls are made at all.
+    """
+
+    def __init__(self, agent, clock: Clock | None = None, max_steps_per_wakeup: int = 10):
+        """
+        Initialize the Scheduler.
+
+        Args:
+            agent: The agent to drive. Must provide `agent_context`, `tasks`, `clock` and
+                `cycle_step()`.
+            clock: The clock to schedule against. Defaults to the agent's clock.
+            max_steps_per_wakeup: The maximum number of cycle steps run per wakeup.
+        """
+        self.agent = agent
+        self._clock = clock
+        self.max_steps_per_wakeup = max_steps_per_wakeup
+        self.timers = []  # heap of (due, seq, RecurringTrigger)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self.wakeups = 0
+
+        for context_item in list(self.agent.agent_context.context_items.values()):
+            self._schedule_from_context(context_item)
+        self.agent.agent_context.add_listener(self._on_context_item)
+
+    def now(self) -> datetime:
+        clock = self._clock if self._clock is not None else self.agent.clock
+        return clock.now()
+
+    def _on_context_item(self, item: ContextItem):
+        if isinstance(item, Notification):
+            self._wakeup.set()
+        elif self._schedule_from_context(item):
+            # The new timer may be due before the one currently being waited on
+            self._wakeup.set()
+
+    def _schedule_from_context(self, item: ContextItem) -> bool:
+        if not item.content.upper().startswith(RECURRING_PREFIX):
+            return False
+        trigger = parse_recurring_instruction(item.content, context_id=item.id)
+        if trigger is None:
+            print(f"Could not parse a time from recurring instruction: {item.content}")
+            return False
+        self.add_trigger(trigger)
+        return True
+
+    def add_trigger(self, trigger: RecurringTrigger, after: datetime | None = None):
+        """
+        Schedule the next occurrence of a trigger.
+
+        Args:
+            trigger (RecurringTrigger): The trigger to schedule.
+            after (datetime | None, optional): The earliest time the trigger may fire. Defaults to
+                now.
+        """
+        due = trigger.next_occurrence(after if after is not None else self.now())
+        with self._lock:
+            heapq.heappush(self.timers, (due, next(self._seq), trigger))
+
+    def next_due(self) -> datetime | None:
+        """Get the time the earliest timer is due, or None if there are no timers."""
+        with self._lock:
+            return self.timers[0][0] if self.timers else None
+
+    def pop_due(self, now: datetime) -> list[tuple[datetime, RecurringTrigger]]:
+        """
+        Remove every timer due at or before `now`, rescheduling each for its next occurrence.
+
+        A timer that was missed several times (e.g. while the process was down) fires only once.
+        Timers whose instruction has been removed from the agent's context are dropped.
+
+        Args:
+            now (datetime): The current time.
+
+        Returns:
+            list[tuple[datetime, RecurringTrigger]]: The due times and triggers that fired.
+        """
+        fired = []
+        with self._lock:
+            while self.timers and self.timers[0][0] <= now:
+                due, _, trigger = heapq.heappop(self.timers)
+                if (trigger.context_id is not None
+                        and trigger.context_id not in self.agent.agent_context.context_items):
+                    continue
+                fired.append((due, trigger))
+        for due, trigger in fired:
+            self.add_trigger(trigger, after=max(due, now) + timedelta(minutes=1))
+        return fired
+
+    def run_pending(self, now: datetime | None = None) -> int:
+        """
+        Fire every due timer and, if anything needs attention, wake the agent.
+
+        Each fired timer is posted to the agent's context as a notification. The agent is woken if
+        a timer fired, there are unhandled notifications, or it still has unfinished tasks.
+
+        Args:
+            now (datetime | None, optional): The current time. Defaults to `now()`.
+
+        Returns:
+            int: The number of cycle steps the agent ran.
+        """
+        now = now if now is not None else self.now()
+        agent_context = self.agent.agent_context
+        for due, trigger in self.pop_due(now):
+            timing = f"due at {due.strftime('%I:%M %p on %A')}"
+            if trigger.lead_time:
+                timing += f", to be ready by {(due + trigger.lead_time).strftime('%I:%M %p')}"
+            agent_context.add_notification(f"SCHEDULED: {trigger.instruction} ({timing})")
+
+        if not agent_context.notifications and not self.agent.tasks:
+            return 0
+        return self._wake_agent()
+
+    def _wake_agent(self) -> int:
+        agent_context = self.agent.agent_context
+        handled_notifications = list(agent_context.notifications)
+        self.wakeups += 1
+
+        steps = 0
+        while steps < self.max_steps_per_wakeup:
+            self.agent.cycle_step()
+            steps += 1
+            if not self.agent.tasks:
+                break
+
+        for notification_id in handled_notifications:
+            agent_context.remove_notification(notification_id)
+        return steps
+
+    def run_forever(self):
+        """
+        Drive the agent until `stop` is called, sleeping between due timers and notifications.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            self.run_pending()
+            next_due = self.next_due()
+            timeout = None
+            if next_due is not None:
+                timeout = max(0.0, (next_due - self.now()).total_seconds())
+            self._wakeup.wait(timeout)
+
+    def stop(self):
+        """Stop `run_forever`."""
+        self._stop.set()
+        self._wakeup.set()
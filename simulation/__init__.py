@@ -0,0 +1,13 @@
+from .backends import MeteredModel, RecordingModel, ReplayModel, ScriptedModel, UsageMeter
+from .replay import ReplayRunner, format_report
+
+
+__all__ = [
+    "MeteredModel",
+    "RecordingModel",
+    "ReplayModel",
+    "ScriptedModel",
+    "UsageMeter",
+    "ReplayRunner",
+    "format_report",
+]
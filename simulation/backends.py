@@ -0,0 +1,222 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import hashlib
+import json
+from pathlib import Path
+import re
+import threading
+import time
+
+from clock import Clock, get_clock
+from messages import Message, ToolCall
+from models.model import Model
+from tool_registry import ToolSet
+from utils import estimate_tokens
+
+
+def messages_key(messages: list[Message]) -> str:
+    """Hash a prompt's messages, used to match recorded responses to prompts."""
+    serialized = json.dumps([msg.to_dict() for msg in messages], sort_keys=True)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+class UsageMeter:
+    """
+    Records LLM calls made through `MeteredModel`s, bucketed by simulated hour.
+    """
+
+    def __init__(self, clock: Clock | None = None):
+        self._clock = clock
+        self.records = []  # (time, latency, prompt_tokens, completion_tokens)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, prompt_tokens: int, completion_tokens: int):
+        clock = self._clock if self._clock is not None else get_clock()
+        with self._lock:
+            self.records.append((clock.now(), latency, prompt_tokens, completion_tokens))
+
+    def hourly(self, start: datetime, end: datetime) -> dict[datetime, dict]:
+        """
+        Summarize recorded calls per hour between `start` and `end`, including idle hours.
+
+        Returns:
+            dict[datetime, dict]: For each hour, the number of 'llm_calls', 'prompt_tokens',
+            'completion_tokens' and the total 'latency' in seconds.
+        """
+        hours = {}
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        while hour < end:
+            hours[hour] = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0}
+            hour += timedelta(hours=1)
+        with self._lock:
+            records = list(self.records)
+        for when, latency, prompt_tokens, completion_tokens in records:
+            bucket = hours.setdefault(
+                when.replace(minute=0, second=0, microsecond=0),
+                {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0}
+            )
+            bucket["llm_calls"] += 1
+            bucket["prompt_tokens"] += prompt_tokens
+            bucket["completion_tokens"] += completion_tokens
+            bucket["latency"] += latency
+        return dict(sorted(hours.items()))
+
+
+class MeteredModel(Model):
+    """
+    Wraps a model and records the latency and estimated token usage of every call.
+    """
+
+    def __init__(self, model: Model, meter: UsageMeter):
+        super().__init__(device=getattr(model, "device", "cpu"))
+        self.model = model
+        self.meter = meter
+
+    def generate(self, messages: list[Message],
+                 max_length: int = 2048,
+                 temperature: float = 0.8,
+                 reasoning: bool = False,
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
+        start = time.perf_counter()
+        message = self.model.generate(messages, max_length=max_length, temperature=temperature,
+                                      reasoning=reasoning, format=format, tools=tools)
+        latency = time.perf_counter() - start
+
+        prompt_tokens = sum(estimate_tokens(msg.content) for msg in messages)
+        if tools is not None and len(tools) > 0:
+            prompt_tokens += estimate_tokens(json.dumps(tools.serialized))
+        completion_tokens = estimate_tokens(message.content) + estimate_tokens(message.thinking)
+        self.meter.record(latency, prompt_tokens, completion_tokens)
+        return message
+
+    def parse_tool_calls(self, raw_tool_calls) -> list[ToolCall] | None:
+        return self.model.parse_tool_calls(raw_tool_calls)
+
+    def add_tool(self, tool_schema: dict, tool_function: callable):
+        self.model.add_tool(tool_schema, tool_function)
+
+    def remove_tool(self, tool_name: str):
+        self.model.remove_tool(tool_name)
+
+
+class ScriptedModel(Model):
+    """
+    A fake backend that answers the assistant's prompts with fixed, rule-based responses.
+
+    Task generation turns the first scheduled notification into a goal (or replies "Standby."),
+    task selection picks the first task, planning returns a two-step plan, and task steps call
+    `mark_task_completed`. Any other prompt gets a short acknowledgement.
+    """
+
+    def __init__(self, model_name: str = "scripted"):
+        super().__init__(device="cpu")
+        self.model_name = model_name
+
+    def generate(self, messages: list[Message],
+                 max_length: int = 2048,
+                 temperature: float = 0.8,
+                 reasoning: bool = False,
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
+        prompt = messages[-1].content
+        if "generate the next task" in prompt:
+            scheduled = re.search(r"SCHEDULED: (.*?) \((?:due at|started at)", prompt)
+            return Message(role="assistant", content=scheduled.group(1) if scheduled else "Standby.")
+        if "select a single task" in prompt:
+            return Message(role="assistant", content="1")
+        if "step-by-step plan" in prompt:
+            return Message(role="assistant", content="1. Carry out the task.\n2. Mark the task as completed.")
+        if tools is not None and "mark_task_completed" in tools:
+            return Message(role="assistant", content="Marking the task as completed.",
+                           tool_calls=[ToolCall(name="mark_task_completed", arguments={})])
+        return Message(role="assistant", content="OK.")
+
+    def parse_tool_calls(self, raw_tool_calls) -> list[ToolCall] | None:
+        return raw_tool_calls or None
+
+    def add_tool(self, tool_schema: dict, tool_function: callable):
+        pass
+
+    def remove_tool(self, tool_name: str):
+        pass
+
+
+class RecordingModel(Model):
+    """
+    Wraps a model and appends every prompt/response pair to a JSONL recording for later replay.
+    """
+
+    def __init__(self, model: Model, recording_path: str):
+        super().__init__(device=getattr(model, "device", "cpu"))
+        self.model = model
+        self.recording_path = Path(recording_path)
+        self._lock = threading.Lock()
+
+    def generate(self, messages: list[Message],
+                 max_length: int = 2048,
+                 temperature: float = 0.8,
+                 reasoning: bool = False,
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
+        message = self.model.generate(messages, max_length=max_length, temperature=temperature,
+                                      reasoning=reasoning, format=format, tools=tools)
+        record = {"key": messages_key(messages), "response": message.to_dict()}
+        with self._lock:
+            self.recording_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.recording_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return message
+
+    def parse_tool_calls(self, raw_tool_calls) -> list[ToolCall] | None:
+        return self.model.parse_tool_calls(raw_tool_calls)
+
+    def add_tool(self, tool_schema: dict, tool_function: callable):
+        self.model.add_tool(tool_schema, tool_function)
+
+    def remove_tool(self, tool_name: str):
+        self.model.remove_tool(tool_name)
+
+
+class ReplayModel(Model):
+    """
+    A fake backend serving responses from a `RecordingModel` recording.
+
+    Responses are matched to prompts by hashing the prompt messages. Prompts that were not
+    recorded are answered by `fallback`.
+    """
+
+    def __init__(self, recording_path: str, fallback: Model | None = None):
+        super().__init__(device="cpu")
+        self.fallback = fallback if fallback is not None else ScriptedModel()
+        self.responses = defaultdict(list)
+        with open(recording_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[record["key"]].append(record["response"])
+        self._lock = threading.Lock()
+
+    def generate(self, messages: list[Message],
+                 max_length: int = 2048,
+                 temperature: float = 0.8,
+                 reasoning: bool = False,
+                 format: str | None = None,
+                 tools: ToolSet | None = None) -> Message:
+        key = messages_key(messages)
+        with self._lock:
+            recorded = self.responses.get(key)
+            response = recorded.pop(0) if recorded else None
+        if response is None:
+            return self.fallback.generate(messages, max_length=max_length, temperature=temperature,
+                                          reasoning=reasoning, format=format, tools=tools)
+        return Message.from_dict(response)
+
+    def parse_tool_calls(self, raw_tool_calls) -> list[ToolCall] | None:
+        return raw_tool_calls or None
+
+    def add_tool(self, tool_schema: dict, tool_function: callable):
+        pass
+
+    def remove_tool(self, tool_name: str):
+        pass
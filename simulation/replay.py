@@ -0,0 +1,135 @@
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+import tempfile
+
+import location_service
+from agents.agent_pool import AgentPool
+from agents.assistant_agent import AssistantAgent
+from clock import SimulatedClock, get_clock, set_clock
+from location_service import LocationService
+from memory import MemoryStore
+from models import Model
+from scheduling import Scheduler
+from simulation.backends import MeteredModel, ReplayModel, ScriptedModel, UsageMeter
+from tasks import PlanCache, TaskStore
+
+
+DEFAULT_INSTRUCTIONS = [
+    "RECURRING INSTRUCTION: Wake me up at 7:00 AM every weekday.",
+    "RECURRING INSTRUCTION: Have coffee ready by 7:15 AM every weekday.",
+]
+DEFAULT_LOCATION = {"lat": 40.71, "lng": -74.01, "city": "New York", "state": "NY", "country": "US"}
+
+
+class ReplayRunner:
+    """
+    Runs the assistant against fake or recorded model backends on a simulated clock.
+
+    The clock jumps straight from one due timer to the next, so days of simulated time pass in
+    seconds and every run with the same inputs is deterministic. Every LLM call is metered, giving
+    a per-hour profile of calls, tokens and latency that shows the effect of caching, batching
+    and scheduling changes without a live model.
+    """
+
+    def __init__(self, model_factory: callable = ScriptedModel, instructions: list[str] | None = None,
+                 start: datetime = datetime(2025, 11, 3, 0, 0), duration: timedelta = timedelta(days=1),
+                 location: dict | None = None, max_concurrent_tasks: int = 1):
+        """
+        Initialize the ReplayRunner.
+
+        Args:
+            model_factory: Callable creating a (fake) model backend from a model name.
+            instructions: Context items given to the assistant before the run. Defaults to
+                `DEFAULT_INSTRUCTIONS`.
+            start: The simulated start time.
+            duration: How much simulated time to cover.
+            location: The fixed user location used during the run.
+            max_concurrent_tasks: Passed on to the `AssistantAgent`.
+        """
+        self.model_factory = model_factory
+        self.instructions = instructions if instructions is not None else DEFAULT_INSTRUCTIONS
+        self.start = start
+        self.duration = duration
+        self.location = location if location is not None else DEFAULT_LOCATION
+        self.max_concurrent_tasks = max_concurrent_tasks
+
+    def run(self) -> dict[datetime, dict]:
+        """
+        Run the simulation.
+
+        Returns:
+            dict[datetime, dict]: The per-hour usage summary from `UsageMeter.hourly`.
+        """
+        end = self.start + self.duration
+        clock = SimulatedClock(self.start)
+        meter = UsageMeter(clock)
+        previous_clock = get_clock()
+        previous_location_service = location_service.LOCATION_SERVICE
+        set_clock(clock)
+        location_service.set_location_service(LocationService(cache_path=None, override=self.location))
+
+        try:
+            with tempfile.TemporaryDirectory() as work_dir:
+                agent_pool = AgentPool(
+                    model_factory=lambda name: MeteredModel(self.model_factory(name), meter),
+                    max_idle_seconds=None
+                )
+                agent = AssistantAgent(
+                    MeteredModel(self.model_factory("assistant"), meter),
+                    agent_id="replay",
+                    agent_pool=agent_pool,
+                    max_concurrent_tasks=self.max_concurrent_tasks,
+                    task_store=TaskStore(str(Path(work_dir) / "tasks")),
+                    plan_cache=PlanCache(None),
+                    memory=MemoryStore(None),
+                    clock=clock
+                )
+                for instruction in self.instructions:
+                    agent.agent_context.add_context(instruction)
+                scheduler = Scheduler(agent, clock=clock)
+
+                while True:
+                    scheduler.run_pending()
+                    next_due = scheduler.next_due()
+                    if next_due is None or next_due >= end:
+                        break
+                    clock.set(next_due)
+        finally:
+            set_clock(previous_clock)
+            location_service.set_location_service(previous_location_service)
+
+        return meter.hourly(self.start, end)
+
+
+def format_report(hourly: dict[datetime, dict]) -> str:
+    """Format a per-hour usage summary as a table, skipping idle hours."""
+    lines = [f"{'hour':<17} {'calls':>6} {'prompt tok':>11} {'compl tok':>10} {'latency s':>10}"]
+    totals = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0}
+    for hour, usage in hourly.items():
+        for key in totals:
+            totals[key] += usage[key]
+        if usage["llm_calls"] == 0:
+            continue
+        lines.append(f"{hour.strftime('%Y-%m-%d %H:%M'):<17} {usage['llm_calls']:>6} "
+                     f"{usage['prompt_tokens']:>11} {usage['completion_tokens']:>10} {usage['latency']:>10.3f}")
+    lines.append(f"{'total':<17} {totals['llm_calls']:>6} {totals['prompt_tokens']:>11} "
+                 f"{totals['completion_tokens']:>10} {totals['latency']:>10.3f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay simulated days of assistant activity.")
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated days to cover.")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=datetime(2025, 11, 3),
+                        help="Simulated start time (ISO format).")
+    parser.add_argument("--recording", help="Replay model responses from a JSONL recording.")
+    args = parser.parse_args()
+
+    replay_model = ReplayModel(args.recording) if args.recording else None
+
+    def model_factory(model_name: str) -> Model:
+        return replay_model if replay_model is not None else ScriptedModel(model_name)
+
+    runner = ReplayRunner(model_factory, start=args.start, duration=timedelta(days=args.days))
+    print(format_report(runner.run()))
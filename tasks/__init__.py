@@ -1,4 +1,8 @@
-from .task import Task
+from .task import Task, normalize_goal
+from .task_executor import TaskExecutor
+from .task_store import TaskStore
+from .plan_cache import PlanCache
+from .task_index import TaskIndex
 
 
-__all__ = ["Task"]
\ No newline at end of file
+__all__ = ["Task", "normalize_goal", "TaskExecutor", "TaskStore", "PlanCache", "TaskIndex"]
\ No newline at end of file
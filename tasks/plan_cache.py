@@ -0,0 +1,158 @@
+import json
+from pathlib import Path
+import re
+import threading
+
+from tasks.task import normalize_goal
+from tool_registry import ToolSet
+
+
+MONTHS = ("january|february|march|april|may|june|july|august|september|october|november|december"
+          "|jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec")
+WEEKDAYS = "monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+
+# Parameter slots, tried in order; earlier kinds win when matches overlap. Names and bare numbers
+# are deliberately not slots: "the Coffee Machine" and "the Smart Lights" need different tools, and
+# a bare number would also rewrite the step numbers of a plan.
+SLOT_PATTERN = re.compile(
+    r"(?P<time>\b\d{1,2}(?::\d{2})?\s*[ap]\.?m\b|\b(?:[01]?\d|2[0-3]):[0-5]\d\b|\bnoon\b|\bmidnight\b)"
+    rf"|(?P<date>\b(?:{MONTHS})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?\b|\b\d{{1,2}}/\d{{1,2}}(?:/\d{{2,4}})?\b)"
+    rf"|(?P<weekday>\b(?:{WEEKDAYS})\b)",
+    re.IGNORECASE
+)
+
+
+def extract_slots(goal: str) -> tuple[str, list[tuple[str, str]]]:
+    """
+    Replace the parameters of a goal (times, dates and weekdays) with slot markers.
+
+    Args:
+        goal (str): The task goal.
+
+    Returns:
+        tuple[str, list[tuple[str, str]]]: The normalized goal template used as the cache key, and
+        the (slot name, value) pairs in the order they appear, e.g.
+        ("wake the user at slot_time_0", [("time_0", "7:00 AM")]).
+    """
+    slots = []
+    counts = {}
+
+    def replace(match: re.Match) -> str:
+        kind = match.lastgroup
+        value = match.group(0)
+        index = counts.get(kind, 0)
+        counts[kind] = index + 1
+        slot_name = f"{kind}_{index}"
+        slots.append((slot_name, value.strip()))
+        return f" slot_{slot_name} "
+
+    template = SLOT_PATTERN.sub(replace, goal)
+    return normalize_goal(template), slots
+
+
+class PlanCache:
+    """
+    Caches successful task plans by goal template so recurring goals skip plan generation.
+
+    Goals are reduced to a template with their parameters (times, dates and weekdays) replaced by
+    slots, e.g. "Wake the user at 7:00 AM" becomes "wake the user at slot_time_0". A plan stored
+    for one goal is saved with the same substitution applied and re-rendered with the parameters
+    of any later goal sharing the template. Entries are also keyed on the version of the tool set
+    the plan ran with, so a plan is never replayed against different tools. Only plans that led to
+    a completed task are stored, and a cached plan that fails to complete its task is evicted.
+    """
+
+    def __init__(self, cache_path: str | None = "config/plan_cache.json"):
+        """
+        Initialize the PlanCache.
+
+        Args:
+            cache_path: Path to the JSON file persisting the cache. If None, the cache is kept in
+                memory only.
+        """
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.plans = {}  # "goal template|tool set version" -> {"plan": plan template, "uses": int}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def lookup(self, goal: str, tool_set: ToolSet | None = None) -> str | None:
+        """
+        Get a cached plan for a goal, rendered with the goal's parameters.
+
+        Args:
+            goal (str): The task goal.
+            tool_set (ToolSet | None, optional): The tools the plan will run with.
+
+        Returns:
+            str | None: The rendered plan, or None on a cache miss.
+        """
+        key, slots = self._key(goal, tool_set)
+        with self._lock:
+            entry = self.plans.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["uses"] += 1
+            plan = entry["plan"]
+        for slot_name, value in slots:
+            plan = plan.replace(f"{{{slot_name}}}", value)
+        return plan
+
+    def store(self, goal: str, plan: str, tool_set: ToolSet | None = None):
+        """
+        Store the plan that completed a task.
+
+        Args:
+            goal (str): The goal of the completed task.
+            plan (str): The plan that completed it.
+            tool_set (ToolSet | None, optional): The tools the plan ran with.
+        """
+        key, slots = self._key(goal, tool_set)
+        # Replace longer values first so e.g. "17" is not replaced inside "7:17 AM"
+        for slot_name, value in sorted(slots, key=lambda slot: len(slot[1]), reverse=True):
+            plan = plan.replace(value, f"{{{slot_name}}}")
+        with self._lock:
+            self.plans[key] = {"plan": plan, "uses": 0}
+            self._save()
+
+    def invalidate(self, goal: str, tool_set: ToolSet | None = None):
+        """
+        Drop the cached plan for a goal's template, e.g. after the plan failed.
+
+        Args:
+            goal (str): A goal with the template to drop.
+            tool_set (ToolSet | None, optional): The tools the plan ran with.
+        """
+        key, _ = self._key(goal, tool_set)
+        with self._lock:
+            if self.plans.pop(key, None) is not None:
+                self._save()
+
+    @staticmethod
+    def _key(goal: str, tool_set: ToolSet | None) -> tuple[str, list[tuple[str, str]]]:
+        """Get the cache key of a goal and tool set, and the goal's slots."""
+        template, slots = extract_slots(goal)
+        tools_version = tool_set.version if tool_set is not None else ""
+        return f"{template}|{tools_version}", slots
+
+    def _load(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                self.plans = json.load(f)
+        except (OSError, json.JSONDecodeError) as error:
+            print(f"Could not load plan cache: {error}")
+
+    def _save(self):
+        """Persist the cache. Must be called with the lock held."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.plans, f, indent=2)
+        tmp_path.replace(self.cache_path)
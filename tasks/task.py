@@ -1,3 +1,25 @@
+import re
+import threading
+import uuid
+
+from messages import Message
+
+
+def normalize_goal(goal: str) -> str:
+    """
+    Normalize a task goal for comparison: lowercased, without punctuation, with collapsed
+    whitespace.
+
+    Args:
+        goal (str): The goal to normalize.
+
+    Returns:
+        str: The normalized goal.
+    """
+    goal = re.sub(r"[^\w\s:]", " ", goal.lower())
+    return " ".join(goal.split())
+
+
 class Task:
     """
     Represents a particular task an agent is undertaking.
@@ -10,18 +32,68 @@ class Task:
     out the task.
     """
     
-    def __init__(self, goal: str):
+    def __init__(self, goal: str, task_id: str | None = None):
+        self.task_id = task_id if task_id is not None else uuid.uuid4().hex
         self.goal = goal
         self.plan = ""
         self.message_log = []
         self.completed: bool = False
+        self.iterations: int = 0
+        self.plan_from_cache: bool = False
+        # Bumped whenever the message log is replaced rather than appended to; together with the
+        # lock, lets a background compaction detect that the log it summarized is gone
+        self.log_version: int = 0
+        self.lock = threading.Lock()
+
+    @property
+    def normalized_goal(self) -> str:
+        return normalize_goal(self.goal)
 
     def add_plan(self, plan: str):
         self.plan = plan
 
+    def reset_plan(self):
+        """Drop the plan and message log, e.g. to plan again after a cached plan failed."""
+        with self.lock:
+            self.plan = ""
+            self.message_log = []
+            self.log_version += 1
+            self.plan_from_cache = False
+
     def log_message(self, role: str, content: str):
         self.message_log.append({"role": role, "content": content})
 
+    def to_dict(self) -> dict:
+        """Convert the Task to a JSON-serializable dictionary."""
+        return {
+            "task_id": self.task_id,
+            "goal": self.goal,
+            "plan": self.plan,
+            "message_log": [msg.to_dict() if isinstance(msg, Message) else msg for msg in self.message_log],
+            "completed": self.completed,
+            "iterations": self.iterations,
+            "plan_from_cache": self.plan_from_cache
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "Task":
+        """
+        Reconstruct a Task from a dictionary created by `to_dict`.
+
+        Args:
+            data (dict): The task data.
+
+        Returns:
+            Task: The reconstructed task.
+        """
+        task = Task(data["goal"], task_id=data["task_id"])
+        task.plan = data.get("plan", "")
+        task.message_log = [Message.from_dict(msg) for msg in data.get("message_log", [])]
+        task.completed = data.get("completed", False)
+        task.iterations = data.get("iterations", 0)
+        task.plan_from_cache = data.get("plan_from_cache", False)
+        return task
+
     @staticmethod
     def create_task(goal: str) -> "Task":
         """
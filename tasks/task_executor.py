@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tasks.task import Task
+
+
+class TaskExecutor:
+    """
+    Runs independent tasks concurrently on a bounded pool of worker threads.
+
+    Most of a task's run time is spent waiting on model backends, so running tasks in threads lets
+    independent chores (e.g. a wake-up call and brewing coffee) overlap their LLM calls instead of
+    queueing behind each other.
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        """
+        Initialize the TaskExecutor.
+
+        Args:
+            max_concurrency: The maximum number of tasks run at the same time.
+        """
+        self.max_concurrency = max_concurrency
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="task")
+
+    def run(self, tasks: list[Task], run_task: callable) -> dict[Task, object]:
+        """
+        Run `run_task` on every task concurrently and wait for all of them to finish.
+
+        An exception raised while running one task does not affect the others; it is returned as
+        that task's result instead.
+
+        Args:
+            tasks (list[Task]): The tasks to run.
+            run_task (callable): Function called with each task.
+
+        Returns:
+            dict[Task, object]: The result (or raised exception) of each task.
+        """
+        futures = {self.pool.submit(run_task, task): task for task in tasks}
+        results = {}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                results[task] = future.result()
+            except Exception as error:
+                print(f"Task '{task.goal}' failed: {error}")
+                results[task] = error
+        return results
+
+    def shutdown(self):
+        """Stop the worker threads once running tasks finish."""
+        self.pool.shutdown(wait=True)
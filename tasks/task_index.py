@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+import hashlib
+import threading
+
+from tasks.task import Task, normalize_goal
+
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "to", "for", "of", "and", "or", "in", "on", "at", "by", "with", "about",
+    "my", "me", "i", "user", "user's", "users", "their", "his", "her", "please", "now", "up"
+})
+
+
+def goal_hash(goal: str) -> str:
+    """Hash a goal's normalized text."""
+    return hashlib.sha1(normalize_goal(goal).encode("utf-8")).hexdigest()
+
+
+def goal_tokens(goal: str) -> frozenset[str]:
+    """Get the set of content words of a goal, used for the similarity check."""
+    return frozenset(token for token in normalize_goal(goal).split() if token not in STOPWORDS)
+
+
+def jaccard_similarity(tokens_a: frozenset[str], tokens_b: frozenset[str]) -> float:
+    if not tokens_a and not tokens_b:
+        return 1.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+class TaskIndex:
+    """
+    Index of queued and recently completed task goals used to deduplicate new tasks.
+
+    A new goal is a duplicate if its normalized text hashes to the same value as a queued goal, or
+    if the Jaccard similarity of its content words with a queued goal reaches
+    `similarity_threshold`. The same checks against goals completed within `completion_window`
+    suppress re-creating a task that was just done.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.8, completion_window: timedelta = timedelta(minutes=30)):
+        """
+        Initialize the TaskIndex.
+
+        Args:
+            similarity_threshold: The token Jaccard similarity at or above which two goals are
+                considered duplicates.
+            completion_window: How long a completed goal suppresses equivalent new tasks.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.completion_window = completion_window
+        self.queued: dict[str, tuple[str, frozenset[str]]] = {}  # task_id -> (goal hash, tokens)
+        self.completed: list[tuple[datetime, str, frozenset[str]]] = []  # oldest first
+        self._lock = threading.Lock()
+
+    def _matches(self, digest: str, tokens: frozenset[str], other_digest: str, other_tokens: frozenset[str]) -> bool:
+        return digest == other_digest or jaccard_similarity(tokens, other_tokens) >= self.similarity_threshold
+
+    def find_duplicate(self, goal: str, now: datetime) -> str | None:
+        """
+        Check whether a goal duplicates a queued or recently completed task.
+
+        Args:
+            goal (str): The goal of the task about to be created.
+            now (datetime): The current time.
+
+        Returns:
+            str | None: "queued" or "recently completed" if the goal is a duplicate, else None.
+        """
+        digest, tokens = goal_hash(goal), goal_tokens(goal)
+        with self._lock:
+            for queued_digest, queued_tokens in self.queued.values():
+                if self._matches(digest, tokens, queued_digest, queued_tokens):
+                    return "queued"
+
+            cutoff = now - self.completion_window
+            self.completed = [entry for entry in self.completed if entry[0] >= cutoff]
+            for _, completed_digest, completed_tokens in self.completed:
+                if self._matches(digest, tokens, completed_digest, completed_tokens):
+                    return "recently completed"
+        return None
+
+    def add(self, task: Task):
+        """Add a queued task to the index."""
+        with self._lock:
+            self.queued[task.task_id] = (goal_hash(task.goal), goal_tokens(task.goal))
+
+    def remove(self, task: Task):
+        """Remove a task that left the queue from the index."""
+        with self._lock:
+            self.queued.pop(task.task_id, None)
+
+    def record_completed(self, goal: str, when: datetime):
+        """
+        Record that a task with the given goal was completed.
+
+        Args:
+            goal (str): The completed goal.
+            when (datetime): When it was completed.
+        """
+        with self._lock:
+            self.completed.append((when, goal_hash(goal), goal_tokens(goal)))
@@ -0,0 +1,78 @@
+import json
+import os
+from pathlib import Path
+import threading
+
+from tasks.task import Task
+
+
+class TaskStore:
+    """
+    Durable storage for in-flight tasks.
+
+    Each task is checkpointed to its own JSON file, written atomically, so a crash mid-write never
+    corrupts a previous checkpoint. Tasks are deleted from the store once they finish.
+    """
+
+    def __init__(self, store_dir: str = "config/tasks"):
+        """
+        Initialize the TaskStore.
+
+        Args:
+            store_dir: Directory holding one checkpoint file per task.
+        """
+        self.store_dir = Path(store_dir)
+        self._lock = threading.Lock()
+
+    def _task_path(self, task_id: str) -> Path:
+        return self.store_dir / f"{task_id}.json"
+
+    def save(self, task: Task):
+        """
+        Checkpoint a task, replacing its previous checkpoint.
+
+        Args:
+            task (Task): The task to checkpoint.
+        """
+        data = task.to_dict()
+        path = self._task_path(task.task_id)
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+    def delete(self, task_id: str):
+        """
+        Remove a task's checkpoint.
+
+        Args:
+            task_id (str): The id of the task to remove.
+        """
+        with self._lock:
+            self._task_path(task_id).unlink(missing_ok=True)
+
+    def load_all(self) -> list[Task]:
+        """
+        Load every checkpointed task, oldest checkpoint first.
+
+        Unreadable checkpoints are skipped.
+
+        Returns:
+            list[Task]: The checkpointed tasks.
+        """
+        if not self.store_dir.exists():
+            return []
+        tasks = []
+        with self._lock:
+            paths = sorted(self.store_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            for path in paths:
+                try:
+                    with open(path, "r") as f:
+                        tasks.append(Task.from_dict(json.load(f)))
+                except (OSError, KeyError, json.JSONDecodeError) as error:
+                    print(f"Skipping unreadable task checkpoint {path}: {error}")
+        return tasks
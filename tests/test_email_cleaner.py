@@ -0,0 +1,57 @@
+import unittest
+
+from email_handling.email_cleaner import clean_body
+
+
+class CleanBodyTest(unittest.TestCase):
+    def test_forwarded_message_is_kept(self):
+        body = ("FYI\n\n---------- Forwarded message ---------\nFrom: Alice <alice@example.com>\n"
+                "Date: Mon, Oct 6, 2025 at 9:00 AM\nSubject: Lease\nTo: me@example.com\n\n"
+                "The lease renewal is attached, please sign by Friday.")
+        cleaned = clean_body(body)
+        self.assertIn("From: Alice", cleaned)
+        self.assertIn("please sign by Friday", cleaned)
+
+    def test_forwarded_message_after_blank_first_line_is_kept(self):
+        body = ("\n---------- Forwarded message ---------\nFrom: Alice <alice@example.com>\n"
+                "Date: Mon, Oct 6, 2025\nSubject: Lease\n\nPlease sign by Friday.")
+        self.assertIn("Please sign by Friday.", clean_body(body))
+
+    def test_question_mentioning_unsubscribe_is_kept(self):
+        body = "How do I unsubscribe from the gym membership? They keep charging me."
+        self.assertEqual(clean_body(body), body)
+
+    def test_short_message_mentioning_privacy_policy_is_kept(self):
+        body = "Hi Sam,\nCan you review the new privacy policy draft before Thursday?\nThanks"
+        self.assertEqual(clean_body(body), body)
+
+    def test_underscore_separator_without_outlook_header_is_kept(self):
+        body = "Agenda for tomorrow:\n__________\nItem one: budget\nItem two: hiring"
+        self.assertIn("Item two: hiring", clean_body(body))
+
+    def test_dash_separator_before_long_text_is_kept(self):
+        body = "Notes:\n--\n" + "\n".join(f"Point number {i}" for i in range(10))
+        self.assertIn("Point number 9", clean_body(body))
+
+    def test_outlook_quote_is_trimmed(self):
+        body = ("Sounds good, see you then.\n\n________________________________\n"
+                "From: Bob <bob@example.com>\nSent: Monday, October 6, 2025 9:00 AM\nTo: me\n"
+                "Subject: Lunch\n\nLunch at noon?")
+        self.assertEqual(clean_body(body), "Sounds good, see you then.")
+
+    def test_reply_quote_is_trimmed(self):
+        body = "Great, thanks.\n\nOn Mon, Oct 6, 2025 at 9:00 AM Bob <bob@example.com> wrote:\n> Lunch?"
+        self.assertEqual(clean_body(body), "Great, thanks.")
+
+    def test_signature_is_trimmed(self):
+        self.assertEqual(clean_body("Thanks!\n-- \nJane Doe\nAcme Corp"), "Thanks!")
+
+    def test_newsletter_footer_is_removed(self):
+        body = "\n".join(f"Deal number {i}" for i in range(8)) + (
+            "\nUnsubscribe | Privacy Policy\nYou are receiving this email because you signed up."
+            "\n© 2025 Acme. All rights reserved.")
+        self.assertEqual(clean_body(body), "\n".join(f"Deal number {i}" for i in range(8)))
+
+
+if __name__ == "__main__":
+    unittest.main()
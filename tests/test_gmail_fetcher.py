@@ -0,0 +1,90 @@
+import json
+import unittest
+
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+
+from email_handling.gmail_fetcher import GmailFetcher
+
+
+BOUNDARY = "batch_boundary"
+
+
+def thread_resource(thread_id: str) -> dict:
+    return {"id": thread_id, "historyId": "100", "messages": [{"id": f"{thread_id}-m1", "threadId": thread_id}]}
+
+
+def error_resource(code: int, reason: str) -> dict:
+    return {"error": {"code": code, "message": reason, "errors": [{"reason": reason}]}}
+
+
+def batch_response(parts: list[tuple[str, int, dict]]) -> tuple[dict, str]:
+    """Build a canned multipart batch response from (request id, status, JSON body) parts."""
+    body = ""
+    for request_id, status, payload in parts:
+        body += (f"--{BOUNDARY}\r\nContent-Type: application/http\r\n"
+                 f"Content-ID: <response-batch + {request_id}>\r\n\r\n"
+                 f"HTTP/1.1 {status} Status\r\nContent-Type: application/json\r\n\r\n"
+                 f"{json.dumps(payload)}\r\n")
+    body += f"--{BOUNDARY}--"
+    return {"status": "200", "content-type": f"multipart/mixed; boundary={BOUNDARY}"}, body
+
+
+class GmailFetcherTest(unittest.TestCase):
+    def make_fetcher(self, responses: list[tuple[dict, str]]) -> tuple[GmailFetcher, list[float]]:
+        service = build("gmail", "v1", http=HttpMockSequence(responses), static_discovery=True)
+        delays = []
+        return GmailFetcher(service, max_retries=2, sleep=delays.append), delays
+
+    def test_successful_batch(self):
+        fetcher, delays = self.make_fetcher([
+            batch_response([("t1", 200, thread_resource("t1")), ("t2", 200, thread_resource("t2"))])
+        ])
+        threads, failed = fetcher.fetch_threads(["t1", "t2"])
+        self.assertEqual(set(threads), {"t1", "t2"})
+        self.assertEqual(threads["t1"]["messages"][0]["id"], "t1-m1")
+        self.assertEqual(failed, {})
+        self.assertEqual(delays, [])
+
+    def test_429_is_retried(self):
+        fetcher, delays = self.make_fetcher([
+            batch_response([("t1", 200, thread_resource("t1")), ("t2", 429, error_resource(429, "rateLimitExceeded"))]),
+            batch_response([("t2", 200, thread_resource("t2"))])
+        ])
+        threads, failed = fetcher.fetch_threads(["t1", "t2"])
+        self.assertEqual(set(threads), {"t1", "t2"})
+        self.assertEqual(failed, {})
+        self.assertEqual(len(delays), 1)
+
+    def test_403_rate_limit_is_retried(self):
+        fetcher, delays = self.make_fetcher([
+            batch_response([("t1", 403, error_resource(403, "rateLimitExceeded"))]),
+            batch_response([("t1", 200, thread_resource("t1"))])
+        ])
+        threads, failed = fetcher.fetch_threads(["t1"])
+        self.assertEqual(set(threads), {"t1"})
+        self.assertEqual(failed, {})
+        self.assertEqual(len(delays), 1)
+
+    def test_rate_limited_thread_is_given_up_after_retries(self):
+        fetcher, delays = self.make_fetcher([
+            batch_response([("t1", 429, error_resource(429, "rateLimitExceeded"))]) for _ in range(3)
+        ])
+        threads, failed = fetcher.fetch_threads(["t1"])
+        self.assertEqual(threads, {})
+        self.assertEqual(failed, {})
+        self.assertEqual(len(delays), 2)
+
+    def test_404_is_not_retried(self):
+        fetcher, delays = self.make_fetcher([
+            batch_response([("t1", 200, thread_resource("t1")), ("t2", 404, error_resource(404, "notFound"))])
+        ])
+        threads, failed = fetcher.fetch_threads(["t1", "t2"])
+        self.assertEqual(set(threads), {"t1"})
+        self.assertEqual(set(failed), {"t2"})
+        self.assertEqual(failed["t2"].resp.status, 404)
+        self.assertEqual(delays, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
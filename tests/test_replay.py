@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import unittest
+
+from messages import Message
+from simulation import ReplayRunner, ScriptedModel
+
+
+class GoalRecordingModel(ScriptedModel):
+    """A ScriptedModel that records the task goals it generates."""
+
+    def __init__(self, goals: list[str], model_name: str = "scripted"):
+        super().__init__(model_name)
+        self.goals = goals
+
+    def generate(self, messages: list[Message], *args, **kwargs) -> Message:
+        response = super().generate(messages, *args, **kwargs)
+        if "generate the next task" in messages[-1].content and response.content != "Standby.":
+            self.goals.append(response.content)
+        return response
+
+
+class ReplayRunnerTest(unittest.TestCase):
+    def test_recurring_instructions_create_tasks(self):
+        goals = []
+        runner = ReplayRunner(lambda name: GoalRecordingModel(goals, name), start=datetime(2025, 11, 3),
+                              duration=timedelta(days=2))
+        runner.run()
+        self.assertEqual(sum("coffee ready by 7:15 AM" in goal for goal in goals), 2)
+        self.assertEqual(sum("Wake me up at 7:00 AM" in goal for goal in goals), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
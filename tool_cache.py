@@ -0,0 +1,232 @@
+from functools import wraps
+import hashlib
+import inspect
+import json
+from pathlib import Path
+import threading
+import time
+
+
+class ToolCache:
+    """
+    A per-tool TTL cache for tool results.
+
+    Results are keyed on the tool name and its (default-filled) arguments. Each cached tool has an
+    in-memory tier and, optionally, an on-disk tier that survives restarts. Only tools that have
+    been explicitly registered as cacheable are cached; tools marked as side-effecting (see
+    `side_effecting`) can never be registered.
+    """
+
+    def __init__(self, cache_path: str | None = "config/tool_cache.json"):
+        """
+        Initialize the ToolCache.
+
+        Args:
+            cache_path: Path to the JSON file backing the on-disk tier. If None, the on-disk tier
+                is disabled and every tool is cached in memory only.
+        """
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.ttls = {}  # tool_name -> ttl in seconds
+        self.persisted = set()  # tool_names with an on-disk tier
+        self.memory = {}  # (tool_name, key) -> (expires_at, result)
+        self.disk = None  # tool_name -> {key: [expires_at, result]}, loaded lazily
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    def register(self, tool_func: callable, ttl: float, persist: bool = False) -> callable:
+        """
+        Register a tool as cacheable and return the caching wrapper.
+
+        The wrapper keeps the wrapped function's name, docstring and signature, so the usual tool
+        schema generation works on it unchanged.
+
+        Args:
+            tool_func (callable): The tool function to cache.
+            ttl (float): How long, in seconds, a cached result stays valid.
+            persist (bool, optional): Whether results are also stored in the on-disk tier.
+                Results must be JSON-serializable. Defaults to False.
+
+        Returns:
+            callable: The caching wrapper around `tool_func`.
+
+        Raises:
+            ValueError: If the tool is marked as side-effecting.
+        """
+        tool_name = tool_func.__name__
+        if getattr(tool_func, "side_effects", False):
+            raise ValueError(f"Tool '{tool_name}' has side effects and cannot be cached")
+
+        self.ttls[tool_name] = ttl
+        if persist and self.cache_path is not None:
+            self.persisted.add(tool_name)
+        self.hits.setdefault(tool_name, 0)
+        self.misses.setdefault(tool_name, 0)
+        signature = inspect.signature(tool_func)
+
+        @wraps(tool_func)
+        def cached_tool(*args, **kwargs):
+            key = self._make_key(_bind_arguments(signature, args, kwargs))
+            found, result = self.lookup(tool_name, key)
+            if found:
+                return result
+            result = tool_func(*args, **kwargs)
+            self.store(tool_name, key, result)
+            return result
+
+        cached_tool.cache_key = lambda *args, **kwargs: self._make_key(
+            _bind_arguments(signature, args, kwargs))
+        return cached_tool
+
+    def _make_key(self, arguments: dict) -> str:
+        serialized = json.dumps(arguments, sort_keys=True, default=repr)
+        return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+    def lookup(self, tool_name: str, key: str) -> tuple[bool, object]:
+        """
+        Look up a cached result, checking the in-memory tier before the on-disk tier.
+
+        Args:
+            tool_name (str): The name of the cached tool.
+            key (str): The argument key produced by the tool's wrapper.
+
+        Returns:
+            tuple[bool, object]: Whether a fresh result was found, and the result itself.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get((tool_name, key))
+            if entry is None and tool_name in self.persisted:
+                disk_entry = self._load_disk().get(tool_name, {}).get(key)
+                if disk_entry is not None:
+                    entry = tuple(disk_entry)
+                    self.memory[(tool_name, key)] = entry
+
+            if entry is not None and entry[0] > now:
+                self.hits[tool_name] = self.hits.get(tool_name, 0) + 1
+                return True, entry[1]
+
+            self.misses[tool_name] = self.misses.get(tool_name, 0) + 1
+            return False, None
+
+    def store(self, tool_name: str, key: str, result):
+        """
+        Store a tool result in the cache tiers configured for the tool.
+
+        Args:
+            tool_name (str): The name of the cached tool.
+            key (str): The argument key produced by the tool's wrapper.
+            result: The tool's result.
+        """
+        expires_at = time.time() + self.ttls.get(tool_name, 0)
+        with self._lock:
+            self.memory[(tool_name, key)] = (expires_at, result)
+            if tool_name in self.persisted:
+                self._load_disk().setdefault(tool_name, {})[key] = [expires_at, result]
+                self._save_disk()
+
+    def invalidate(self, tool_name: str | None = None, key: str | None = None):
+        """
+        Invalidate cached results.
+
+        Args:
+            tool_name (str | None, optional): The tool whose results to drop. If None, the whole
+                cache is cleared. Defaults to None.
+            key (str | None, optional): A single argument key to drop (see the wrapper's
+                `cache_key`). If None, every result for `tool_name` is dropped. Defaults to None.
+        """
+        with self._lock:
+            if tool_name is None:
+                self.memory = {}
+                self.disk = {}
+            else:
+                self.memory = {
+                    (name, k): entry for (name, k), entry in self.memory.items()
+                    if name != tool_name or (key is not None and k != key)
+                }
+                disk_entries = self._load_disk().get(tool_name, {})
+                if key is None:
+                    disk_entries.clear()
+                else:
+                    disk_entries.pop(key, None)
+            if self.cache_path is not None and self.persisted:
+                self._save_disk()
+
+    def stats(self) -> dict:
+        """
+        Get the hit/miss metrics for every cached tool.
+
+        Returns:
+            dict: A mapping of tool name to a dict with 'hits', 'misses' and 'hit_rate' entries.
+        """
+        stats = {}
+        for tool_name in self.ttls:
+            hits = self.hits.get(tool_name, 0)
+            misses = self.misses.get(tool_name, 0)
+            total = hits + misses
+            stats[tool_name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / total if total else 0.0
+            }
+        return stats
+
+    def _load_disk(self) -> dict:
+        """Load the on-disk tier on first use. Must be called with the lock held."""
+        if self.disk is None:
+            self.disk = {}
+            if self.cache_path is not None and self.cache_path.exists():
+                try:
+                    with open(self.cache_path, "r") as f:
+                        self.disk = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    self.disk = {}
+        return self.disk
+
+    def _save_disk(self):
+        """Write the on-disk tier, dropping expired entries. Must be called with the lock held."""
+        now = time.time()
+        data = {
+            tool_name: {k: entry for k, entry in entries.items() if entry[0] > now}
+            for tool_name, entries in self._load_disk().items()
+        }
+        self.disk = data
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        tmp_path.replace(self.cache_path)
+
+
+def _bind_arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> dict:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound.arguments
+
+
+TOOL_CACHE = ToolCache()
+
+
+def cached_tool(ttl: float, persist: bool = False, cache: ToolCache | None = None) -> callable:
+    """
+    Decorator registering a side-effect-free tool with a TTL result cache.
+
+    Args:
+        ttl (float): How long, in seconds, a cached result stays valid.
+        persist (bool, optional): Whether results are also stored on disk. Defaults to False.
+        cache (ToolCache | None, optional): The cache to register with. Defaults to TOOL_CACHE.
+
+    Returns:
+        callable: A decorator producing the caching wrapper.
+    """
+    def decorator(tool_func: callable) -> callable:
+        return (cache or TOOL_CACHE).register(tool_func, ttl, persist=persist)
+    return decorator
+
+
+def side_effecting(tool_func: callable) -> callable:
+    """
+    Decorator marking a tool as side-effecting, which excludes it from result caching.
+    """
+    tool_func.side_effects = True
+    return tool_func
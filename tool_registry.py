@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+import hashlib
+import inspect
+import json
+import threading
+
+from utils import generate_tool_schema
+
+
+@dataclass(frozen=True)
+class CompiledTool:
+    """
+    A tool whose schema has been generated and serialized ahead of time.
+
+    Attributes:
+        name (str): The name of the tool.
+        schema (dict): The tool schema produced by `generate_tool_schema`.
+        spec (dict): The schema serialized in the function-calling format expected by backends.
+        fingerprint (str): A hash of the serialized spec.
+        function (callable): The function executed when the tool is called.
+    """
+    name: str
+    schema: dict
+    spec: dict
+    fingerprint: str
+    function: callable
+
+
+class ToolRegistry:
+    """
+    Compiles tool functions into `CompiledTool`s, generating each schema only once.
+
+    Schemas are cached on the function's code object, name and docstring rather than on the
+    function itself, so closures created repeatedly by a factory (e.g. `mark_task_completed`) share
+    a single compiled schema.
+    """
+
+    def __init__(self):
+        self.compiled = {}  # schema key -> (schema, spec, fingerprint)
+        self._lock = threading.Lock()
+
+    def compile(self, tool_func: callable) -> CompiledTool:
+        """
+        Compile a tool function, reusing a previously generated schema when possible.
+
+        Args:
+            tool_func (callable): The function to compile. Must have docstring and type hints.
+
+        Returns:
+            CompiledTool: The compiled tool bound to `tool_func`.
+
+        Raises:
+            ValueError: If the function lacks a docstring or has missing type hints.
+        """
+        key = self._schema_key(tool_func)
+        with self._lock:
+            entry = self.compiled.get(key)
+        if entry is None:
+            schema = generate_tool_schema(tool_func)
+            spec = self._serialize(schema, tool_func)
+            fingerprint = hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+            entry = (schema, spec, fingerprint)
+            with self._lock:
+                self.compiled[key] = entry
+        schema, spec, fingerprint = entry
+        return CompiledTool(name=schema["name"], schema=schema, spec=spec,
+                            fingerprint=fingerprint, function=tool_func)
+
+    def _schema_key(self, tool_func: callable) -> tuple:
+        unwrapped = inspect.unwrap(tool_func)
+        code = getattr(unwrapped, "__code__", unwrapped)
+        defaults = getattr(unwrapped, "__defaults__", None)
+        return (code, tool_func.__name__, tool_func.__doc__, len(defaults or ()))
+
+    def _serialize(self, schema: dict, tool_func: callable) -> dict:
+        """Convert a tool schema into the function-calling format used by Ollama and HF chat templates."""
+        required = [
+            name for name, param in inspect.signature(tool_func).parameters.items()
+            if name != "self" and param.default is inspect.Parameter.empty
+        ]
+        return {
+            "type": "function",
+            "function": {
+                "name": schema["name"],
+                "description": schema["description"],
+                "parameters": {
+                    "type": "object",
+                    "properties": schema["parameters"],
+                    "required": required
+                }
+            }
+        }
+
+
+class ToolSet:
+    """
+    An immutable snapshot of compiled tools.
+
+    A `ToolSet` is never modified in place. Adding tools produces an overlay that shares its base,
+    so a per-task tool can be layered over an agent's tools without copying or recompiling them.
+    The serialized specs and the content hash (`version`) are computed once per snapshot.
+    """
+
+    def __init__(self, tools: tuple[CompiledTool, ...] | list[CompiledTool] = (),
+                 base: "ToolSet | None" = None):
+        self.base = base
+        self._own = {tool.name: tool for tool in tools}
+        self._merged = None
+        self._serialized = None
+        self._version = None
+
+    @property
+    def tools(self) -> dict[str, CompiledTool]:
+        """A mapping of tool name to `CompiledTool`, with overlay tools taking precedence."""
+        if self._merged is None:
+            merged = dict(self.base.tools) if self.base is not None else {}
+            merged.update(self._own)
+            self._merged = merged
+        return self._merged
+
+    @property
+    def serialized(self) -> list[dict]:
+        """The tool specs to hand to the model backend. Must not be mutated."""
+        if self._serialized is None:
+            self._serialized = [tool.spec for tool in self.tools.values()]
+        return self._serialized
+
+    @property
+    def version(self) -> str:
+        """A hash identifying the contents of this snapshot."""
+        if self._version is None:
+            fingerprints = sorted(tool.fingerprint for tool in self.tools.values())
+            self._version = hashlib.sha1("".join(fingerprints).encode("utf-8")).hexdigest()[:12]
+        return self._version
+
+    def get(self, tool_name: str) -> CompiledTool | None:
+        tool = self._own.get(tool_name)
+        if tool is None and self.base is not None:
+            return self.base.get(tool_name)
+        return tool
+
+    def with_tools(self, *tools: CompiledTool) -> "ToolSet":
+        """
+        Create an overlay snapshot containing this snapshot's tools plus the given tools.
+
+        Args:
+            *tools (CompiledTool): The tools to layer on top. Tools with an existing name replace
+                the existing tool in the overlay.
+
+        Returns:
+            ToolSet: The overlay snapshot.
+        """
+        return ToolSet(tools, base=self)
+
+    def without(self, tool_name: str) -> "ToolSet":
+        """
+        Create a flat snapshot containing every tool in this snapshot except `tool_name`.
+        """
+        return ToolSet([tool for name, tool in self.tools.items() if name != tool_name])
+
+    def flatten(self) -> "ToolSet":
+        """Create a flat snapshot with the same tools and no base."""
+        return ToolSet(list(self.tools.values()))
+
+    def __contains__(self, tool_name: str) -> bool:
+        return self.get(tool_name) is not None
+
+    def __iter__(self):
+        return iter(self.tools.values())
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def __repr__(self) -> str:
+        return f"ToolSet(version={self.version}, tools={list(self.tools)})"
+
+
+TOOL_REGISTRY = ToolRegistry()
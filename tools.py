@@ -1,14 +1,16 @@
-from datetime import datetime
 import json
 
-from utils import get_geolocation, get_weather_data
+from clock import get_clock
+from utils import get_geolocation, get_weather_data as fetch_weather_data
 from email_handling import GMAIL_HANDLER
+from tool_cache import cached_tool, side_effecting
 
 
 ######################
 # IRL Context Tools  #
 ######################
 
+@cached_tool(ttl=60 * 60, persist=True)
 def get_user_location() -> str:
     """
     Get a string representation of the user's geolocation based on their IP address.
@@ -27,10 +29,11 @@ def get_current_time() -> str:
     Returns:
         str: The current time in the format "HH:MM AM/PM on Day, Month Date, Year".
     """
-    now = datetime.now()
+    now = get_clock().now()
     return now.strftime("%I:%M %p on %A, %B %d, %Y")
 
 
+@cached_tool(ttl=10 * 60)
 def get_weather_data() -> str:
     """
     Fetch weather data for the user's current geolocation.
@@ -45,7 +48,7 @@ def get_weather_data() -> str:
     geolocation = get_geolocation()
     lat = geolocation["lat"]
     long = geolocation["lng"]
-    weather_data = get_weather_data((lat, long))
+    weather_data = fetch_weather_data((lat, long))
     return json.dumps(weather_data, indent=2)
 
 
@@ -91,10 +94,42 @@ def get_email(message_id: str) -> str:
         return "Email not found."
 
 
+def search_emails(query: str, limit: int = 5) -> str:
+    """
+    Search the user's emails by keywords.
+
+    This tool runs a full-text search over the subject, sender and body of every email and returns
+    the best matches with a short snippet each instead of the whole email. Use `get_email` to read
+    a match in full.
+
+    Args:
+        query (str): The keywords to search for, e.g. "dentist appointment".
+        limit (int, optional): The maximum number of matches to return. Defaults to 5.
+
+    Returns:
+        str: A JSON list of matches with their message ID, sender, subject, date and snippet.
+    """
+    results = GMAIL_HANDLER.search_emails(query, limit)
+    if not results:
+        return "No matching emails found."
+    matches = [
+        {
+            "message_id": result["message_id"],
+            "from": result["sender"],
+            "subject": result["subject"],
+            "date": result["timestamp"],
+            "snippet": result["snippet"]
+        }
+        for result in results
+    ]
+    return json.dumps(matches, indent=2)
+
+
 ##########################
 # User Interaction Tools #
 ##########################
 
+@side_effecting
 def say(text: str) -> str:
     """
     Use text-to-speech to say the given text.
@@ -109,6 +144,7 @@ def say(text: str) -> str:
     print(f"[TTS] {text}")
     return "Spoken successfully."
 
+@side_effecting
 def activate_alarm() -> str:
     """
     Activates an alarm sound on the user's device.
@@ -123,6 +159,7 @@ def activate_alarm() -> str:
     return "Alarm activated."
 
 
+@side_effecting
 def activate_lights() -> str:
     """
     Activates the smart lights in the user's environment.
@@ -137,6 +174,7 @@ def activate_lights() -> str:
     return "Smart lights activated."
 
 
+@side_effecting
 def activate_coffee_machine() -> str:
     """
     Activates an IoT coffee machine to brew a cup of coffee.
@@ -1,10 +1,12 @@
 from datetime import datetime
 import inspect
+import math
 import os
 import requests
-import geocoder
 from dotenv import load_dotenv
 
+import location_service
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -158,10 +160,29 @@ def _extract_param_description(docstring: str, param_name: str) -> str | None:
     return None
 
 
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the number of LLM tokens in a text.
+
+    Uses the common approximation of four characters per token, which is close enough for
+    budgeting prompt size and reporting usage without loading a tokenizer.
+
+    Args:
+        text (str): The text to estimate.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+
 def get_geolocation() -> dict:
     """
     Get the geolocation based on the user's IP address.
 
+    The location is served from the process-wide `LocationService`, which caches it, refreshes it
+    in the background and falls back to the last known location when offline.
+
     Returns:
         dict: A dictionary containing geolocation information:
             - lat (float): Latitude
@@ -170,14 +191,7 @@ def get_geolocation() -> dict:
             - state (str): State name
             - country (str): Country name
     """
-    g = geocoder.ip('me')
-    return {
-        'lat': g.latlng[0],
-        'lng': g.latlng[1],
-        'city': g.city,
-        'state': g.state,
-        'country': g.country
-    }
+    return location_service.LOCATION_SERVICE.get()
 
 
 def post_process_weather_data(weather_data):